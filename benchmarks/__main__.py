@@ -0,0 +1,96 @@
+"""
+Runs the benchmark suite, optionally saving the results as a baseline or comparing
+them with a previously saved baseline.
+
+Usage::
+
+    python -m benchmarks --save baseline.json
+    python -m benchmarks --compare baseline.json --fail-on-regression
+    python -m benchmarks --quick --select frozen_load
+"""
+import argparse
+import json
+import platform
+import sys
+import typing
+
+from benchmarks import suite
+
+BASELINE_VERSION = 1
+
+
+def save_baseline(path: str, results: typing.Dict[str, float]):
+    with open(path, "w") as f:
+        json.dump({
+            "version": BASELINE_VERSION,
+            "python": platform.python_version(),
+            "results": results,
+        }, f, indent=2, sort_keys=True)
+
+
+def load_baseline(path: str) -> typing.Dict[str, float]:
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline.get("version") != BASELINE_VERSION:
+        raise ValueError(f"Unsupported baseline version in {path}: {baseline.get('version')!r}")
+    return baseline["results"]
+
+
+def compare(
+    baseline: typing.Dict[str, float], results: typing.Dict[str, float], threshold: float
+) -> typing.Tuple[typing.List[str], typing.List[str]]:
+    """
+    Returns report lines and ids of cases that are slower than the baseline by more than threshold.
+    """
+    lines = [f"{'case':<70} {'baseline (us)':>14} {'current (us)':>13} {'change':>8}"]
+    regressions = []
+    for case_id, seconds in results.items():
+        if case_id not in baseline:
+            lines.append(f"{case_id:<70} {'-':>14} {seconds * 1e6:>13.2f} {'new':>8}")
+            continue
+        change = seconds / baseline[case_id] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(case_id)
+            flag = " !"
+        lines.append(
+            f"{case_id:<70} {baseline[case_id] * 1e6:>14.2f} {seconds * 1e6:>13.2f} {change:>+7.0%}{flag}"
+        )
+    return lines, regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="run only the smallest parameters of each case")
+    parser.add_argument("--select", help="run only cases whose name contains this")
+    parser.add_argument("--min-time", type=float, default=0.05, help="minimum duration of one measurement")
+    parser.add_argument("--save", metavar="PATH", help="save results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare results with a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown reported as regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on regressions")
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline(args.compare) if args.compare else None
+
+    def report(case_id, seconds):
+        if baseline is None:
+            print(f"{case_id:<70} {seconds * 1e6:>12.2f} us")
+
+    results = suite.run(quick=args.quick, min_time=args.min_time, select=args.select, report=report)
+
+    if args.save:
+        save_baseline(args.save, results)
+
+    if baseline is not None:
+        lines, regressions = compare(baseline, results, args.threshold)
+        print("\n".join(lines))
+        if regressions:
+            print(f"\n{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}")
+            if args.fail_on_regression:
+                return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
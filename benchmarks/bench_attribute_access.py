@@ -0,0 +1,57 @@
+"""
+Compares the cost of attribute access on profiles without a delegate against
+the generic ``__getattribute__`` override that all profiles used to have.
+
+Usage::
+
+    python -m benchmarks.bench_attribute_access
+"""
+import timeit
+
+from wr_profiles import EnvvarProfile, envvar_profile_cls
+
+
+@envvar_profile_cls(profile_root="bench")
+class BenchProfile:
+    host: str = "localhost"
+    username: str
+    password: str
+
+
+class LegacyBenchProfile(BenchProfile):
+    def __getattribute__(self, name):
+        # The override every EnvvarProfile had before delegation was decided at class creation.
+        if name.startswith("_") or name in ("profile_delegate",):
+            return object.__getattribute__(self, name)
+        if name in self.__class__.__dict__:
+            return object.__getattribute__(self, name)
+        if hasattr(self.__class__, "profile_delegate"):
+            return getattr(self.profile_delegate, name)
+        else:
+            return object.__getattribute__(self, name)
+
+
+ATTRIBUTES = ["profile_properties", "profile_root", "to_dict", "_const_values"]
+
+
+def measure(profile: EnvvarProfile, attribute: str, number: int) -> float:
+    return min(timeit.repeat(
+        f"profile.{attribute}", globals={"profile": profile}, number=number, repeat=5,
+    )) / number
+
+
+def main(number=200000):
+    current = BenchProfile()
+    legacy = LegacyBenchProfile()
+    print(f"{'attribute':<20} {'legacy (ns)':>12} {'current (ns)':>13} {'speedup':>8}")
+    for attribute in ATTRIBUTES:
+        legacy_time = measure(legacy, attribute, number)
+        current_time = measure(current, attribute, number)
+        print(
+            f"{attribute:<20} {legacy_time * 1e9:>12.1f} {current_time * 1e9:>13.1f} "
+            f"{legacy_time / current_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
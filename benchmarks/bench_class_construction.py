@@ -0,0 +1,131 @@
+"""
+Measures the time to import a module that declares many profile classes, with envvar_profile_cls
+and with the previous algorithm which evaluated typing.get_type_hints() for every class in the MRO
+and created new properties for all inherited annotations.
+
+Usage::
+
+    python -m benchmarks.bench_class_construction
+"""
+import gc
+import importlib
+import sys
+import tempfile
+import time
+import typing
+
+from wr_profiles import EnvvarProfile, EnvvarProfileProperty
+from wr_profiles.envvar_profile import to_snake_case
+
+
+def legacy_envvar_profile_cls(profile_cls=None, **profile_cls_options):
+    def decorator(profile_cls):
+        profile_option_names = [
+            "profile_root", "profile_activating_envvar", "profile_cache_values",
+            "profile_live_loader", "profile_frozen_loader",
+        ]
+        dct = {}
+        for option_name in profile_option_names:
+            if option_name in profile_cls_options:
+                dct[option_name] = profile_cls_options[option_name]
+            elif option_name in profile_cls.__dict__:
+                dct[option_name] = getattr(profile_cls, option_name)
+            elif option_name == "profile_root":
+                dct[option_name] = to_snake_case(profile_cls.__name__)
+
+        property_names = []
+        for cls in reversed(profile_cls.__mro__[:-1]):
+            if not issubclass(cls, EnvvarProfile) and cls is not profile_cls:
+                continue
+            for k, v in typing.get_type_hints(cls).items():
+                if k.startswith("_") or k.startswith("profile_"):
+                    continue
+                if k not in property_names:
+                    property_names.append(k)
+                default = getattr(cls, k, None)
+                secret = False
+                if isinstance(default, EnvvarProfileProperty):
+                    secret = default.secret
+                    default = default.default
+                dct[k] = EnvvarProfileProperty(name=k, default=default, type_=v, secret=secret)
+        dct["profile_properties"] = property_names
+
+        bases = []
+        if not issubclass(profile_cls, EnvvarProfile):
+            bases.append(EnvvarProfile)
+        bases.append(profile_cls)
+        cls = type(profile_cls.__name__, tuple(bases), dct)
+        cls.__qualname__ = profile_cls.__qualname__
+        return cls
+
+    if profile_cls is None:
+        return decorator
+    return decorator(profile_cls)
+
+
+def generate_module(decorator_import: str, num_bases: int, num_subclasses: int, num_properties: int) -> str:
+    """
+    Returns source of a module declaring base profile classes with num_properties properties each and
+    num_subclasses sub-classes of every base class that add one property and override one default.
+    """
+    lines = ["import typing", decorator_import, ""]
+    types = ["str", "int", "bool", "typing.List[int]", "typing.Optional[float]"]
+    for b in range(num_bases):
+        lines.append("@envvar_profile_cls")
+        lines.append(f"class Base{b}:")
+        for i in range(num_properties):
+            lines.append(f"    prop{i}: {types[i % len(types)]}")
+        for s in range(num_subclasses):
+            lines.append("")
+            lines.append("@envvar_profile_cls")
+            lines.append(f"class Sub{b}x{s}(Base{b}):")
+            lines.append("    extra: str = 'extra'")
+            lines.append("    prop0 = 'overridden'")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def time_import(directory: str, module_name: str, number: int) -> float:
+    """
+    Returns the best time of importing the module anew.
+    """
+    best = float("inf")
+    for _ in range(number):
+        sys.modules.pop(module_name, None)
+        importlib.invalidate_caches()
+        # Collect classes of previous imports which slow down ABC subclass checks
+        gc.collect()
+        start = time.perf_counter()
+        importlib.import_module(module_name)
+        best = min(best, time.perf_counter() - start)
+    sys.modules.pop(module_name, None)
+    return best
+
+
+def main(number=5):
+    implementations = {
+        "legacy": "from benchmarks.bench_class_construction import legacy_envvar_profile_cls as envvar_profile_cls",
+        "current": "from wr_profiles import envvar_profile_cls",
+    }
+    print(f"{'bases':>6} {'subclasses':>11} {'properties':>11} {'legacy (ms)':>12} {'current (ms)':>13} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        sys.path.insert(0, directory)
+        try:
+            for num_bases, num_subclasses, num_properties in [(100, 0, 5), (20, 5, 10), (10, 10, 40)]:
+                times = {}
+                for name, decorator_import in implementations.items():
+                    module_name = f"bench_profiles_{name}_{num_bases}_{num_subclasses}_{num_properties}"
+                    with open(f"{directory}/{module_name}.py", "w") as f:
+                        f.write(generate_module(decorator_import, num_bases, num_subclasses, num_properties))
+                    times[name] = time_import(directory, module_name, number)
+                print(
+                    f"{num_bases:>6} {num_subclasses:>11} {num_properties:>11} "
+                    f"{times['legacy'] * 1e3:>12.1f} {times['current'] * 1e3:>13.1f} "
+                    f"{times['legacy'] / times['current']:>7.1f}x"
+                )
+        finally:
+            sys.path.remove(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Compares memory footprint and attribute read time of frozen profiles returned by
+EnvvarProfile.load() with those returned by EnvvarProfile.load(compact=True).
+
+Usage::
+
+    python -m benchmarks.bench_compact_memory
+"""
+import timeit
+import tracemalloc
+
+from benchmarks.common import create_profile_cls
+
+
+def measure_memory(factory, count: int) -> float:
+    """
+    Returns bytes allocated per profile.
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        profiles = [factory(i) for i in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert len(profiles) == count
+    return (after - before) / count
+
+
+def main(count=5000):
+    print(f"{'properties':>10} {'frozen (B)':>11} {'compact (B)':>12} {'frozen read (ns)':>17} {'compact read (ns)':>18}")
+    for num_properties in [3, 10, 40]:
+        profile_cls = create_profile_cls(num_properties)
+        values = {k: f"{k}-value" for k in profile_cls.profile_properties}
+
+        frozen_bytes = measure_memory(
+            lambda i: profile_cls.load(f"tenant{i}", values=values), count
+        )
+        compact_bytes = measure_memory(
+            lambda i: profile_cls.load(f"tenant{i}", values=values, compact=True), count
+        )
+
+        frozen = profile_cls.load("tenant", values=values)
+        compact = profile_cls.load("tenant", values=values, compact=True)
+        number = 100000
+        frozen_read = min(timeit.repeat("p.prop0", globals={"p": frozen}, number=number, repeat=5)) / number
+        compact_read = min(timeit.repeat("p.prop0", globals={"p": compact}, number=number, repeat=5)) / number
+
+        print(
+            f"{num_properties:>10} {frozen_bytes:>11.0f} {compact_bytes:>12.0f} "
+            f"{frozen_read * 1e9:>17.1f} {compact_read * 1e9:>18.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Compares EnvvarProfile.load with the load() of wr_profiles before single pass freezing,
+copied below: it created a live clone of the profile and walked the profile tree to check
+and then to read every property, creating a new instance of every parent profile on the way
+and reading os.environ directly.
+
+Usage::
+
+    python -m benchmarks.bench_frozen_load
+"""
+import os
+import re
+import typing
+
+from benchmarks.common import create_chain_env, create_profile_cls, measure
+
+LEGACY_PROFILE_NAME_COMPONENT_REGEX = re.compile(r"^[a-z]([\d\w]*[a-z0-9])?$")
+
+NotSet = object()
+
+
+class LegacyProfile:
+    """
+    Copy of the parts of EnvvarProfile, LiveProfileLoader and FrozenProfileLoader that load() used.
+    Properties are (name, default) pairs taken from a current profile class.
+    """
+
+    profile_root: str = None
+    profile_activating_envvar: str = None
+    profile_properties: typing.List[str] = None
+    property_defaults: typing.Dict[str, typing.Any] = None
+
+    def __init__(self, *, name=None, parent_name=None, profile_is_live=True, values=None, defaults=None):
+        self._const_name = name
+        self._const_parent_name = parent_name
+        self._const_is_live = profile_is_live
+
+        self._const_values = {}
+        if values is not None:
+            self._const_values.update(values)
+
+        self._const_defaults = {}
+        if defaults is not None:
+            self._const_defaults.update(defaults)
+
+        if not self.profile_root:
+            raise ValueError(f"{self.__class__.__name__}.profile_root is required")
+
+        if not LEGACY_PROFILE_NAME_COMPONENT_REGEX.match(self.profile_root):
+            raise ValueError(f"{self.__class__.__name__}.profile_root {self.profile_root!r} is invalid")
+
+    @classmethod
+    def load(cls, name=None, parent_name=None, profile_is_live=False, values=None, defaults=None) -> "LegacyProfile":
+        instance = cls(
+            name=name,
+            parent_name=parent_name,
+            profile_is_live=profile_is_live,
+            values=values,
+            defaults=defaults,
+        )
+        instance._do_load()
+        return instance
+
+    def __getattribute__(self, name):
+        if name.startswith("_") or name in ("profile_delegate",):
+            return object.__getattribute__(self, name)
+        if name in self.__class__.__dict__:
+            return object.__getattribute__(self, name)
+        if hasattr(self.__class__, "profile_delegate"):
+            return getattr(self.profile_delegate, name)
+        else:
+            return object.__getattribute__(self, name)
+
+    @property
+    def _envvar_prefix(self):
+        if self.profile_name:
+            return f"{self.profile_root}_{self.profile_name}_".upper()
+        return f"{self.profile_root}_".upper()
+
+    @property
+    def _profile_parent_name(self) -> typing.Optional[str]:
+        if self._const_parent_name:
+            return self._const_parent_name
+        elif not self.profile_is_live:
+            return None
+        elif self.profile_name:
+            return os.environ.get(f"{self._envvar_prefix}PARENT_PROFILE", None)
+        else:
+            return None
+
+    @property
+    def profile_name(self) -> typing.Optional[str]:
+        if self._const_name:
+            return self._const_name
+        elif not self.profile_is_live:
+            return None
+        else:
+            return self._active_profile_name
+
+    @property
+    def _active_profile_name_envvar(self) -> str:
+        if self.profile_activating_envvar:
+            return self.profile_activating_envvar
+        else:
+            return f"{self.profile_root}_PROFILE".upper()
+
+    @property
+    def _active_profile_name(self) -> typing.Optional[str]:
+        return os.environ.get(self._active_profile_name_envvar, None) or None
+
+    @property
+    def profile_is_live(self) -> bool:
+        return self._const_is_live
+
+    @property
+    def _profile_parent(self) -> typing.Optional["LegacyProfile"]:
+        profile_name = self._profile_parent_name
+        if profile_name is None:
+            return None
+        else:
+            return self.__class__(
+                name=self._profile_parent_name, parent_name=None, profile_is_live=self.profile_is_live
+            )
+
+    def _get_profile_tree(self) -> typing.Generator["LegacyProfile", None, None]:
+        yield self
+        parent_profile = self._profile_parent
+        while parent_profile:
+            yield parent_profile
+            parent_profile = parent_profile._profile_parent
+
+    @staticmethod
+    def _get_envvar(profile: "LegacyProfile", prop_name: str) -> str:
+        return "{}{}".format(profile._envvar_prefix, prop_name.upper())
+
+    # LiveProfileLoader
+
+    def has_prop_value(self, prop_name: str) -> bool:
+        for check_profile in self._get_profile_tree():
+            if prop_name in check_profile._const_values:
+                return True
+            prop_envvar = self._get_envvar(check_profile, prop_name)
+            if prop_envvar in os.environ:
+                return True
+
+        return False
+
+    def _get_prop_value(self, prop_name: str, default: typing.Any = NotSet) -> typing.Any:
+        for check_profile in self._get_profile_tree():
+            if prop_name in check_profile._const_values:
+                return check_profile._const_values[prop_name]
+
+        for check_profile in self._get_profile_tree():
+            prop_envvar = self._get_envvar(check_profile, prop_name)
+            if prop_envvar in os.environ:
+                # from_str() returned the value as it was
+                return os.environ[prop_envvar]
+
+        for check_profile in self._get_profile_tree():
+            if prop_name in check_profile._const_defaults:
+                return check_profile._const_defaults[prop_name]
+
+        if default is not NotSet:
+            return default
+
+        return self.property_defaults[prop_name]
+
+    # FrozenProfileLoader
+
+    def _do_load(self):
+        live_clone = self.__class__(
+            name=self.profile_name,
+            parent_name=self._profile_parent_name,
+            profile_is_live=True,
+            values=self._const_values,
+        )
+
+        values = {}
+        for prop_name in self.profile_properties:
+            if live_clone.has_prop_value(prop_name):
+                values[prop_name] = live_clone._get_prop_value(prop_name)
+
+        self._const_values = values
+
+
+def create_legacy_profile_cls(profile_cls) -> typing.Type[LegacyProfile]:
+    return type("LegacyBenchProfile", (LegacyProfile,), {
+        "profile_root": profile_cls.profile_root,
+        "profile_properties": list(profile_cls.profile_properties),
+        "property_defaults": {k: getattr(profile_cls, k).default for k in profile_cls.profile_properties},
+    })
+
+
+def main(number=200):
+    print(f"{'properties':>10} {'depth':>6} {'legacy (us)':>12} {'current (us)':>13} {'speedup':>8}")
+    for num_properties, depth in [(5, 1), (5, 5), (40, 1), (40, 3), (40, 10), (200, 3)]:
+        profile_cls = create_profile_cls(num_properties)
+        legacy_cls = create_legacy_profile_cls(profile_cls)
+        with create_chain_env(profile_cls, depth).applied():
+            assert legacy_cls.load("p0")._const_values == profile_cls.load("p0")._const_values
+
+            legacy_time = measure(lambda: legacy_cls.load("p0"), number)
+            current_time = measure(lambda: profile_cls.load("p0"), number)
+
+        print(
+            f"{num_properties:>10} {depth:>6} {legacy_time * 1e6:>12.1f} {current_time * 1e6:>13.1f} "
+            f"{legacy_time / current_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
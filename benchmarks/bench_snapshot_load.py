@@ -0,0 +1,64 @@
+"""
+Compares loading frozen profiles from the environment (EnvvarProfile.load for every profile,
+and EnvvarProfile.load_all) with loading them from snapshot files (EnvvarProfile.load_snapshot).
+
+Usage::
+
+    python -m benchmarks.bench_snapshot_load
+"""
+import os
+import tempfile
+
+from benchmarks.common import create_profile_cls, measure
+from wr_profiles import Environment
+
+
+def create_profiles_env(profile_cls, num_profiles: int, env_size: int = 0) -> Environment:
+    """
+    Profiles p0, p1, ... set all properties; every other profile inherits from the one before it.
+    """
+    prefix = profile_cls.profile_root.upper()
+    env = Environment()
+    for p in range(num_profiles):
+        if p % 2:
+            env[f"{prefix}_P{p}_PARENT_PROFILE"] = f"p{p - 1}"
+        for i, prop_name in enumerate(profile_cls.profile_properties):
+            env[f"{prefix}_P{p}_{prop_name.upper()}"] = f"value{p}-{i}"
+    for i in range(env_size - len(env)):
+        env[f"BENCHPAD{i % 50}_{i}_VALUE"] = f"pad{i}"
+    return env
+
+
+def main(number=20):
+    print(
+        f"{'profiles':>8} {'properties':>10} {'load (us)':>10} {'load_all (us)':>14} "
+        f"{'binary (us)':>12} {'json (us)':>10} {'speedup':>8}"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for num_profiles, num_properties in [(10, 5), (10, 40), (50, 5), (50, 40)]:
+            profile_cls = create_profile_cls(num_properties)
+            names = [f"p{p}" for p in range(num_profiles)]
+            binary_path = os.path.join(tmpdir, "profiles.snapshot")
+            json_path = os.path.join(tmpdir, "profiles.json")
+
+            with create_profiles_env(profile_cls, num_profiles, env_size=1000).applied():
+                profile_cls.dump_snapshot(binary_path)
+                profile_cls.dump_snapshot(json_path)
+                expected = {name: profile_cls.load(name).to_dict() for name in names}
+
+                load_time = measure(lambda: [profile_cls.load(name) for name in names], number)
+                load_all_time = measure(profile_cls.load_all, number)
+
+            for path in (binary_path, json_path):
+                assert {k: v.to_dict() for k, v in profile_cls.load_snapshot(path).items()} == expected
+            binary_time = measure(lambda: profile_cls.load_snapshot(binary_path), number)
+            json_time = measure(lambda: profile_cls.load_snapshot(json_path), number)
+
+            print(
+                f"{num_profiles:>8} {num_properties:>10} {load_time * 1e6:>10.1f} {load_all_time * 1e6:>14.1f} "
+                f"{binary_time * 1e6:>12.1f} {json_time * 1e6:>10.1f} {load_time / binary_time:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Helpers shared by benchmarks.
+"""
+import timeit
+import typing
+
+from wr_profiles import Environment, envvar_profile_cls
+
+
+def create_profile_cls(num_properties: int, profile_root: str = "bench", **options):
+    """
+    Creates a profile class with properties prop0, prop1, ...
+    """
+    cls = type("BenchProfile", (), {
+        "__annotations__": {f"prop{i}": str for i in range(num_properties)},
+    })
+    return envvar_profile_cls(cls, profile_root=profile_root, **options)
+
+
+def create_chain_env(profile_cls, depth: int, env_size: int = 0) -> Environment:
+    """
+    Profile p0 inherits from p1 which inherits from p2 ... up to p<depth - 1>.
+    Every profile in the chain sets an equal share of the properties.
+
+    If env_size is set, the environment is padded with unrelated variables up to that size.
+    """
+    prefix = profile_cls.profile_root.upper()
+    env = Environment()
+    for level in range(depth):
+        if level + 1 < depth:
+            env[f"{prefix}_P{level}_PARENT_PROFILE"] = f"p{level + 1}"
+    for i, prop_name in enumerate(profile_cls.profile_properties):
+        env[f"{prefix}_P{i % depth}_{prop_name.upper()}"] = f"value{i}"
+    for i in range(env_size - len(env)):
+        env[f"BENCHPAD{i % 50}_{i}_VALUE"] = f"pad{i}"
+    return env
+
+
+def measure(func: typing.Callable, number: int, repeat: int = 5) -> float:
+    """
+    Returns the best time of a single call in seconds.
+    """
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
@@ -0,0 +1,235 @@
+"""
+Benchmark cases for profile resolution paths.
+
+Each case is a context manager function that sets up the scenario described by
+its parameters and yields the callable to be timed. Cases are registered with
+the ``case`` decorator which takes the values of each parameter to benchmark;
+the first value of every parameter is used in quick runs.
+"""
+import contextlib
+import itertools
+import os
+import pickle
+import tempfile
+import time
+import typing
+
+from benchmarks.common import create_chain_env, create_profile_cls
+from wr_profiles import Environment, LiveProfileLoader, SourceChain, envvar_profile, observed_environ, profile_loaders
+from wr_profiles.environ import overlays_available
+
+
+class BenchmarkCase:
+    def __init__(self, name: str, func: typing.Callable, params: typing.Dict[str, typing.Sequence]):
+        self.name = name
+        self.func = contextlib.contextmanager(func)
+        self.params = params
+
+    def iter_params(self, quick: bool = False) -> typing.Iterator[typing.Dict[str, typing.Any]]:
+        names = list(self.params)
+        values = [self.params[n][:1] if quick else self.params[n] for n in names]
+        for combination in itertools.product(*values):
+            yield dict(zip(names, combination))
+
+    def get_id(self, params: typing.Dict[str, typing.Any]) -> str:
+        return "{}[{}]".format(self.name, ",".join(f"{k}={v}" for k, v in params.items()))
+
+
+cases: typing.List[BenchmarkCase] = []
+
+
+def case(**params: typing.Sequence):
+    def decorator(func):
+        cases.append(BenchmarkCase(func.__name__, func, params))
+        return func
+    return decorator
+
+
+def time_call(func: typing.Callable, min_time: float, repeat: int = 3) -> float:
+    """
+    Returns the best time of a single call in seconds, calling func enough times
+    for each measurement to take at least min_time.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def run(
+    quick: bool = False,
+    min_time: float = 0.05,
+    select: typing.Optional[str] = None,
+    report: typing.Callable[[str, float], None] = None,
+) -> typing.Dict[str, float]:
+    """
+    Runs all cases (or those whose name contains select) and returns
+    seconds per call by case id.
+    """
+    results = {}
+    for benchmark_case in cases:
+        if select and select not in benchmark_case.name:
+            continue
+        for params in benchmark_case.iter_params(quick=quick):
+            with benchmark_case.func(**params) as func:
+                seconds = time_call(func, min_time=min_time)
+            case_id = benchmark_case.get_id(params)
+            results[case_id] = seconds
+            if report is not None:
+                report(case_id, seconds)
+    return results
+
+
+def _load_profile(profile_cls, mode: str):
+    if mode == "live":
+        return profile_cls(name="p0")
+    return profile_cls.load("p0")
+
+
+@case(num_properties=(5, 40), depth=(1, 5), env_size=(0, 5000), mode=("live", "frozen"))
+def get_prop_value(num_properties, depth, env_size, mode):
+    profile_cls = create_profile_cls(num_properties)
+    with create_chain_env(profile_cls, depth, env_size).applied():
+        profile = _load_profile(profile_cls, mode)
+        # The last property is set on the deepest profile in the chain.
+        prop_name = profile_cls.profile_properties[-1]
+        yield lambda: getattr(profile, prop_name)
+
+
+@case(num_sources=(3, 10), depth=(1, 5))
+def get_prop_value_layered(num_sources, depth):
+    # Values are in the last of the sources; the others only have unrelated keys.
+    sources = [{f"BENCH_UNRELATED{i}_{j}": "x" for j in range(20)} for i in range(num_sources - 1)]
+    sources.append(create_chain_env(create_profile_cls(5), depth))
+    profile_loaders.register("bench-layered", LiveProfileLoader(environ=SourceChain([observed_environ, *sources])))
+    try:
+        profile_cls = create_profile_cls(5, profile_live_loader="bench-layered")
+        profile = profile_cls(name="p0")
+        yield lambda: profile.prop4
+    finally:
+        profile_loaders.unregister("bench-layered")
+
+
+@case(num_properties=(5, 40), depth=(1, 5), env_size=(0, 5000))
+def frozen_load(num_properties, depth, env_size):
+    profile_cls = create_profile_cls(num_properties)
+    with create_chain_env(profile_cls, depth, env_size).applied():
+        yield lambda: profile_cls.load("p0")
+
+
+@case(num_properties=(5, 40), format=("binary", "json"))
+def snapshot_load(num_properties, format):
+    # Compare with frozen_load[depth=5] which loads one of the five profiles in the snapshot.
+    profile_cls = create_profile_cls(num_properties)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "profiles.snapshot")
+        with create_chain_env(profile_cls, 5).applied():
+            profile_cls.dump_snapshot(path, format=format)
+        yield lambda: profile_cls.load_snapshot(path)
+
+
+@case(num_properties=(5, 40, 200))
+def class_construction(num_properties):
+    yield lambda: create_profile_cls(num_properties)
+
+
+@case(num_properties=(5, 40), depth=(1, 5), mode=("live", "frozen"))
+def to_envvars(num_properties, depth, mode):
+    profile_cls = create_profile_cls(num_properties)
+    with create_chain_env(profile_cls, depth).applied():
+        profile = _load_profile(profile_cls, mode)
+        yield profile.to_envvars
+
+
+@case(num_properties=(5, 40), mode=("profile", "compact"))
+def pickle_round_trip(num_properties, mode):
+    # Classes created by envvar_profile() can be pickled even though they aren't importable.
+    profile_cls = type(envvar_profile("bench", **{f"prop{i}": None for i in range(num_properties)}))
+    with create_chain_env(profile_cls, 1).applied():
+        profile = profile_cls.load("p0", compact=mode == "compact")
+        yield lambda: pickle.loads(pickle.dumps(profile))
+
+
+@case(num_properties=(5, 40), depth=(1, 5))
+def to_envvars_minimal(num_properties, depth):
+    profile_cls = create_profile_cls(num_properties)
+    with create_chain_env(profile_cls, depth).applied():
+        profile = _load_profile(profile_cls, "live")
+        yield lambda: profile.to_envvars(minimal=True)
+
+
+@case(num_properties=(5, 40), depth=(1, 5), mode=("live", "frozen"))
+def create_env(num_properties, depth, mode):
+    profile_cls = create_profile_cls(num_properties)
+    with create_chain_env(profile_cls, depth).applied():
+        profile = _load_profile(profile_cls, mode)
+        yield lambda: profile.create_env(prop0="override")
+
+
+@case(num_properties=(5, 40))
+def environment_applied(num_properties):
+    profile_cls = create_profile_cls(num_properties)
+    env = create_chain_env(profile_cls, 1)
+    env["BENCH_P0_PROP0"] = None
+
+    def apply():
+        with env.applied():
+            pass
+
+    yield apply
+
+
+@case(num_envvars=(5, 40))
+def environment_applied_nested(num_envvars):
+    outer = Environment({f"BENCH_OUTER_{i}": str(i) for i in range(num_envvars)})
+    inner = Environment({f"BENCH_OUTER_{i}": str(i + 1) for i in range(num_envvars)})
+
+    def apply():
+        with outer.applied():
+            with inner.applied():
+                pass
+
+    yield apply
+
+
+def environment_applied_overlay(num_envvars, depth):
+    envs = [
+        Environment({f"BENCH_OVERLAY_{i}": str(i + level) for i in range(level, level + num_envvars)})
+        for level in range(depth)
+    ]
+
+    def apply():
+        with contextlib.ExitStack() as stack:
+            for env in envs:
+                stack.enter_context(env.applied(overlay=True))
+
+    yield apply
+
+
+# Overlays require Python 3.7+ or the contextvars backport.
+if overlays_available():
+    case(num_envvars=(5, 40), depth=(1, 10))(environment_applied_overlay)
+
+
+@case(num_properties=(5, 40), env_size=(0, 5000), base=("copy", "shared"))
+def environment_to_child_env(num_properties, env_size, base):
+    profile_cls = create_profile_cls(num_properties)
+    with create_chain_env(profile_cls, 1, env_size).applied():
+        env = profile_cls(name="p0").create_env(prop0="override")
+        if base == "shared":
+            yield lambda: env.to_child_env(base=observed_environ.as_mapping())
+        else:
+            yield env.to_child_env
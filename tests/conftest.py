@@ -2,6 +2,8 @@ import os
 
 import pytest
 
+from wr_profiles import observed_environ
+
 
 @pytest.fixture(autouse=True)
 def reset_warehouse_profile_envvars(monkeypatch):
@@ -12,3 +14,19 @@ def reset_warehouse_profile_envvars(monkeypatch):
         if k.startswith("WAREHOUSE_"):
             del os.environ[k]
             monkeypatch.delenv(k, raising=False)
+    observed_environ.refresh()
+
+
+@pytest.fixture
+def chain_envvars(monkeypatch):
+    """
+    Environment variables of WarehouseProfile profiles: staging inherits from production
+    which inherits from base; sandbox has no parent.
+    """
+    monkeypatch.setenv("WAREHOUSE_STAGING_PARENT_PROFILE", "production")
+    monkeypatch.setenv("WAREHOUSE_STAGING_USERNAME", "staging-username")
+    monkeypatch.setenv("WAREHOUSE_PRODUCTION_PARENT_PROFILE", "base")
+    monkeypatch.setenv("WAREHOUSE_PRODUCTION_HOST", "production-host")
+    monkeypatch.setenv("WAREHOUSE_PRODUCTION_USERNAME", "production-username")
+    monkeypatch.setenv("WAREHOUSE_BASE_PASSWORD", "base-password")
+    monkeypatch.setenv("WAREHOUSE_SANDBOX_HOST", "sandbox-host")
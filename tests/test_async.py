@@ -0,0 +1,166 @@
+import asyncio
+import collections.abc
+
+import pytest
+
+from tests.warehouse_profile import WarehouseProfile
+from wr_profiles import (
+    CompactProfile, LiveProfileLoader, SourceChain, envvar_profile_cls, observed_environ, profile_loaders
+)
+from wr_profiles.aio import Coalescer
+from wr_profiles.files import FileEnviron
+
+
+def run(coro):
+    """
+    Runs the coroutine in a new event loop, like run() which Python 3.6 doesn't have.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class SlowSource(collections.abc.Mapping):
+    """
+    Has only the values that were prefetched.
+    """
+
+    def __init__(self, remote):
+        self.remote = remote
+        self.fetched = {}
+        self.fetches = []
+        self.state = 0
+
+    async def aprefetch(self, keys):
+        self.fetches.append(sorted(keys))
+        await asyncio.sleep(0.01)
+        self.fetched.update((k, self.remote[k]) for k in keys if k in self.remote)
+        self.state += 1
+
+    def __getitem__(self, key):
+        return self.fetched[key]
+
+    def __iter__(self):
+        return iter(self.fetched)
+
+    def __len__(self):
+        return len(self.fetched)
+
+
+@pytest.fixture
+def slow_source():
+    source = SlowSource({
+        "WAREHOUSE_STAGING_PARENT_PROFILE": "production",
+        "WAREHOUSE_STAGING_USERNAME": "staging-user",
+        "WAREHOUSE_PRODUCTION_HOST": "production-host",
+        "WAREHOUSE_PRODUCTION_PASSWORD": "production-password",
+    })
+    profile_loaders.register("test-slow", LiveProfileLoader(environ=SourceChain([observed_environ, source])))
+    yield source
+    profile_loaders.unregister("test-slow")
+
+
+@pytest.fixture
+def slow_profile_cls(slow_source):
+    @envvar_profile_cls(profile_root="warehouse", profile_live_loader="test-slow")
+    class SlowWarehouseProfile:
+        host: str = "localhost"
+        username: str
+        password: str
+
+    return SlowWarehouseProfile
+
+
+expected_staging = {"host": "production-host", "username": "staging-user", "password": "production-password"}
+
+
+def test_aresolve_all_fetches_parent_chain(slow_source, slow_profile_cls):
+    staging = slow_profile_cls(name="staging")
+    assert run(staging.aresolve_all()) == expected_staging
+    assert slow_source.fetches == [
+        [
+            "WAREHOUSE_STAGING_HOST", "WAREHOUSE_STAGING_PARENT_PROFILE",
+            "WAREHOUSE_STAGING_PASSWORD", "WAREHOUSE_STAGING_USERNAME",
+        ],
+        [
+            "WAREHOUSE_PRODUCTION_HOST", "WAREHOUSE_PRODUCTION_PARENT_PROFILE",
+            "WAREHOUSE_PRODUCTION_PASSWORD", "WAREHOUSE_PRODUCTION_USERNAME",
+        ],
+    ]
+
+
+def test_concurrent_requests_share_fetches(slow_source, slow_profile_cls):
+    async def main():
+        return await asyncio.gather(*(slow_profile_cls(name="staging").aresolve_all() for _ in range(50)))
+
+    assert run(main()) == [expected_staging] * 50
+    assert len(slow_source.fetches) == 2
+
+
+def test_aload(slow_source, slow_profile_cls):
+    staging = run(slow_profile_cls.aload("staging"))
+    assert not staging.profile_is_live
+    assert staging.to_dict() == expected_staging
+
+    compact = run(slow_profile_cls.aload("staging", compact=True))
+    assert isinstance(compact, CompactProfile)
+    assert compact.to_dict() == expected_staging
+
+
+def test_async_api_without_slow_sources(monkeypatch):
+    monkeypatch.setenv("WAREHOUSE_STAGING_HOST", "staging-host")
+    observed_environ.refresh()
+
+    staging = WarehouseProfile(name="staging")
+    assert run(staging.aresolve_all()) == staging.resolve_all()
+    assert run(WarehouseProfile.aload("staging")).to_dict() == staging.to_dict()
+
+
+def test_file_environ_aprefetch(tmp_path):
+    path = tmp_path / "profiles.env"
+    path.write_text("A=1\n")
+    environ = FileEnviron([path], check_interval=3600)
+
+    async def main():
+        await asyncio.gather(*(environ.aprefetch(["A"]) for _ in range(10)))
+
+    run(main())
+    assert environ._merged[1] == {"A": "1"}
+
+
+def test_coalescer():
+    coalescer = Coalescer()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def main():
+        results = await asyncio.gather(
+            coalescer.run("a", fetch), coalescer.run("a", fetch), coalescer.run("b", fetch),
+        )
+        assert coalescer.pending == 0
+        return results + [await coalescer.run("a", fetch)]
+
+    assert run(main()) == [2, 2, 2, 3]
+
+
+def test_cancelled_waiter_does_not_cancel_shared_request():
+    coalescer = Coalescer()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(coalescer.run("a", fetch))
+        second = asyncio.ensure_future(coalescer.run("a", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert run(main()) == "done"
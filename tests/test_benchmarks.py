@@ -0,0 +1,31 @@
+from benchmarks import suite
+from benchmarks.__main__ import compare, load_baseline, main, save_baseline
+
+
+def test_suite_runs_quickly(tmpdir):
+    results = suite.run(quick=True, min_time=0.0001)
+    assert set(results) == {c.get_id(next(c.iter_params(quick=True))) for c in suite.cases}
+    assert all(seconds > 0 for seconds in results.values())
+
+    path = str(tmpdir.join("baseline.json"))
+    save_baseline(path, results)
+    assert load_baseline(path) == results
+
+
+def test_compare_reports_regressions():
+    lines, regressions = compare(
+        {"a": 1.0, "b": 1.0},
+        {"a": 1.1, "b": 1.5, "c": 1.0},
+        threshold=0.2,
+    )
+    assert regressions == ["b"]
+    assert len(lines) == 4
+
+
+def test_main_fails_on_regression(tmpdir, capsys):
+    path = str(tmpdir.join("baseline.json"))
+    save_baseline(path, {"frozen_load[num_properties=5,depth=1,env_size=0]": 1e-12})
+
+    args = ["--quick", "--select", "frozen_load", "--min-time", "0.0001", "--compare", path]
+    assert main(args) == 0
+    assert main(args + ["--fail-on-regression"]) == 1
@@ -0,0 +1,113 @@
+import enum
+import sys
+import typing
+
+import pytest
+
+from wr_profiles import EnvvarProfile, EnvvarProfileProperty, envvar_profile, envvar_profile_cls
+
+
+@envvar_profile_cls(profile_root="warehouse")
+class Base:
+    host: str = "localhost"
+    port: int = 5432
+    mode: "Mode" = None
+
+
+@envvar_profile_cls(profile_root="warehouse")
+class Extended(Base):
+    username: str
+    port = 6543
+
+
+class Mixin:
+    debug: bool = False
+
+
+@envvar_profile_cls(profile_root="warehouse")
+class WithMixin(Mixin, Extended):
+    host: typing.Optional[str] = "example.com"
+
+
+class Mode(enum.Enum):
+    read = "r"
+    write = "w"
+
+
+def test_forward_references_are_resolved_when_needed(monkeypatch):
+    # A class of its own because other tests resolve the properties of Base
+    @envvar_profile_cls(profile_root="warehouse")
+    class Fresh:
+        mode: "Mode" = None
+
+    prop = Fresh.__dict__["mode"]
+    assert "_type_ref" in prop.__dict__
+
+    monkeypatch.setenv("WAREHOUSE_MODE", "write")
+    assert Fresh().mode is Mode.write
+    assert prop.type_ is Mode
+    assert "_type_ref" not in prop.__dict__
+
+
+def test_failed_forward_reference_resolution_is_retried(monkeypatch):
+    @envvar_profile_cls(profile_root="warehouse")
+    class Fresh:
+        level: "Level" = None  # noqa: F821
+
+    prop = Fresh.__dict__["level"]
+    with pytest.raises(NameError):
+        prop.type_
+    with pytest.raises(NameError):
+        prop.converter
+
+    monkeypatch.setattr(sys.modules[__name__], "Level", int, raising=False)
+    monkeypatch.setenv("WAREHOUSE_LEVEL", "3")
+    assert Fresh().level == 3
+    assert prop.type_ is int
+    assert "_type_ref" not in prop.__dict__
+
+
+def test_property_order_and_defaults():
+    assert Base.profile_properties == ["host", "port", "mode"]
+    assert Extended.profile_properties == ["host", "port", "mode", "username"]
+    assert WithMixin.profile_properties == ["host", "port", "mode", "username", "debug"]
+
+    assert Extended().to_dict() == {"host": "localhost", "port": 6543, "mode": None, "username": None}
+    assert WithMixin().to_dict() == {
+        "host": "example.com", "port": 6543, "mode": None, "username": None, "debug": False,
+    }
+
+
+def test_unchanged_properties_of_base_classes_are_reused():
+    assert Extended.__dict__["host"] is Base.__dict__["host"]
+    assert Extended.__dict__["mode"] is Base.__dict__["mode"]
+    assert Extended.__dict__["port"] is not Base.__dict__["port"]
+    assert WithMixin.__dict__["host"] is not Base.__dict__["host"]
+    assert WithMixin.__dict__["port"] is Extended.__dict__["port"]
+
+
+def test_properties_with_same_declaration_are_equal():
+    @envvar_profile_cls(profile_root="other")
+    class Other:
+        host: str = "localhost"
+        mode: "Mode" = None
+
+    assert Other.__dict__["host"] == Base.__dict__["host"]
+    assert Other.__dict__["mode"] == Base.__dict__["mode"]
+    assert Other.__dict__["mode"] != EnvvarProfileProperty(name="mode", type_=str)
+
+
+def test_profile_classes_with_unrelated_bases():
+    assert EnvvarProfile in Extended.__mro__
+    assert Mixin in WithMixin.__mro__
+    assert issubclass(WithMixin, EnvvarProfile)
+
+
+def test_inline_profile_classes_are_reused():
+    a = envvar_profile("letters", a="A", b=None)
+    b = envvar_profile("letters", a="A", b=None)
+    c = envvar_profile("letters", a="B", b=None)
+    assert a is not b
+    assert type(a) is type(b)
+    assert type(a) is not type(c)
+    assert c.a == "B"
@@ -0,0 +1,72 @@
+import pytest
+
+from tests.warehouse_profile import WarehouseProfile
+from wr_profiles import CompactProfile, envvar_profile_cls
+
+
+def test_load_compact_profile(monkeypatch):
+    monkeypatch.setenv("WAREHOUSE_STAGING_USERNAME", "staging-username")
+
+    compact = WarehouseProfile.load("staging", compact=True)
+    assert isinstance(compact, CompactProfile)
+    assert compact.profile_class is WarehouseProfile
+    assert compact.profile_name == "staging"
+    assert compact.profile_root == "warehouse"
+    assert not compact.profile_is_live
+    assert compact.host == "localhost"
+    assert compact.username == "staging-username"
+    assert compact.password is None
+    assert compact.to_dict() == WarehouseProfile.load("staging").to_dict()
+    assert compact.to_envvars() == {
+        "WAREHOUSE_STAGING_HOST": "localhost",
+        "WAREHOUSE_STAGING_USERNAME": "staging-username",
+    }
+
+    monkeypatch.setenv("WAREHOUSE_STAGING_USERNAME", "changed")
+    assert compact.username == "staging-username"
+
+
+def test_compact_profile_is_immutable_and_hashable():
+    first = WarehouseProfile.load("staging", values={"username": "u"}, compact=True)
+    second = WarehouseProfile(name="staging", profile_is_live=False, values={"username": "u"}).to_compact()
+
+    assert first == second
+    assert hash(first) == hash(second)
+    assert len({first, second}) == 1
+    assert type(first) is type(second)
+    assert type(first).__name__ == "WarehouseProfileCompact"
+
+    with pytest.raises(AttributeError):
+        first.username = "other"
+    with pytest.raises(AttributeError):
+        first.other = "other"
+
+
+def test_compact_profiles_of_different_classes_are_not_equal():
+    @envvar_profile_cls(profile_root="other")
+    class OtherProfile:
+        host: str = "localhost"
+        username: str
+        password: str
+
+    warehouse = WarehouseProfile.load("x", compact=True)
+    other = OtherProfile.load("x", compact=True)
+    assert tuple(warehouse) == tuple(other)
+    assert warehouse != other
+    assert hash(warehouse) != hash(other)
+    assert len({warehouse, other}) == 2
+
+    assert warehouse != ("x", "localhost", None, None)
+    assert ("x", "localhost", None, None) != warehouse
+    assert not warehouse == ("x", "localhost", None, None)
+
+
+def test_compact_profile_round_trip():
+    compact = WarehouseProfile.load("staging", values={"password": "p"}, compact=True)
+    profile = compact.to_profile()
+    assert not profile.profile_is_live
+    assert profile.profile_name == "staging"
+    assert profile.to_compact() == compact
+    assert repr(compact) == (
+        "WarehouseProfileCompact(profile_name='staging', host='localhost', username=None, password='p')"
+    )
@@ -0,0 +1,149 @@
+import datetime
+import decimal
+import enum
+import pathlib
+import typing
+
+import pytest
+
+from wr_profiles import envvar_profile_cls
+from wr_profiles.converters import ByteSize, Converter, ConverterRegistry, Json, converter_registry
+
+
+class Colour(enum.Enum):
+    red = "r"
+    green = "g"
+
+
+@envvar_profile_cls
+class Typed:
+    port: int = 8080
+    ratio: float
+    debug: bool = False
+    price: decimal.Decimal
+    root: pathlib.Path
+    colour: Colour
+    hosts: typing.List[str]
+    ports: typing.List[int]
+    limits: typing.Dict[str, int]
+    options: Json
+    timeout: datetime.timedelta
+    max_size: ByteSize
+    retries: typing.Optional[int]
+    name: str
+
+
+@pytest.fixture(autouse=True)
+def reset_typed_envvars(monkeypatch):
+    for k in Typed.profile_properties:
+        monkeypatch.delenv(f"TYPED_{k.upper()}", raising=False)
+
+
+@pytest.mark.parametrize("name,raw,expected", [
+    ["port", "9090", 9090],
+    ["ratio", "0.5", 0.5],
+    ["debug", "true", True],
+    ["debug", "Off", False],
+    ["debug", "1", True],
+    ["price", "9.99", decimal.Decimal("9.99")],
+    ["root", "/tmp/x", pathlib.Path("/tmp/x")],
+    ["colour", "green", Colour.green],
+    ["colour", "r", Colour.red],
+    ["hosts", "a, b,c", ["a", "b", "c"]],
+    ["hosts", '["a", "b"]', ["a", "b"]],
+    ["hosts", "", []],
+    ["ports", "1,2", [1, 2]],
+    ["ports", "[1, 2]", [1, 2]],
+    ["limits", "a=1, b=2", {"a": 1, "b": 2}],
+    ["limits", '{"a": 1}', {"a": 1}],
+    ["options", '{"a": [1, null]}', {"a": [1, None]}],
+    ["timeout", "90", datetime.timedelta(seconds=90)],
+    ["timeout", "1h30m", datetime.timedelta(minutes=90)],
+    ["timeout", "1.5s", datetime.timedelta(milliseconds=1500)],
+    ["timeout", "250ms", datetime.timedelta(milliseconds=250)],
+    ["timeout", "-2d", datetime.timedelta(days=-2)],
+    ["max_size", "512", 512],
+    ["max_size", "10KB", 10000],
+    ["max_size", "1.5KiB", 1536],
+    ["max_size", "2 GiB", 2 * 1024 ** 3],
+    ["retries", "3", 3],
+    ["retries", "", None],
+    ["retries", " ", None],
+    ["name", " raw ", " raw "],
+])
+def test_values_are_converted_by_type(name, raw, expected, monkeypatch):
+    monkeypatch.setenv(f"TYPED_{name.upper()}", raw)
+    assert Typed()[name] == expected
+
+
+@pytest.mark.parametrize("name,raw", [
+    ["port", "x"],
+    ["debug", "maybe"],
+    ["price", "x"],
+    ["colour", "blue"],
+    ["limits", "a"],
+    ["timeout", "1x"],
+    ["timeout", "h"],
+    ["max_size", "1PB"],
+])
+def test_invalid_values_raise_value_error(name, raw, monkeypatch):
+    monkeypatch.setenv(f"TYPED_{name.upper()}", raw)
+    with pytest.raises(ValueError) as exc_info:
+        Typed()[name]
+    assert f"Typed.{name}" in str(exc_info.value)
+
+
+def test_defaults_are_not_converted():
+    assert Typed().port == 8080
+    assert Typed().debug is False
+    assert Typed().ratio is None
+
+
+def test_values_round_trip_through_envvars(monkeypatch):
+    values = {
+        "port": 1, "ratio": 0.25, "debug": True, "price": decimal.Decimal("1.10"), "root": pathlib.Path("/a"),
+        "colour": Colour.red, "hosts": ["a", "b"], "ports": [1, 2], "limits": {"a": 1}, "options": {"x": [1]},
+        "timeout": datetime.timedelta(days=1, seconds=3, microseconds=5000), "max_size": ByteSize(2048),
+        "retries": 2, "name": "n",
+    }
+    frozen = Typed.load(values=values)
+    envvars = frozen.to_envvars()
+    assert envvars["TYPED_DEBUG"] == "true"
+    assert envvars["TYPED_COLOUR"] == "red"
+    assert envvars["TYPED_TIMEOUT"] == "1d3s5ms"
+    assert envvars["TYPED_PORTS"] == "[1, 2]"
+
+    for k, v in envvars.items():
+        monkeypatch.setenv(k, v)
+    assert Typed().to_dict() == values
+
+
+def test_parsed_values_are_cached_and_mutable_ones_copied(monkeypatch):
+    monkeypatch.setenv("TYPED_PORTS", "1,2")
+    profile = Typed()
+
+    first = profile.ports
+    first.append(3)
+    assert profile.ports == [1, 2]
+    assert Typed.ports._parsed["1,2"] == [1, 2]
+
+    monkeypatch.setenv("TYPED_OPTIONS", "{}")
+    profile.options["x"] = 1
+    assert profile.options == {}
+
+
+def test_custom_converters():
+    class Upper(Converter):
+        def from_str(self, value):
+            return value.upper()
+
+    class Shout(str):
+        pass
+
+    registry = ConverterRegistry()
+    registry.register(Shout, Upper())
+    assert isinstance(registry.get(Shout), Upper)
+    assert registry.get(int) is None
+
+    assert converter_registry.get(typing.List[int]) is converter_registry.get(typing.List[int])
+    assert converter_registry.get(str) is None
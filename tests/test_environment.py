@@ -1,8 +1,13 @@
 import os
+import subprocess
+import sys
 from typing import Union
 
+import pytest
+
 from tests.warehouse_profile import WarehouseProfile
-from wr_profiles import EnvvarProfile
+from wr_profiles import Environment, EnvvarProfile, observed_environ
+from wr_profiles.environ import overlays_available
 
 
 def test_create_environment_with_and_without_activation():
@@ -80,3 +85,72 @@ def test_environment_applied(monkeypatch):
     assert wp.host == 'localhost'
     assert wp.username is None
     assert wp.password is None
+
+
+def test_to_child_env(monkeypatch):
+    monkeypatch.setenv('WAREHOUSE_CHILD_HOST', 'parent-host')
+    monkeypatch.setenv('WAREHOUSE_CHILD_PASSWORD', 'parent-password')
+    observed_environ.refresh()
+
+    env = WarehouseProfile(name='child').create_env(username='child-username', password=None)
+    child_env = env.to_child_env()
+
+    assert child_env['WAREHOUSE_PROFILE'] == 'child'
+    assert child_env['WAREHOUSE_CHILD_HOST'] == 'parent-host'
+    assert child_env['WAREHOUSE_CHILD_USERNAME'] == 'child-username'
+    assert 'WAREHOUSE_CHILD_PASSWORD' not in child_env
+    assert child_env['PATH'] == os.environ['PATH']
+
+    # Nothing is modified
+    assert os.environ['WAREHOUSE_CHILD_PASSWORD'] == 'parent-password'
+    assert 'WAREHOUSE_PROFILE' not in os.environ
+
+    assert env.to_child_env(base={'A': 'a', 'WAREHOUSE_CHILD_PASSWORD': 'x'}) == {
+        'A': 'a',
+        'WAREHOUSE_PROFILE': 'child',
+        'WAREHOUSE_CHILD_HOST': 'parent-host',
+        'WAREHOUSE_CHILD_USERNAME': 'child-username',
+    }
+
+
+def test_to_child_env_sees_direct_changes(monkeypatch):
+    assert 'WAREHOUSE_DIRECT' not in Environment(A='a').to_child_env()
+    monkeypatch.setenv('WAREHOUSE_DIRECT', 'direct')
+    assert Environment(A='a').to_child_env()['WAREHOUSE_DIRECT'] == 'direct'
+
+    # The shared copy is passed explicitly and sees direct changes after refresh()
+    observed_environ.refresh()
+    assert Environment(A='a').to_child_env(base=observed_environ.as_mapping())['WAREHOUSE_DIRECT'] == 'direct'
+
+
+@pytest.mark.skipif(not overlays_available(), reason='overlays require contextvars')
+def test_to_child_env_sees_overlay():
+    with Environment(WAREHOUSE_OVERLAID='overlaid').applied(overlay=True):
+        assert Environment(A='a').to_child_env()['WAREHOUSE_OVERLAID'] == 'overlaid'
+    assert 'WAREHOUSE_OVERLAID' not in Environment(A='a').to_child_env()
+
+
+def test_base_copy_is_shared_until_environment_changes():
+    base = observed_environ.as_mapping()
+    assert observed_environ.as_mapping() is base
+    with pytest.raises(TypeError):
+        base['A'] = 'a'
+
+    observed_environ['WAREHOUSE_SHARED_BASE'] = 'x'
+    try:
+        assert observed_environ.as_mapping() is not base
+        assert observed_environ.as_mapping()['WAREHOUSE_SHARED_BASE'] == 'x'
+    finally:
+        del observed_environ['WAREHOUSE_SHARED_BASE']
+
+
+def test_spawn():
+    env = Environment(WAREHOUSE_SPAWNED='spawned', WAREHOUSE_UNSET=None)
+    code = "import os; print(os.environ['WAREHOUSE_SPAWNED'], 'WAREHOUSE_UNSET' in os.environ)"
+    process = env.spawn(
+        [sys.executable, '-c', code], base={'PATH': os.environ.get('PATH', ''), 'WAREHOUSE_UNSET': 'x'},
+        stdout=subprocess.PIPE, universal_newlines=True,
+    )
+    stdout, _ = process.communicate()
+    assert stdout.split() == ['spawned', 'False']
+    assert 'WAREHOUSE_SPAWNED' not in os.environ
@@ -0,0 +1,186 @@
+import os
+
+import pytest
+
+from wr_profiles import FileProfileLoader, envvar_profile_cls, files, observed_environ, profile_loaders
+from wr_profiles.files import ConfigFile, FileEnviron, parse_dotenv, parse_ini, parse_toml, tomllib
+
+
+def test_parse_dotenv():
+    assert parse_dotenv(
+        "# comment\n"
+        "\n"
+        "WAREHOUSE_HOST=localhost\n"
+        "export WAREHOUSE_USERNAME = alice  # inline comment\n"
+        'WAREHOUSE_PASSWORD="a # b\\n"\n'
+        'WAREHOUSE_PATH="C:\\\\new \\"x\\""\n'
+        "WAREHOUSE_STAGING_HOST='single'\n"
+        "not a variable\n"
+    ) == {
+        "WAREHOUSE_HOST": "localhost",
+        "WAREHOUSE_USERNAME": "alice",
+        "WAREHOUSE_PASSWORD": "a # b\n",
+        "WAREHOUSE_PATH": 'C:\\new "x"',
+        "WAREHOUSE_STAGING_HOST": "single",
+    }
+
+
+def test_parse_ini():
+    assert parse_ini(
+        "[DEFAULT]\n"
+        "warehouse_profile = staging\n"
+        "[warehouse]\n"
+        "host = localhost\n"
+        "[warehouse_staging]\n"
+        "host = staging-host\n"
+        "parent_profile = production\n"
+    ) == {
+        "WAREHOUSE_PROFILE": "staging",
+        "WAREHOUSE_HOST": "localhost",
+        "WAREHOUSE_STAGING_HOST": "staging-host",
+        "WAREHOUSE_STAGING_PARENT_PROFILE": "production",
+    }
+
+
+@pytest.mark.skipif(tomllib is None, reason="requires tomllib or tomli")
+def test_parse_toml():
+    assert parse_toml(
+        "[warehouse]\n"
+        "host = 'localhost'\n"
+        "port = 5432\n"
+        "debug = true\n"
+        "tags = ['a', 'b']\n"
+        "[warehouse.staging]\n"
+        "host = 'staging-host'\n"
+    ) == {
+        "WAREHOUSE_HOST": "localhost",
+        "WAREHOUSE_PORT": "5432",
+        "WAREHOUSE_DEBUG": "true",
+        "WAREHOUSE_TAGS": '["a", "b"]',
+        "WAREHOUSE_STAGING_HOST": "staging-host",
+    }
+
+
+def test_config_file_is_parsed_lazily_and_only_on_change(tmp_path, monkeypatch):
+    path = tmp_path / "profiles.env"
+    path.write_text("A=1\n")
+
+    calls = []
+
+    def parse(text):
+        calls.append(text)
+        return parse_dotenv(text)
+
+    monkeypatch.setitem(files.parsers, "dotenv", parse)
+
+    config_file = ConfigFile(path)
+    assert calls == []
+
+    assert config_file.get_values() == {"A": "1"}
+    assert config_file.get_values() == {"A": "1"}
+    assert len(calls) == 1
+
+    path.write_text("A=22\n")
+    assert config_file.get_values() == {"A": "22"}
+    assert len(calls) == 2
+
+    path.unlink()
+    assert config_file.get_values() == {}
+
+
+def test_config_file_format():
+    assert ConfigFile("a.env").format == "dotenv"
+    assert ConfigFile(".env").format == "dotenv"
+    assert ConfigFile("a.toml").format == "toml"
+    assert ConfigFile("a.ini").format == "ini"
+    assert ConfigFile("a.cfg", format_="dotenv").format == "dotenv"
+    with pytest.raises(ValueError):
+        ConfigFile("a.env", format_="yaml")
+
+
+def test_file_environ_last_file_wins(tmp_path):
+    (tmp_path / "a.env").write_text("A=a\nB=a\n")
+    (tmp_path / "b.ini").write_text("[DEFAULT]\nB = b\n")
+
+    environ = FileEnviron([tmp_path / "a.env", tmp_path / "b.ini", tmp_path / "missing.env"])
+    assert dict(environ) == {"A": "a", "B": "b"}
+    assert environ.get("C") is None
+    assert "A" in environ
+
+
+def test_file_environ_checks_files_once_per_interval(tmp_path):
+    path = tmp_path / "a.env"
+    path.write_text("A=1\n")
+
+    environ = FileEnviron([path], check_interval=3600)
+    assert environ["A"] == "1"
+
+    path.write_text("A=22\n")
+    assert environ["A"] == "1"
+
+    environ.check_interval = 0
+    environ._next_check = None
+    assert environ["A"] == "22"
+
+
+@pytest.fixture
+def file_profile_cls(tmp_path):
+    profile_loaders.register("test-files", FileProfileLoader([tmp_path / "profiles.env"], check_interval=0))
+
+    @envvar_profile_cls(profile_root="warehouse", profile_live_loader="test-files", profile_cache_values=True)
+    class FileWarehouseProfile:
+        host: str = "localhost"
+        username: str
+        port: int = 5432
+
+    yield FileWarehouseProfile
+    profile_loaders.unregister("test-files")
+
+
+def test_file_profile_loader(tmp_path, monkeypatch, file_profile_cls):
+    path = tmp_path / "profiles.env"
+    path.write_text(
+        "WAREHOUSE_USERNAME=default-user\n"
+        "WAREHOUSE_PRODUCTION_HOST=production-host\n"
+        "WAREHOUSE_PRODUCTION_PORT=6543\n"
+        "WAREHOUSE_STAGING_PARENT_PROFILE=production\n"
+        "WAREHOUSE_STAGING_USERNAME=staging-user\n"
+    )
+    monkeypatch.setenv("WAREHOUSE_STAGING_HOST", "not-from-environment")
+
+    wp = file_profile_cls()
+    assert wp.to_dict() == {"host": "localhost", "username": "default-user", "port": 5432}
+
+    staging = file_profile_cls(name="staging")
+    assert staging.to_dict() == {"host": "production-host", "username": "staging-user", "port": 6543}
+    assert staging.has_prop_value("host")
+
+    monkeypatch.setenv("WAREHOUSE_PROFILE", "staging")
+    observed_environ.refresh()
+    assert wp.host == "production-host"
+
+    frozen = file_profile_cls.load("staging")
+    assert frozen.to_dict() == staging.to_dict()
+
+    path.write_text("WAREHOUSE_STAGING_HOST=new-host\n")
+    os.utime(path, ns=(1, 1))
+    assert staging.host == "new-host"
+    assert staging.username is None
+
+    with pytest.raises(TypeError):
+        staging.host = "x"
+
+
+def test_ini_defaults_are_not_copied_to_sections():
+    values = parse_ini("[DEFAULT]\ntimeout = 5\n[warehouse_staging]\nhost = staging-host\n")
+    assert values == {"TIMEOUT": "5", "WAREHOUSE_STAGING_HOST": "staging-host"}
+
+
+def test_profiles_are_listed_from_files(tmp_path, monkeypatch, file_profile_cls):
+    (tmp_path / "profiles.env").write_text(
+        "WAREHOUSE_PRODUCTION_HOST=production-host\n"
+        "WAREHOUSE_STAGING_PARENT_PROFILE=production\n"
+    )
+    monkeypatch.setenv("WAREHOUSE_OTHER_HOST", "not-from-files")
+    assert file_profile_cls.list_profiles() == ["production", "staging"]
+    assert file_profile_cls.load_all()["staging"].host == "production-host"
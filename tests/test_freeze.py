@@ -0,0 +1,46 @@
+import collections
+
+from tests.warehouse_profile import WarehouseProfile
+from wr_profiles import observed_environ
+
+
+def test_freeze_reads_each_property_envvar_at_most_once(chain_envvars, monkeypatch):
+    reads = collections.Counter()
+    get = observed_environ.get
+    monkeypatch.setattr(observed_environ, "get", lambda key, default=None: reads.update([key]) or get(key, default))
+
+    profile = WarehouseProfile.load("staging")
+    assert profile._const_values == {
+        "host": "production-host",
+        "username": "staging-username",
+        "password": "base-password",
+    }
+    assert max(n for k, n in reads.items() if not k.endswith("_PARENT_PROFILE")) == 1
+    assert "WAREHOUSE_BASE_PASSWORD" in reads
+
+
+def test_freeze_respects_const_values_and_const_parent(chain_envvars):
+    profile = WarehouseProfile.load("staging", parent_name="sandbox", values={"password": "const-password"})
+    assert profile._const_values == {
+        "host": "sandbox-host",
+        "username": "staging-username",
+        "password": "const-password",
+    }
+
+
+def test_has_prop_value_of_frozen_profile(chain_envvars):
+    profile = WarehouseProfile.load("staging")
+    assert profile.has_prop_value("username")
+    assert profile.has_prop_value(WarehouseProfile.password)
+    assert not WarehouseProfile.load("sandbox").has_prop_value("username")
+
+
+def test_freeze_of_unnamed_profile_uses_active_profile(chain_envvars, monkeypatch):
+    monkeypatch.setenv("WAREHOUSE_PROFILE", "production")
+    profile = WarehouseProfile.load()
+    assert profile.profile_name is None
+    assert profile._const_values == {
+        "host": "production-host",
+        "username": "production-username",
+        "password": "base-password",
+    }
@@ -0,0 +1,107 @@
+import os
+import subprocess
+import sys
+import typing
+
+import pytest
+
+import wr_profiles
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(wr_profiles.__file__)))
+
+# Standard library modules that envvar_profile imported in 4.2.1. Importing envvar_profile may take
+# at most IMPORT_TIME_RATIO_BUDGET times as long as importing them, both measured on the machine running
+# the tests. Measured on a developer machine: 4.2.1 about 1.2, with deferred imports about 1.3,
+# with everything imported eagerly about 1.8.
+BASELINE_IMPORTS = "import abc, collections.abc, contextlib, enum, functools, operator, os, re, typing"
+IMPORT_TIME_RATIO_BUDGET = 1.6
+
+
+def run_python(code: str, *options: str, env: dict = None) -> subprocess.CompletedProcess:
+    env = dict(os.environ if env is None else env, PYTHONPATH=package_dir)
+    return subprocess.run(
+        [sys.executable, *options, "-c", code], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True,
+    )
+
+
+def parse_importtime(output: str) -> typing.List[typing.Tuple[int, int, str]]:
+    """
+    Returns (nesting level, cumulative microseconds, module name) of every import reported by ``-X importtime``.
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        imports.append(((len(name) - len(name.lstrip()) - 1) // 2, int(cumulative_us), name.strip()))
+    return imports
+
+
+def measure_imports(codes: typing.Sequence[str], env: dict, runs: int = 7) -> typing.List[int]:
+    """
+    Returns the best of runs of cumulative microseconds spent in top-level imports of each code.
+    Runs of the codes are interleaved so that they see the same load of the machine.
+    """
+    startup = {name for _, _, name in parse_importtime(run_python("pass", "-X", "importtime", env=env).stderr)}
+    best = [None] * len(codes)
+    for _ in range(runs):
+        for i, code in enumerate(codes):
+            imports = parse_importtime(run_python(code, "-X", "importtime", env=env).stderr)
+            total = sum(us for level, us, name in imports if level == 0 and name not in startup)
+            best[i] = total if best[i] is None else min(best[i], total)
+    return best
+
+
+def test_package_import_imports_only_profile_modules():
+    loaded = run_python("import sys, wr_profiles; print(' '.join(sorted(sys.modules)))").stdout.split()
+    assert [m for m in loaded if m.startswith("wr_profiles")] == [
+        "wr_profiles", "wr_profiles.environ", "wr_profiles.envvar_profile",
+    ]
+
+
+@pytest.mark.parametrize("module", [
+    "asyncio", "bisect", "concurrent.futures", "contextvars", "datetime", "decimal", "json", "pathlib", "threading",
+    "tomllib", "wr_profiles.aio", "wr_profiles.instrumentation", "wr_profiles.secret_store",
+])
+def test_heavy_modules_are_imported_on_first_use(module):
+    loaded = run_python(
+        "import sys\n"
+        "from wr_profiles import envvar_profile_cls\n"
+        "@envvar_profile_cls\n"
+        "class Warehouse:\n"
+        "    host: str = 'localhost'\n"
+        "    port: int = 5432\n"
+        "Warehouse().to_dict()\n"
+        "print(' '.join(sorted(sys.modules)))"
+    ).stdout.split()
+    assert module not in loaded
+
+
+def test_lazy_attributes():
+    assert "EnvvarProfile" in dir(wr_profiles)
+    assert set(wr_profiles.__all__) <= set(dir(wr_profiles))
+    assert callable(wr_profiles.envvar_profile)
+    assert wr_profiles.default_secret_store.__class__.__name__ == "SecretStore"
+    with pytest.raises(AttributeError):
+        wr_profiles.nonexistent
+
+
+def test_submodules_are_not_hidden():
+    import wr_profiles.converters
+    import wr_profiles.secret_store
+
+    assert wr_profiles.converters.Json is wr_profiles.Json
+    assert wr_profiles.secret_store.default_secret_store is wr_profiles.default_secret_store
+    assert callable(wr_profiles.envvar_profile)
+
+
+def test_import_time_budget(tmpdir):
+    # Compiling sources would dominate the timings, so bytecode is written (to a cache of its own
+    # on Python 3.8+) and the first import isn't measured.
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=str(tmpdir))
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    run_python("import wr_profiles.envvar_profile", env=env)
+
+    baseline_us, envvar_profile_us = measure_imports([BASELINE_IMPORTS, "import wr_profiles.envvar_profile"], env)
+    assert envvar_profile_us < baseline_us * IMPORT_TIME_RATIO_BUDGET
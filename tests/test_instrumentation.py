@@ -0,0 +1,75 @@
+import pytest
+
+from tests.test_observed_environ import CachedWarehouseProfile
+from tests.warehouse_profile import WarehouseProfile
+from wr_profiles import ProfileStats, get_profile_loader
+
+
+@pytest.fixture
+def stats():
+    stats = ProfileStats()
+    get_profile_loader("live").instrument(stats)
+    get_profile_loader("frozen").instrument(stats)
+    yield stats
+    get_profile_loader("live").instrument(None)
+    get_profile_loader("frozen").instrument(None)
+
+
+def test_loaders_are_not_instrumented_by_default():
+    assert WarehouseProfile()._loader.stats is None
+    assert WarehouseProfile(profile_is_live=False)._loader.stats is None
+
+
+def test_live_reads_are_recorded(stats, monkeypatch):
+    monkeypatch.setenv("WAREHOUSE_STAGING_PARENT_PROFILE", "production")
+    monkeypatch.setenv("WAREHOUSE_PRODUCTION_USERNAME", "production-username")
+
+    profile = WarehouseProfile(name="staging", values={"password": "const-password"})
+    assert profile.username == "production-username"
+    assert profile.password == "const-password"
+    assert profile.host == "localhost"
+    assert profile.to_dict()["username"] == "production-username"
+
+    exported = stats.to_dict()
+    assert set(exported) == {"WarehouseProfile.username", "WarehouseProfile.password", "WarehouseProfile.host"}
+
+    username = exported["WarehouseProfile.username"]
+    assert username["reads"] == 2
+    assert username["envvar_probes"] == 4
+    assert username["sources"] == {"envvar@production": 2}
+    assert sum(username["latency_us"].values()) == 2
+    assert list(username["latency_us"])[-1] == "inf"
+    assert username["total_latency_us"] > 0
+    assert username["cache_hits"] == username["cache_misses"] == 0
+
+    assert exported["WarehouseProfile.password"]["sources"] == {"values@staging": 2}
+    assert exported["WarehouseProfile.password"]["envvar_probes"] == 0
+    assert exported["WarehouseProfile.host"]["sources"] == {"default": 2}
+
+    stats.reset()
+    assert stats.to_dict() == {}
+
+
+def test_cache_hits_and_misses_are_recorded(stats):
+    profile = CachedWarehouseProfile()
+    profile.username = "username"
+    assert profile.username == "username"
+    assert profile.username == "username"
+    assert profile.password is None
+    assert profile.password is None
+
+    exported = stats.to_dict()
+    assert exported["CachedWarehouseProfile.username"]["cache_misses"] == 1
+    assert exported["CachedWarehouseProfile.username"]["cache_hits"] == 1
+    assert exported["CachedWarehouseProfile.username"]["sources"] == {"envvar": 1, "cache": 1}
+    assert exported["CachedWarehouseProfile.password"]["sources"] == {"default": 2}
+
+
+def test_frozen_reads_are_recorded(stats):
+    profile = WarehouseProfile.load("staging", values={"username": "u"}, defaults={"host": "h"})
+    assert profile.to_dict() == {"host": "h", "username": "u", "password": None}
+
+    exported = stats.to_dict()
+    assert exported["WarehouseProfile.username"]["sources"] == {"values@staging": 1}
+    assert exported["WarehouseProfile.host"]["sources"] == {"defaults@staging": 1}
+    assert exported["WarehouseProfile.password"]["sources"] == {"default": 1}
@@ -0,0 +1,59 @@
+import pytest
+
+from tests.warehouse_profile import WarehouseProfile
+from wr_profiles import envvar_profile_cls, observed_environ
+
+
+def test_list_profiles(chain_envvars, monkeypatch):
+    # Environment variables of the unnamed profile don't name profiles
+    monkeypatch.setenv("WAREHOUSE_PROFILE", "staging")
+    monkeypatch.setenv("WAREHOUSE_HOST", "default-host")
+    assert WarehouseProfile.list_profiles() == ["base", "production", "sandbox", "staging"]
+
+
+def test_load_all_matches_load(chain_envvars):
+    profiles = WarehouseProfile.load_all()
+    assert list(profiles) == ["base", "production", "sandbox", "staging"]
+
+    for name, profile in profiles.items():
+        assert not profile.profile_is_live
+        assert profile.profile_name == name
+        assert profile._const_values == WarehouseProfile.load(name)._const_values
+
+    assert profiles["staging"].to_dict() == {
+        "host": "production-host",
+        "username": "staging-username",
+        "password": "base-password",
+    }
+    assert profiles["sandbox"].to_dict() == {
+        "host": "sandbox-host",
+        "username": None,
+        "password": None,
+    }
+
+
+def test_load_all_detects_parent_cycles(monkeypatch):
+    monkeypatch.setenv("WAREHOUSE_A_PARENT_PROFILE", "b")
+    monkeypatch.setenv("WAREHOUSE_B_PARENT_PROFILE", "a")
+
+    with pytest.raises(ValueError):
+        WarehouseProfile.load_all()
+
+
+def test_direct_changes_are_seen(monkeypatch):
+    assert WarehouseProfile.list_profiles() == []
+    monkeypatch.setenv("WAREHOUSE_STAGING_HOST", "staging-host")
+    assert WarehouseProfile.list_profiles() == ["staging"]
+    assert WarehouseProfile.load_all()["staging"].host == "staging-host"
+
+
+def test_index_is_cached_with_profile_cache_values(monkeypatch):
+    @envvar_profile_cls(profile_root="warehouse", profile_cache_values=True)
+    class CachingWarehouseProfile:
+        host: str
+
+    assert CachingWarehouseProfile.list_profiles() == []
+    monkeypatch.setenv("WAREHOUSE_STAGING_HOST", "staging-host")
+    assert CachingWarehouseProfile.list_profiles() == []
+    observed_environ.refresh()
+    assert CachingWarehouseProfile.list_profiles() == ["staging"]
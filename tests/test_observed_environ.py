@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+from tests.warehouse_profile import WarehouseProfile
+from wr_profiles import Environment, ObservedEnviron, envvar_profile_cls, observed_environ
+
+
+@envvar_profile_cls(profile_root="warehouse", profile_cache_values=True)
+class CachedWarehouseProfile:
+    host: str = "localhost"
+    username: str
+    password: str
+
+
+def test_modifications_increment_generation():
+    target = {}
+    environ = ObservedEnviron(target)
+    generation = environ.generation
+
+    environ["A"] = "a"
+    assert target == {"A": "a"}
+    assert environ.generation > generation
+
+    generation = environ.generation
+    del environ["A"]
+    assert target == {}
+    assert environ.generation > generation
+
+    generation = environ.generation
+    assert environ.get("A") is None
+    assert "A" not in environ
+    assert environ.generation == generation
+
+
+def test_detect_changes():
+    target = {"A": "a"}
+    environ = ObservedEnviron(target)
+    environ.detect_changes()
+
+    generation = environ.generation
+    assert not environ.detect_changes()
+    assert environ.generation == generation
+
+    target["A"] = "b"
+    assert environ.detect_changes()
+    assert environ.generation > generation
+
+
+def test_live_values_are_not_cached_by_default(monkeypatch):
+    wp = WarehouseProfile()
+    assert wp.username is None
+
+    monkeypatch.setenv("WAREHOUSE_USERNAME", "username")
+    assert wp.username == "username"
+
+
+def test_cached_values_are_reused_until_refresh(monkeypatch):
+    wp = CachedWarehouseProfile()
+    assert wp.username is None
+
+    monkeypatch.setenv("WAREHOUSE_USERNAME", "username")
+    assert wp.username is None
+
+    observed_environ.refresh()
+    assert wp.username == "username"
+
+
+@pytest.mark.parametrize("use_monkeypatch", [True, False])
+def test_cached_values_are_invalidated_by_wr_profiles_modifications(use_monkeypatch, monkeypatch):
+    wp = CachedWarehouseProfile()
+    assert wp.username is None
+
+    wp.username = "first"
+    assert wp.username == "first"
+    assert os.environ["WAREHOUSE_USERNAME"] == "first"
+
+    env = Environment(WAREHOUSE_USERNAME="second")
+    with env.applied(monkeypatch if use_monkeypatch else None):
+        assert wp.username == "second"
+    assert wp.username == "first"
+
+    monkeypatch.setenv("WAREHOUSE_STAGING_USERNAME", "staging")
+    observed_environ.refresh()
+    wp.activate("staging")
+    assert wp.username == "staging"
+
+    wp.activate(None)
+    assert wp.username == "first"
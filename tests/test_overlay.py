@@ -0,0 +1,230 @@
+import asyncio
+import contextlib
+import os
+import threading
+
+import pytest
+
+from tests.test_async import run
+from tests.test_observed_environ import CachedWarehouseProfile
+from tests.warehouse_profile import WarehouseProfile
+from wr_profiles import Environment, ObservedEnviron, observed_environ
+from wr_profiles.environ import overlays_available
+
+pytestmark = pytest.mark.skipif(not overlays_available(), reason="overlays require contextvars")
+
+
+def test_overlay_sets_and_unsets_without_touching_target():
+    target = {"A": "a", "B": "b"}
+    environ = ObservedEnviron(target)
+
+    with environ.overlay({"A": "x", "B": None, "C": "c"}):
+        assert environ["A"] == "x"
+        assert "B" not in environ
+        assert environ.get("B", "default") == "default"
+        assert environ.get("C") == "c"
+        assert dict(environ) == {"A": "x", "C": "c"}
+        assert len(environ) == 2
+        with pytest.raises(KeyError):
+            environ["B"]
+
+    assert target == {"A": "a", "B": "b"}
+    assert dict(environ) == target
+
+
+def test_modifications_within_overlay_are_discarded():
+    target = {"A": "a"}
+    environ = ObservedEnviron(target)
+
+    with environ.overlay({}):
+        environ["A"] = "x"
+        environ["B"] = "b"
+        del environ["A"]
+        assert dict(environ) == {"B": "b"}
+        with pytest.raises(KeyError):
+            del environ["A"]
+
+    assert target == {"A": "a"}
+    assert dict(environ) == {"A": "a"}
+
+
+def test_nested_overlays():
+    environ = ObservedEnviron({"A": "a"})
+    with environ.overlay({"A": "1", "B": "1"}):
+        with environ.overlay({"A": "2"}):
+            assert (environ["A"], environ["B"]) == ("2", "1")
+        assert (environ["A"], environ["B"]) == ("1", "1")
+    assert dict(environ) == {"A": "a"}
+
+
+def test_state_changes_with_overlay():
+    environ = ObservedEnviron({})
+    state = environ.state
+    with environ.overlay({"A": "a"}):
+        overlaid_state = environ.state
+        assert overlaid_state != state
+        environ["A"] = "b"
+        assert environ.state != overlaid_state
+    assert environ.state == state
+
+
+def test_nested_overlays_hold_only_changed_values():
+    environ = ObservedEnviron({"A": "a", "B": "b"})
+    with environ.overlay({"A": "1", "B": None}):
+        with environ.overlay({"A": "1", "B": None, "C": "c"}):
+            assert environ._overlay.get().values == {"C": "c"}
+            assert dict(environ) == {"A": "1", "C": "c"}
+
+
+def test_nested_overlay_without_changes_keeps_state():
+    environ = ObservedEnviron({"A": "a"})
+    state = environ.state
+    with environ.overlay({"A": "b"}):
+        changed_state = environ.state
+        assert changed_state != state
+        with environ.overlay({"A": "b"}):
+            assert environ.state == changed_state
+            environ["A"] = "c"
+            assert environ.state != changed_state
+            assert environ["A"] == "c"
+        assert environ.state == changed_state
+        assert environ["A"] == "b"
+    assert environ.state == state
+    assert environ["A"] == "a"
+
+
+def iter_overlay_values(environ):
+    overlay = environ._overlay.get()
+    while overlay is not None:
+        yield overlay.values
+        overlay = overlay.parent
+
+
+def test_deeply_nested_overlays():
+    environ = ObservedEnviron({"A": "a"})
+    with contextlib.ExitStack() as stack:
+        for i in range(100):
+            stack.enter_context(environ.overlay({f"K{i}": str(i), "A": str(i)}))
+        assert environ["A"] == "99"
+        assert environ["K0"] == "0"
+        assert len(environ) == 101
+        assert len(list(iter_overlay_values(environ))) <= environ._overlay.get().max_depth
+    assert dict(environ) == {"A": "a"}
+
+
+def test_activated_is_scoped_to_block():
+    wp = WarehouseProfile()
+    staging = WarehouseProfile(name="staging")
+
+    with staging.activated():
+        assert wp.profile_name == "staging"
+        assert staging.profile_is_active
+        assert "WAREHOUSE_PROFILE" not in os.environ
+
+    assert wp.profile_name is None
+    assert not staging.profile_is_active
+
+
+def test_environment_applied_as_overlay(monkeypatch):
+    monkeypatch.setenv("WAREHOUSE_HOST", "default-host")
+    monkeypatch.setenv("WAREHOUSE_STAGING_USERNAME", "staging-user")
+    observed_environ.refresh()
+
+    wp = WarehouseProfile()
+    env = WarehouseProfile(name="staging").create_env(host="staging-host")
+
+    with env.applied(overlay=True):
+        assert wp.profile_name == "staging"
+        assert wp.host == "staging-host"
+        assert wp.username == "staging-user"
+        assert os.environ["WAREHOUSE_HOST"] == "default-host"
+        assert "WAREHOUSE_STAGING_HOST" not in os.environ
+
+    assert wp.profile_name is None
+    assert wp.host == "default-host"
+
+
+def test_environment_applied_sets_only_changed_values():
+    context = {"A": "a", "B": "b"}
+    calls = []
+
+    def setenv(k, v):
+        calls.append(("set", k, v))
+        context[k] = v
+
+    def delenv(k):
+        calls.append(("del", k))
+        context.pop(k, None)
+
+    generation = observed_environ.generation
+    with Environment(A="a", B="x", C=None).applied(setenv=setenv, delenv=delenv, getenv=context.__getitem__):
+        assert context == {"A": "a", "B": "x"}
+        assert calls == [("set", "B", "x")]
+    assert context == {"A": "a", "B": "b"}
+    assert calls == [("set", "B", "x"), ("set", "B", "b")]
+    assert observed_environ.generation != generation
+
+    generation = observed_environ.generation
+    with Environment(A="a", C=None).applied(context=context):
+        pass
+    assert observed_environ.generation == generation
+
+
+def test_environment_applied_as_overlay_rejects_context():
+    with pytest.raises(ValueError):
+        with Environment(A="a").applied(context={}, overlay=True):
+            pass
+
+
+def test_cached_values_follow_overlay():
+    wp = CachedWarehouseProfile()
+    assert wp.host == "localhost"
+
+    with Environment(WAREHOUSE_HOST="overlaid").applied(overlay=True):
+        assert wp.host == "overlaid"
+
+    assert wp.host == "localhost"
+
+
+def test_list_profiles_sees_overlay():
+    with Environment(WAREHOUSE_STAGING_HOST="staging-host").applied(overlay=True):
+        assert WarehouseProfile.list_profiles() == ["staging"]
+    assert WarehouseProfile.list_profiles() == []
+
+
+def test_threads_see_their_own_active_profiles():
+    wp = CachedWarehouseProfile()
+    names = ["p0", "p1", "p2", "p3"]
+    barrier = threading.Barrier(len(names))
+    results = {}
+
+    def work(name):
+        env = Environment(WAREHOUSE_PROFILE=name, **{f"WAREHOUSE_{name.upper()}_HOST": f"{name}-host"})
+        with env.applied(overlay=True):
+            barrier.wait()
+            results[name] = (wp.profile_name, wp.host)
+            barrier.wait()
+
+    threads = [threading.Thread(target=work, args=(name,)) for name in names]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {name: (name, f"{name}-host") for name in names}
+    assert wp.profile_name is None
+
+
+def test_asyncio_tasks_see_their_own_active_profiles():
+    wp = WarehouseProfile()
+
+    async def work(name):
+        with WarehouseProfile(name=name).activated():
+            await asyncio.sleep(0)
+            return wp.profile_name
+
+    async def main():
+        return await asyncio.gather(*(work(f"p{i}") for i in range(100)))
+
+    assert run(main()) == [f"p{i}" for i in range(100)]
+    assert wp.profile_name is None
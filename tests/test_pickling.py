@@ -0,0 +1,119 @@
+import concurrent.futures
+import multiprocessing
+import pickle
+
+import pytest
+
+from tests.warehouse_profile import WarehouseProfile
+from wr_profiles import CompactProfile, ProfileSnapshot, SharedProfileSnapshot, envvar_profile, envvar_profile_cls
+from wr_profiles.snapshots import _uses_running_resource_tracker, encode_snapshot
+
+start_methods = multiprocessing.get_all_start_methods()
+
+
+@envvar_profile_cls(profile_root="warehouse")
+class DelegatingWarehouseProfile:
+    host: str = "localhost"
+    username: str
+
+
+def round_trip(obj):
+    return pickle.loads(pickle.dumps(obj))
+
+
+def test_frozen_profile_is_pickled_as_class_and_values(chain_envvars):
+    sandbox = WarehouseProfile.load("sandbox", defaults={"password": "default-password"})
+    data = pickle.dumps(sandbox)
+    assert b"_loader" not in data
+    assert b"_value_cache" not in data
+
+    restored = pickle.loads(data)
+    assert type(restored) is WarehouseProfile
+    assert not restored.profile_is_live
+    assert restored.profile_name == "sandbox"
+    assert restored.to_dict() == sandbox.to_dict()
+    assert restored.has_prop_value("host")
+    assert not restored.has_prop_value("password")
+
+
+def test_live_profile_reads_environment_after_unpickling(chain_envvars, monkeypatch):
+    staging = WarehouseProfile(name="staging", values={"password": "const-password"})
+    data = pickle.dumps(staging)
+
+    monkeypatch.setenv("WAREHOUSE_STAGING_USERNAME", "changed-username")
+
+    restored = pickle.loads(data)
+    assert restored.profile_is_live
+    assert restored.to_dict() == {
+        "host": "production-host", "username": "changed-username", "password": "const-password",
+    }
+
+
+def test_other_instance_attributes_are_pickled():
+    profile = DelegatingWarehouseProfile.load("staging", values={"host": "staging-host"})
+    profile.profile_delegate = {"a": 1}
+    assert round_trip(profile).profile_delegate == {"a": 1}
+
+
+def test_compact_profile(chain_envvars):
+    compact = WarehouseProfile.load("staging", compact=True)
+    restored = round_trip(compact)
+    assert isinstance(restored, CompactProfile)
+    assert type(restored) is type(compact)
+    assert restored == compact
+
+
+def test_inline_profile():
+    profile = envvar_profile("inline", host="localhost", port="5432")
+    assert type(round_trip(profile)) is type(profile)
+
+    frozen = profile.load("staging", values={"port": "6543"})
+    assert round_trip(frozen).to_dict() == {"host": "localhost", "port": "6543"}
+
+
+def resolve_in_worker(profile):
+    return profile.to_dict()
+
+
+def read_snapshot_in_worker(snapshot):
+    return snapshot["warehouse", "staging"].to_dict(), len(snapshot)
+
+
+def test_profiles_are_passed_to_process_pool(chain_envvars):
+    profiles = [WarehouseProfile.load("staging"), WarehouseProfile.load("production", compact=True)]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(resolve_in_worker, profiles))
+    assert results == [profile.to_dict() for profile in profiles]
+
+
+def test_profile_snapshot(chain_envvars):
+    profiles = [WarehouseProfile.load(name) for name in ("staging", "production")]
+    snapshot = ProfileSnapshot(encode_snapshot(profiles + [WarehouseProfile.load("staging", compact=True)]))
+
+    assert list(snapshot) == [("warehouse", "staging"), ("warehouse", "production")]
+    assert isinstance(snapshot["warehouse", "staging"], CompactProfile)
+    assert snapshot["warehouse", "production"].to_dict() == profiles[1].to_dict()
+    assert ("warehouse", "other") not in snapshot
+    with pytest.raises(KeyError):
+        snapshot["warehouse", "other"]
+
+    with pytest.raises(ValueError):
+        ProfileSnapshot(b"\0" * 64)
+
+
+@pytest.mark.parametrize("start_method", [m for m in ("fork", "spawn", "forkserver") if m in start_methods])
+def test_shared_profile_snapshot(chain_envvars, start_method):
+    staging = WarehouseProfile.load("staging")
+    with SharedProfileSnapshot.create([staging, WarehouseProfile.load("production")]) as snapshot:
+        assert len(pickle.dumps(snapshot)) < 200
+        context = multiprocessing.get_context(start_method)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=2, mp_context=context) as executor:
+            results = list(executor.map(read_snapshot_in_worker, [snapshot] * 4))
+        assert results == [(staging.to_dict(), 2)] * 4
+        assert snapshot["warehouse", "staging"].to_dict() == staging.to_dict()
+
+
+def test_resource_tracker_check_falls_back_without_private_attributes(monkeypatch):
+    resource_tracker = pytest.importorskip("multiprocessing.resource_tracker")
+    monkeypatch.delattr(resource_tracker._resource_tracker, "_fd", raising=False)
+    assert not _uses_running_resource_tracker()
@@ -29,3 +29,17 @@ def test_profile_delegate_as_property(monkeypatch):
     monkeypatch.setenv("WAREHOUSE_P1_HOST", "p1.host")
     assert config.host == "p1.host"
     assert config["host"] == "p1.host"
+
+
+def test_delegation_is_only_installed_on_classes_with_profile_delegate():
+    assert WarehouseProfile.__getattribute__ is object.__getattribute__
+
+    class WarehouseConfig(WarehouseProfile):
+        profile_delegate = WarehouseProfile(name="p2")
+
+    class DerivedWarehouseConfig(WarehouseConfig):
+        pass
+
+    assert WarehouseConfig.__getattribute__ is not object.__getattribute__
+    assert DerivedWarehouseConfig().profile_name == "p2"
+    assert WarehouseProfile().profile_name is None
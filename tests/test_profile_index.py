@@ -0,0 +1,70 @@
+from tests.warehouse_profile import WarehouseProfile
+from wr_profiles import envvar_profile_cls, observed_environ
+from wr_profiles.environ import ObservedEnviron, ProfileIndex
+
+
+def test_profile_index_groups_envvars_by_profile_and_property():
+    index = ProfileIndex("warehouse", ["host", "db_host", "password"], {
+        "WAREHOUSE_HOST": "default-host",
+        "WAREHOUSE_PROFILE": "staging",
+        "WAREHOUSE_STAGING_HOST": "staging-host",
+        "WAREHOUSE_STAGING_DB_HOST": "staging-db-host",
+        "WAREHOUSE_STAGING_PARENT_PROFILE": "production",
+        "WAREHOUSE_PRODUCTION_PASWORD": "typo",
+        "WAREHOUSE_SANDBOX_PARENT_PROFILE": "",
+        "WAREHOUSES_HOST": "other-root",
+        "OTHER": "other",
+    }, ignore=["WAREHOUSE_PROFILE"])
+
+    assert index.values == {
+        None: {"host": "default-host"},
+        "staging": {"host": "staging-host", "db_host": "staging-db-host"},
+    }
+    assert index.parents == {"staging": "production"}
+    assert index.unknown == {"WAREHOUSE_PRODUCTION_PASWORD": "typo"}
+    assert index.profile_names == ["production", "staging"]
+    assert index.get_values("production") == {}
+
+
+def test_index_is_reused_until_generation_changes():
+    target = {"WAREHOUSE_STAGING_HOST": "staging-host", "WAREHOUSE_X": "x"}
+    environ = ObservedEnviron(target)
+
+    index = environ.get_profile_index("warehouse", ["host"])
+    assert index.get_values("staging") == {"host": "staging-host"}
+    assert environ.get_profile_index("warehouse", ["host"]) is index
+
+    target["WAREHOUSE_PRODUCTION_HOST"] = "production-host"
+    assert environ.get_profile_index("warehouse", ["host"]) is index
+
+    environ.refresh()
+    assert environ.get_profile_index("warehouse", ["host"]).get_values("production") == {"host": "production-host"}
+
+    environ["WAREHOUSE_SANDBOX_HOST"] = "sandbox-host"
+    assert environ.get_profile_index("warehouse", ["host"]).get_values("sandbox") == {"host": "sandbox-host"}
+
+
+def test_roots_sharing_first_component():
+    environ = ObservedEnviron({"THE_LETTERS_A": "a", "THE_NUMBERS_ONE": "1"})
+    assert environ.get_profile_index("the_letters", ["a"]).values == {None: {"a": "a"}}
+    assert environ.get_profile_index("the_numbers", ["one"]).values == {None: {"one": "1"}}
+
+
+def test_get_unknown_envvars(monkeypatch):
+    @envvar_profile_cls(profile_root="warehouse", profile_activating_envvar="WAREHOUSE_TEST_PROFILE")
+    class WarehouseTestProfile(WarehouseProfile):
+        pass
+
+    monkeypatch.setenv("WAREHOUSE_PROFILE", "staging")
+    monkeypatch.setenv("WAREHOUSE_TEST_PROFILE", "staging")
+    monkeypatch.setenv("WAREHOUSE_STAGING_USERNAME", "username")
+    monkeypatch.setenv("WAREHOUSE_STAGING_USERMANE", "typo")
+    observed_environ.refresh()
+
+    assert WarehouseProfile.get_unknown_envvars() == {
+        "WAREHOUSE_STAGING_USERMANE": "typo",
+        "WAREHOUSE_TEST_PROFILE": "staging",
+    }
+    assert WarehouseTestProfile.get_unknown_envvars() == {
+        "WAREHOUSE_STAGING_USERMANE": "typo",
+    }
@@ -0,0 +1,122 @@
+import pytest
+
+from wr_profiles import EnvvarProfile, envvar_profile_cls, get_profile_loader, profile_loaders
+from wr_profiles.envvar_profile import FrozenProfileLoader, LiveProfileLoader
+
+
+class UppercaseLoader(LiveProfileLoader):
+    def get_prop_value(self, profile, prop, default=...):
+        value = super().get_prop_value(profile, prop)
+        return value.upper() if isinstance(value, str) else value
+
+
+profile_loaders.register("test-uppercase", UppercaseLoader())
+
+
+@envvar_profile_cls(profile_root="warehouse", profile_live_loader="test-uppercase")
+class UppercaseWarehouseProfile:
+    host: str = "localhost"
+    username: str
+
+
+def test_builtin_loaders_are_registered():
+    assert isinstance(get_profile_loader("live"), LiveProfileLoader)
+    assert isinstance(get_profile_loader("frozen"), FrozenProfileLoader)
+    assert {"live", "frozen"} <= set(profile_loaders.names)
+
+
+def test_unknown_loader():
+    assert "nonexistent" not in profile_loaders
+    with pytest.raises(KeyError) as exc_info:
+        get_profile_loader("nonexistent")
+    assert "nonexistent" in str(exc_info.value)
+
+
+def test_register_requires_profile_loader():
+    with pytest.raises(TypeError):
+        profile_loaders.register("test-invalid", object())
+
+
+def test_profile_class_selects_loader_by_name(monkeypatch):
+    monkeypatch.setenv("WAREHOUSE_USERNAME", "alice")
+
+    wp = UppercaseWarehouseProfile()
+    assert wp._loader is get_profile_loader("test-uppercase")
+    assert wp.host == "LOCALHOST"
+    assert wp.username == "ALICE"
+
+    frozen = UppercaseWarehouseProfile.load()
+    assert frozen._loader is get_profile_loader("frozen")
+    assert frozen.username == "alice"
+
+
+def test_loader_is_resolved_when_profile_is_created():
+    wp = UppercaseWarehouseProfile()
+    loader = wp._loader
+
+    profile_loaders.register("test-uppercase", LiveProfileLoader())
+    try:
+        assert wp._loader is loader
+        assert UppercaseWarehouseProfile()._loader is get_profile_loader("test-uppercase")
+    finally:
+        profile_loaders.register("test-uppercase", loader)
+
+
+def test_unregister(monkeypatch):
+    monkeypatch.setenv("WAREHOUSE_STAGING_PARENT_PROFILE", "production")
+    loader = LiveProfileLoader()
+    profile_loaders.register("test-unregister", loader)
+
+    @envvar_profile_cls(profile_root="warehouse", profile_live_loader="test-unregister")
+    class Profile:
+        host: str = "localhost"
+
+    staging = Profile(name="staging")
+    assert staging._profile_parent._loader is loader
+    assert any(key[3] is loader for key in EnvvarProfile._shared_profiles)
+
+    assert profile_loaders.unregister("test-unregister") is loader
+    assert "test-unregister" not in profile_loaders
+    assert not any(key[3] is loader for key in EnvvarProfile._shared_profiles)
+    assert staging.host == "localhost"
+    with pytest.raises(KeyError):
+        Profile()
+    with pytest.raises(KeyError):
+        profile_loaders.unregister("test-unregister")
+
+
+def test_unknown_loader_name_fails_on_creation():
+    @envvar_profile_cls(profile_root="warehouse", profile_frozen_loader="nonexistent")
+    class Profile:
+        host: str
+
+    Profile()
+    with pytest.raises(KeyError):
+        Profile(profile_is_live=False)
+
+
+def test_parent_profiles_are_read_through_the_loader_of_the_child(monkeypatch):
+    @envvar_profile_cls(profile_root="warehouse")
+    class Profile:
+        host: str
+
+    monkeypatch.setenv("WAREHOUSE_STAGING_PARENT_PROFILE", "production")
+    assert Profile(name="staging").host is None
+
+    environ = {
+        "WAREHOUSE_STAGING_PARENT_PROFILE": "production",
+        "WAREHOUSE_PRODUCTION_PARENT_PROFILE": "base",
+        "WAREHOUSE_BASE_HOST": "base-host",
+    }
+    loader = get_profile_loader("live")
+    profile_loaders.register("live", LiveProfileLoader(environ))
+    try:
+        staging = Profile(name="staging")
+        assert staging._profile_parent._loader is staging._loader
+        assert staging.host == "base-host"
+        assert Profile(name="production").host == "base-host"
+    finally:
+        profile_loaders.register("live", loader)
+
+    assert Profile(name="staging").host is None
+    assert staging.host == "base-host"
@@ -1,7 +1,7 @@
 import pytest
 
 from tests.warehouse_profile import WarehouseProfile as WP
-from wr_profiles.envvar_profile import EnvvarProfile
+from wr_profiles import get_profile_loader
 
 case_matrix = [
     [(None, None, True), {"parent_profile": None}],
@@ -62,10 +62,43 @@ def test_parent_profile_name(monkeypatch):
 
 
 def test_loaders():
-    assert WP()._loader is EnvvarProfile._profile_loaders["live"]
-    assert WP(profile_is_live=False)._loader is EnvvarProfile._profile_loaders["frozen"]
+    assert WP()._loader is get_profile_loader("live")
+    assert WP(profile_is_live=False)._loader is get_profile_loader("frozen")
 
 
 def test_to_dict():
     assert WP().to_dict() == {"host": "localhost", "username": None, "password": None}
     assert WP(profile_is_live=False).to_dict() == {"host": "localhost", "username": None, "password": None}
+
+
+@pytest.mark.parametrize("profile_is_live", [True, False])
+def test_parent_profile_instances_are_shared(profile_is_live, monkeypatch):
+    monkeypatch.setenv("WAREHOUSE_STAGING_PARENT_PROFILE", "production")
+    monkeypatch.setenv("WAREHOUSE_PRODUCTION_PARENT_PROFILE", "base")
+
+    first = WP(name="staging", parent_name="production", profile_is_live=profile_is_live)
+    second = WP(name="sandbox", parent_name="production", profile_is_live=profile_is_live)
+    assert first._profile_parent is second._profile_parent
+    assert first._profile_parent is first._profile_parent
+    assert [p.profile_name for p in first._get_profile_tree()] == (
+        ["staging", "production", "base"] if profile_is_live else ["staging", "production"]
+    )
+
+
+def test_empty_parent_profile_name_means_no_parent(monkeypatch):
+    monkeypatch.setenv("WAREHOUSE_STAGING_PARENT_PROFILE", "")
+    assert WP(name="staging")._profile_parent_name is None
+    assert WP(name="staging")._profile_parent is None
+
+
+def test_parent_profile_cycle_is_detected(monkeypatch):
+    monkeypatch.setenv("WAREHOUSE_A_PARENT_PROFILE", "b")
+    monkeypatch.setenv("WAREHOUSE_B_PARENT_PROFILE", "a")
+
+    with pytest.raises(ValueError) as exc_info:
+        WP(name="a").host
+    assert "a -> b -> a" in str(exc_info.value)
+
+    monkeypatch.setenv("WAREHOUSE_C_PARENT_PROFILE", "c")
+    with pytest.raises(ValueError):
+        WP(name="c").to_dict()
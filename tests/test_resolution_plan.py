@@ -0,0 +1,47 @@
+from tests.warehouse_profile import WarehouseProfile
+
+
+def test_plan_is_reused_while_parent_chain_is_unchanged(monkeypatch):
+    monkeypatch.setenv("WAREHOUSE_STAGING_PARENT_PROFILE", "production")
+    monkeypatch.setenv("WAREHOUSE_PRODUCTION_USERNAME", "production-username")
+
+    staging = WarehouseProfile(name="staging")
+    loader = staging._loader
+
+    plan = loader.get_plan(staging)
+    assert [p.profile_name for p in plan.parents] == ["production"]
+    assert staging.username == "production-username"
+    assert loader.get_plan(staging) is plan
+    assert loader.get_plan(WarehouseProfile(name="staging")) is plan
+
+
+def test_plan_is_rebuilt_when_parent_profile_envvar_changes(monkeypatch):
+    monkeypatch.setenv("WAREHOUSE_STAGING_PARENT_PROFILE", "production")
+    monkeypatch.setenv("WAREHOUSE_PRODUCTION_USERNAME", "production-username")
+    monkeypatch.setenv("WAREHOUSE_SANDBOX_USERNAME", "sandbox-username")
+
+    staging = WarehouseProfile(name="staging")
+    plan = staging._loader.get_plan(staging)
+    assert staging.username == "production-username"
+
+    monkeypatch.setenv("WAREHOUSE_STAGING_PARENT_PROFILE", "sandbox")
+    assert staging.username == "sandbox-username"
+    assert staging._loader.get_plan(staging) is not plan
+
+    monkeypatch.delenv("WAREHOUSE_STAGING_PARENT_PROFILE")
+    assert staging.username is None
+    assert staging._loader.get_plan(staging).parents == ()
+
+
+def test_plan_follows_activating_envvar(monkeypatch):
+    monkeypatch.setenv("WAREHOUSE_STAGING_HOST", "staging-host")
+    monkeypatch.setenv("WAREHOUSE_PRODUCTION_HOST", "production-host")
+
+    wp = WarehouseProfile()
+    assert wp.host == "localhost"
+
+    monkeypatch.setenv("WAREHOUSE_PROFILE", "staging")
+    assert wp.host == "staging-host"
+
+    monkeypatch.setenv("WAREHOUSE_PROFILE", "production")
+    assert wp.host == "production-host"
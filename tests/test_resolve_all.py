@@ -0,0 +1,38 @@
+import pytest
+
+from tests.warehouse_profile import WarehouseProfile
+
+
+@pytest.fixture
+def staging_envvars(monkeypatch):
+    monkeypatch.setenv("WAREHOUSE_STAGING_PARENT_PROFILE", "production")
+    monkeypatch.setenv("WAREHOUSE_STAGING_USERNAME", "staging-username")
+    monkeypatch.setenv("WAREHOUSE_PRODUCTION_USERNAME", "production-username")
+    monkeypatch.setenv("WAREHOUSE_PRODUCTION_PASSWORD", "production-password")
+
+
+@pytest.mark.parametrize("profile_is_live", [True, False])
+def test_resolve_all_matches_individual_lookups(profile_is_live, staging_envvars):
+    if profile_is_live:
+        profile = WarehouseProfile(name="staging", defaults={"host": "default-host"})
+    else:
+        profile = WarehouseProfile.load("staging", defaults={"host": "default-host"})
+
+    assert profile.resolve_all() == {
+        "host": "default-host",
+        "username": "staging-username",
+        "password": "production-password",
+    }
+    assert profile.resolve_all() == {k: profile[k] for k in profile.profile_properties}
+
+
+def test_live_resolve_all_looks_up_plan_once(staging_envvars, monkeypatch):
+    profile = WarehouseProfile(name="staging")
+    loader = profile._loader
+
+    calls = []
+    get_plan = loader.get_plan
+    monkeypatch.setattr(loader, "get_plan", lambda p: calls.append(p) or get_plan(p))
+
+    profile.to_dict()
+    assert calls == [profile]
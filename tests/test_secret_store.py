@@ -0,0 +1,137 @@
+import pytest
+
+from wr_profiles import (
+    EnvvarProfile, EnvvarProfileProperty, InMemorySecretProvider, SecretStr, default_secret_store, envvar_profile_cls,
+    observed_environ
+)
+from wr_profiles.secret_store import SecretStore
+
+
+@envvar_profile_cls(profile_root="warehouse")
+class SecretWarehouseProfile:
+    host: str = "localhost"
+    username: str = EnvvarProfileProperty(secret=True)
+    password: str = EnvvarProfileProperty(secret=True)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def provider():
+    provider = InMemorySecretProvider({
+        "ref:staging-password": "staging-secret",
+        "ref:production-username": "production-user",
+        "ref:production-password": "production-secret",
+    })
+    default_secret_store.configure(provider)
+    yield provider
+    default_secret_store.configure(None)
+
+
+@pytest.fixture
+def chain_env(monkeypatch):
+    monkeypatch.setenv("WAREHOUSE_STAGING_PARENT_PROFILE", "production")
+    monkeypatch.setenv("WAREHOUSE_STAGING_PASSWORD", "ref:staging-password")
+    monkeypatch.setenv("WAREHOUSE_PRODUCTION_USERNAME", "ref:production-username")
+    monkeypatch.setenv("WAREHOUSE_PRODUCTION_PASSWORD", "ref:production-password")
+    observed_environ.refresh()
+
+
+def test_secret_property_is_declared():
+    assert SecretWarehouseProfile.password.secret
+    assert not SecretWarehouseProfile.host.secret
+
+    with pytest.raises(ValueError):
+        EnvvarProfileProperty(name="port", type_=int, secret=True)
+
+
+def test_secrets_of_profile_and_parents_are_fetched_in_one_call(provider, chain_env):
+    staging = SecretWarehouseProfile(name="staging")
+    assert staging.to_dict() == {"host": "localhost", "username": "production-user", "password": "staging-secret"}
+    assert provider.calls == [["ref:production-password", "ref:production-username", "ref:staging-password"]]
+
+    assert SecretWarehouseProfile.load("staging").password == "staging-secret"
+    assert len(provider.calls) == 1
+
+
+def test_secret_values_are_exported_as_references(provider, chain_env):
+    staging = SecretWarehouseProfile.load("staging")
+    assert isinstance(staging.password, SecretStr)
+    assert "staging-secret" not in repr(staging.password)
+    assert "staging-secret" not in repr(staging.to_compact())
+    assert staging.to_envvars()["WAREHOUSE_STAGING_PASSWORD"] == "ref:staging-password"
+    assert staging.create_env()["WAREHOUSE_STAGING_PASSWORD"] == "ref:staging-password"
+
+
+def test_properties_overriding_from_str_with_two_arguments(monkeypatch):
+    class UppercaseProperty(EnvvarProfileProperty):
+        def from_str(self, profile, value):
+            return value.upper()
+
+    class Profile(EnvvarProfile):
+        profile_root = "warehouse"
+        profile_properties = ["host"]
+        host = UppercaseProperty(name="host")
+
+    monkeypatch.setenv("WAREHOUSE_STAGING_PARENT_PROFILE", "production")
+    monkeypatch.setenv("WAREHOUSE_PRODUCTION_HOST", "production-host")
+    assert Profile(name="staging").host == "PRODUCTION-HOST"
+    assert Profile.load("staging").host == "PRODUCTION-HOST"
+
+
+def test_missing_secret(provider, monkeypatch):
+    monkeypatch.setenv("WAREHOUSE_PASSWORD", "ref:nonexistent")
+    observed_environ.refresh()
+    with pytest.raises(ValueError) as exc_info:
+        SecretWarehouseProfile().password
+    assert "ref:nonexistent" in str(exc_info.value)
+
+
+def test_no_provider(monkeypatch):
+    monkeypatch.setenv("WAREHOUSE_PASSWORD", "ref:password")
+    observed_environ.refresh()
+    with pytest.raises(ValueError):
+        SecretWarehouseProfile().password
+
+
+def test_ttl_and_refresh_ahead():
+    provider = InMemorySecretProvider({"a": "1"})
+    clock = Clock()
+    store = SecretStore(clock=clock)
+    store.configure(provider, ttl=100, refresh_ahead=10)
+
+    assert store._fetch(["a"]) == {"a": "1"}
+    assert store._get_cached("a") == "1"
+    assert len(provider.calls) == 1
+
+    # Read within the refresh window returns the cached value and refreshes it in the background
+    provider.secrets["a"] = "2"
+    clock.now = 95
+    assert store._get_cached("a") == "1"
+    store.wait_for_refresh()
+    assert len(provider.calls) == 2
+    assert store._get_cached("a") == "2"
+
+    # Expired secrets are not returned
+    clock.now = 1000
+    assert store._get_cached("a") is None
+
+
+def test_lru_eviction():
+    provider = InMemorySecretProvider({"a": "1", "b": "2", "c": "3"})
+    store = SecretStore()
+    store.configure(provider, max_size=2)
+
+    store._fetch(["a", "b"])
+    store._get_cached("a")
+    store._fetch(["c"])
+
+    assert store._get_cached("a") == "1"
+    assert store._get_cached("b") is None
+    assert store._get_cached("c") == "3"
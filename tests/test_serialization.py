@@ -1,6 +1,9 @@
+import os
+
 import pytest
 
 from tests.warehouse_profile import WarehouseProfile
+from wr_profiles import Environment
 
 
 def test_integers_are_converted_to_strings():
@@ -26,3 +29,78 @@ def test_to_envvars_includes_parent_profile_setting(profile_is_live):
         "WAREHOUSE_STAGING_HOST": "localhost",
         "WAREHOUSE_STAGING_USERNAME": "hard-coded-staging-username",
     }
+
+
+def test_minimal_to_envvars_leaves_out_inherited_values(chain_envvars, monkeypatch):
+    # Same values as those of the parent profile and property defaults
+    monkeypatch.setenv("WAREHOUSE_STAGING_PASSWORD", "base-password")
+    monkeypatch.setenv("WAREHOUSE_SANDBOX_HOST", "localhost")
+    monkeypatch.setenv("WAREHOUSE_SANDBOX_USERNAME", "sandbox-username")
+
+    assert WarehouseProfile(name="staging").to_envvars(minimal=True) == {
+        "WAREHOUSE_STAGING_PARENT_PROFILE": "production",
+        "WAREHOUSE_STAGING_USERNAME": "staging-username",
+    }
+    assert WarehouseProfile(name="sandbox").to_envvars(minimal=True) == {
+        "WAREHOUSE_SANDBOX_USERNAME": "sandbox-username",
+    }
+
+    # Values are exported if they differ from inherited ones no matter where they come from
+    staging = WarehouseProfile(name="staging", values={"host": "staging-host"}, defaults={"password": "x"})
+    assert staging.to_envvars(minimal=True) == {
+        "WAREHOUSE_STAGING_PARENT_PROFILE": "production",
+        "WAREHOUSE_STAGING_HOST": "staging-host",
+        "WAREHOUSE_STAGING_USERNAME": "staging-username",
+    }
+
+
+def test_minimal_to_envvars_of_frozen_profiles(chain_envvars):
+    # Frozen profiles hold values of their parent profiles
+    assert WarehouseProfile.load("staging").to_envvars(minimal=True) == {
+        "WAREHOUSE_STAGING_HOST": "production-host",
+        "WAREHOUSE_STAGING_USERNAME": "staging-username",
+        "WAREHOUSE_STAGING_PASSWORD": "base-password",
+    }
+    staging = WarehouseProfile.load("staging", parent_name="production", values={"host": "production-host"})
+    assert staging.to_envvars(minimal=True) == {
+        "WAREHOUSE_STAGING_PARENT_PROFILE": "production",
+        "WAREHOUSE_STAGING_USERNAME": "staging-username",
+    }
+
+
+def test_minimal_export_reproduces_profile(chain_envvars):
+    staging = WarehouseProfile(name="staging")
+    expected = staging.to_dict()
+
+    # Replace environment variables of the staging profile with the minimal export
+    env = Environment({k: None for k in os.environ if k.startswith("WAREHOUSE_STAGING_")})
+    env.update(staging.to_envvars(minimal=True))
+    with env.applied():
+        assert WarehouseProfile(name="staging").to_dict() == expected
+
+
+def test_minimal_create_env(chain_envvars):
+    staging = WarehouseProfile(name="staging")
+    assert staging.create_env(minimal=True) == {
+        "WAREHOUSE_PROFILE": "staging",
+        "WAREHOUSE_STAGING_PARENT_PROFILE": "production",
+        "WAREHOUSE_STAGING_USERNAME": "staging-username",
+    }
+    assert staging.create_env(minimal=True, include_activation=False, username=None, host="other-host") == {
+        "WAREHOUSE_STAGING_PARENT_PROFILE": "production",
+        "WAREHOUSE_STAGING_HOST": "other-host",
+        "WAREHOUSE_STAGING_USERNAME": None,
+    }
+
+
+def test_minimal_create_env_includes_values_passed_explicitly(chain_envvars, monkeypatch):
+    monkeypatch.setenv("WAREHOUSE_STAGING_HOST", "staging-host")
+    staging = WarehouseProfile(name="staging")
+
+    # Same values as inherited from the parent profile
+    env = staging.create_env(minimal=True, username="production-username", host="production-host")
+    assert env["WAREHOUSE_STAGING_HOST"] == "production-host"
+    assert env["WAREHOUSE_STAGING_USERNAME"] == "production-username"
+    with env.applied():
+        assert staging.host == "production-host"
+        assert staging.username == "production-username"
@@ -0,0 +1,195 @@
+import datetime
+import os
+import struct
+
+import pytest
+
+from tests.warehouse_profile import WarehouseProfile
+from wr_profiles import (
+    EnvvarProfileProperty, InMemorySecretProvider, default_secret_store, envvar_profile_cls, snapshots
+)
+
+
+@envvar_profile_cls(profile_root="warehouse")
+class TypedWarehouseProfile:
+    host: str = "localhost"
+    port: int = 5432
+    ssl: bool = False
+    tags: list
+    timeout: datetime.timedelta
+    password: str = EnvvarProfileProperty(secret=True)
+
+
+@envvar_profile_cls(profile_root="warehouse")
+class ChangedWarehouseProfile:
+    host: str = "localhost"
+    # was int
+    port: str = "5432"
+    ssl: bool = False
+    tags: list
+    timeout: datetime.timedelta
+    password: str = EnvvarProfileProperty(secret=True)
+
+
+@pytest.fixture
+def provider():
+    default_secret_store.configure(InMemorySecretProvider({
+        "ref:staging-password": "staging-secret",
+        "ref:base-password": "base-secret",
+    }))
+    yield
+    default_secret_store.configure(None)
+
+
+@pytest.fixture
+def typed_envvars(chain_envvars, monkeypatch):
+    # Values of TypedWarehouseProfile properties on top of the shared profile chain
+    monkeypatch.setenv("WAREHOUSE_STAGING_PORT", "6543")
+    monkeypatch.setenv("WAREHOUSE_STAGING_TAGS", "a,b")
+    monkeypatch.setenv("WAREHOUSE_STAGING_PASSWORD", "ref:staging-password")
+    monkeypatch.setenv("WAREHOUSE_PRODUCTION_SSL", "true")
+    monkeypatch.setenv("WAREHOUSE_PRODUCTION_TIMEOUT", "30s")
+    monkeypatch.setenv("WAREHOUSE_BASE_PASSWORD", "ref:base-password")
+
+
+def clear_typed_envvars(monkeypatch):
+    for k in list(os.environ):
+        if k.startswith("WAREHOUSE_"):
+            monkeypatch.delenv(k)
+
+
+@pytest.mark.parametrize("format", ["binary", "json"])
+def test_snapshot_round_trip(tmpdir, monkeypatch, provider, typed_envvars, format):
+    path = str(tmpdir.join("profiles.snapshot"))
+    expected = {name: profile.to_dict() for name, profile in TypedWarehouseProfile.load_all().items()}
+    TypedWarehouseProfile.dump_snapshot(path, format=format)
+
+    with open(path, "rb") as f:
+        data = f.read()
+    assert b"staging-secret" not in data
+    assert data.startswith(b"WRPF") == (format == "binary")
+
+    clear_typed_envvars(monkeypatch)
+    profiles = TypedWarehouseProfile.load_snapshot(path)
+    assert {name: profile.to_dict() for name, profile in profiles.items()} == expected
+    assert expected["staging"] == {
+        "host": "production-host",
+        "port": 6543,
+        "ssl": True,
+        "tags": ["a", "b"],
+        "timeout": datetime.timedelta(seconds=30),
+        "password": "staging-secret",
+    }
+    assert not profiles["staging"].profile_is_live
+    assert profiles["staging"].has_prop_value("port")
+    assert not profiles["production"].has_prop_value("port")
+
+
+@pytest.mark.parametrize("format", ["binary", "json"])
+def test_snapshot_keeps_const_settings(tmpdir, format):
+    path = str(tmpdir.join("profiles.snapshot"))
+    staging = WarehouseProfile.load("staging", parent_name="production", defaults={"password": "default-password"})
+    WarehouseProfile.dump_snapshot(path, [staging, WarehouseProfile.load("other", compact=True)], format=format)
+
+    profiles = WarehouseProfile.load_snapshot(path)
+    assert list(profiles) == ["staging", "other"]
+    assert profiles["staging"]._profile_parent_name == "production"
+    assert profiles["staging"].password == "default-password"
+    assert not profiles["staging"].has_prop_value("password")
+
+
+def test_format_is_chosen_by_file_name(tmpdir):
+    WarehouseProfile.dump_snapshot(str(tmpdir.join("profiles.json")), [WarehouseProfile.load("staging")])
+    assert tmpdir.join("profiles.json").read().startswith("{")
+
+    with pytest.raises(ValueError):
+        WarehouseProfile.dump_snapshot(str(tmpdir.join("profiles.yaml")), [], format="yaml")
+
+
+def test_only_frozen_profiles_of_the_class_are_dumped(tmpdir):
+    path = str(tmpdir.join("profiles.snapshot"))
+    with pytest.raises(ValueError):
+        WarehouseProfile.dump_snapshot(path, [WarehouseProfile(name="staging")])
+    with pytest.raises(ValueError):
+        TypedWarehouseProfile.dump_snapshot(path, [WarehouseProfile.load("staging")])
+    assert not os.path.exists(path)
+
+
+@pytest.mark.parametrize("format", ["binary", "json"])
+def test_values_are_not_converted_if_schema_hash_matches(tmpdir, monkeypatch, provider, typed_envvars, format):
+    path = str(tmpdir.join("profiles.snapshot"))
+    TypedWarehouseProfile.dump_snapshot(path, [TypedWarehouseProfile.load("production")], format=format)
+
+    converted = []
+    from_str = EnvvarProfileProperty.from_str
+
+    def recording_from_str(self, profile, value):
+        converted.append(self.name)
+        return from_str(self, profile, value)
+
+    monkeypatch.setattr(EnvvarProfileProperty, "from_str", recording_from_str)
+    assert TypedWarehouseProfile.load_snapshot(path)["production"].ssl is True
+    # Secrets are stored as references, and JSON has no type for durations
+    assert sorted(converted) == (["password"] if format == "binary" else ["password", "timeout"])
+
+    converted.clear()
+    assert ChangedWarehouseProfile.load_snapshot(path)["production"].ssl is True
+    assert sorted(converted) == ["host", "password", "ssl", "timeout"]
+
+
+@pytest.mark.parametrize("format", ["binary", "json"])
+def test_snapshot_of_changed_class_is_validated(tmpdir, provider, typed_envvars, format):
+    path = str(tmpdir.join("profiles.snapshot"))
+    TypedWarehouseProfile.dump_snapshot(path, format=format)
+    assert snapshots.get_schema_hash(TypedWarehouseProfile) != snapshots.get_schema_hash(ChangedWarehouseProfile)
+
+    assert ChangedWarehouseProfile.load_snapshot(path)["staging"].port == "6543"
+
+    @envvar_profile_cls(profile_root="warehouse")
+    class IntHostWarehouseProfile:
+        host: int
+        port: int
+        ssl: bool
+        tags: list
+        timeout: datetime.timedelta
+        password: str = EnvvarProfileProperty(secret=True)
+
+    with pytest.raises(ValueError) as exc_info:
+        IntHostWarehouseProfile.load_snapshot(path)
+    assert "IntHostWarehouseProfile.host" in str(exc_info.value)
+
+    with pytest.raises(ValueError) as exc_info:
+        WarehouseProfile.load_snapshot(path)
+    assert "'port' which isn't a property" in str(exc_info.value)
+
+
+def test_invalid_snapshot_files(tmpdir):
+    path = str(tmpdir.join("profiles.snapshot"))
+    WarehouseProfile.dump_snapshot(path, [WarehouseProfile.load("staging")])
+
+    @envvar_profile_cls(profile_root="other")
+    class OtherProfile:
+        host: str
+
+    with pytest.raises(ValueError):
+        OtherProfile.load_snapshot(path)
+
+    with open(path, "r+b") as f:
+        f.seek(4)
+        f.write(struct.pack("<H", 99))
+    with pytest.raises(ValueError) as exc_info:
+        WarehouseProfile.load_snapshot(path)
+    assert "version 99" in str(exc_info.value)
+
+    for data in [b"", b"WRPF", b"host=localhost", b"[]"]:
+        tmpdir.join("invalid").write_binary(data)
+        with pytest.raises(ValueError):
+            WarehouseProfile.load_snapshot(str(tmpdir.join("invalid")))
+
+
+def test_large_snapshot_is_read_through_mmap(tmpdir, monkeypatch):
+    monkeypatch.setattr(snapshots, "mmap_min_size", 0)
+    path = str(tmpdir.join("profiles.snapshot"))
+    profiles = [WarehouseProfile.load(f"p{i}", values={"host": f"host{i}"}) for i in range(100)]
+    WarehouseProfile.dump_snapshot(path, profiles)
+    assert WarehouseProfile.load_snapshot(path)["p99"].host == "host99"
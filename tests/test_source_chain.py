@@ -0,0 +1,99 @@
+import pytest
+
+from wr_profiles import (
+    Environment, LiveProfileLoader, ObservedEnviron, SourceChain, envvar_profile_cls, observed_environ, profile_loaders
+)
+from wr_profiles.environ import overlays_available
+
+
+class CountingSource(dict):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reads = []
+
+    def __getitem__(self, key):
+        self.reads.append(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.reads.append(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        self.reads.append(key)
+        return super().__contains__(key)
+
+
+def test_first_source_wins():
+    chain = SourceChain([{"A": "1"}, {"A": "2", "B": "2"}, {"C": "3"}])
+    assert dict(chain) == {"A": "1", "B": "2", "C": "3"}
+    assert chain["B"] == "2"
+    assert chain.get("D", "default") == "default"
+    assert "C" in chain
+    assert len(chain) == 3
+
+
+def test_values_are_read_from_winning_source_only():
+    first, second = CountingSource(A="1"), CountingSource(B="2")
+    chain = SourceChain([first, second])
+
+    assert chain["B"] == "2"
+    assert chain.get("A") == "1"
+    assert "C" not in chain
+    assert first.reads == ["A"]
+    assert second.reads == ["B"]
+
+
+def test_index_follows_state_of_sources():
+    environ = ObservedEnviron({})
+    chain = SourceChain([environ, {"A": "default"}])
+    assert chain["A"] == "default"
+
+    environ["A"] = "set"
+    assert chain["A"] == "set"
+
+    del environ["A"]
+    assert chain["A"] == "default"
+
+
+@pytest.mark.skipif(not overlays_available(), reason="overlays require contextvars")
+def test_index_follows_overlay_of_sources():
+    environ = ObservedEnviron({"A": "set"})
+    chain = SourceChain([environ, {"A": "default"}])
+    assert chain["A"] == "set"
+
+    with environ.overlay({"A": None}):
+        assert chain["A"] == "default"
+    assert chain["A"] == "set"
+
+
+@pytest.fixture
+def layered_profile_cls():
+    secrets = {"WAREHOUSE_STAGING_PASSWORD": "secret"}
+    defaults = {"WAREHOUSE_STAGING_USERNAME": "default-user", "WAREHOUSE_STAGING_PASSWORD": "not-secret"}
+    loader = LiveProfileLoader(environ=SourceChain([observed_environ, secrets, defaults]))
+    profile_loaders.register("test-layered", loader)
+
+    @envvar_profile_cls(profile_root="warehouse", profile_live_loader="test-layered")
+    class LayeredWarehouseProfile:
+        host: str = "localhost"
+        username: str
+        password: str
+
+    yield LayeredWarehouseProfile
+    profile_loaders.unregister("test-layered")
+
+
+def test_profile_with_layered_sources(monkeypatch, layered_profile_cls):
+    staging = layered_profile_cls(name="staging")
+    assert staging.to_dict() == {"host": "localhost", "username": "default-user", "password": "secret"}
+
+    with Environment(WAREHOUSE_STAGING_USERNAME="staging-user").applied():
+        assert staging.username == "staging-user"
+
+    monkeypatch.setenv("WAREHOUSE_STAGING_HOST", "staging-host")
+    observed_environ.refresh()
+    assert staging.host == "staging-host"
+    assert layered_profile_cls.load("staging").to_dict() == {
+        "host": "staging-host", "username": "default-user", "password": "secret",
+    }
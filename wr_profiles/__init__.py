@@ -1,11 +1,90 @@
 __version__ = "4.2.1"
 
-from .envvar_profile import Environment, EnvvarProfile, EnvvarProfileProperty, envvar_profile, envvar_profile_cls
+import sys
+import types
+
+# Every program using profiles needs envvar_profile, so it is imported eagerly. This also keeps
+# wr_profiles.envvar_profile the function rather than the module of the same name.
+from .envvar_profile import (
+    CompactProfile, Environment, EnvvarProfile, EnvvarProfileProperty, LiveProfileLoader, ProfileLoader, envvar_profile,
+    envvar_profile_cls, get_profile_loader, profile_loaders
+)
+
+# typing itself takes a while to import
+TYPE_CHECKING = False
+if TYPE_CHECKING:  # pragma: no cover
+    from .converters import ByteSize, Converter, Json, converter_registry
+    from .environ import ObservedEnviron, SourceChain, observed_environ
+    from .files import FileProfileLoader
+    from .instrumentation import ProfileStats
+    from .secret_store import InMemorySecretProvider, SecretProvider, SecretStr, default_secret_store
+    from .snapshots import ProfileSnapshot, SharedProfileSnapshot
+
+# Other public names are imported from their modules on first access (see _Package) so that programs
+# which import the package only pay for the parts they use.
+_exports = {
+    "ByteSize": "converters",
+    "Converter": "converters",
+    "Json": "converters",
+    "converter_registry": "converters",
+    "ObservedEnviron": "environ",
+    "observed_environ": "environ",
+    "SourceChain": "environ",
+    "ProfileStats": "instrumentation",
+    "FileProfileLoader": "files",
+    "InMemorySecretProvider": "secret_store",
+    "SecretProvider": "secret_store",
+    "SecretStr": "secret_store",
+    "default_secret_store": "secret_store",
+    "ProfileSnapshot": "snapshots",
+    "SharedProfileSnapshot": "snapshots",
+}
 
 __all__ = [
+    "ByteSize",
+    "Converter",
+    "Json",
+    "converter_registry",
+    "CompactProfile",
     "Environment",
     "EnvvarProfile",
     "EnvvarProfileProperty",
     "envvar_profile",
     "envvar_profile_cls",
+    "get_profile_loader",
+    "ProfileLoader",
+    "LiveProfileLoader",
+    "profile_loaders",
+    "ObservedEnviron",
+    "observed_environ",
+    "SourceChain",
+    "ProfileStats",
+    "FileProfileLoader",
+    "InMemorySecretProvider",
+    "SecretProvider",
+    "SecretStr",
+    "default_secret_store",
+    "ProfileSnapshot",
+    "SharedProfileSnapshot",
 ]
+
+
+class _Package(types.ModuleType):
+    # __getattr__ and __dir__ are methods of the module class rather than module functions
+    # (PEP 562) because module functions are ignored before Python 3.7.
+
+    def __getattr__(self, name: str):
+        module_name = _exports.get(name)
+        if module_name is None:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+        # __import__ rather than importlib, whose import is not free and isn't reported by -X importtime.
+        value = getattr(__import__(module_name, globals(), None, [name], 1), name)
+        # Later lookups find the name in the module dict and don't call __getattr__.
+        globals()[name] = value
+        return value
+
+    def __dir__(self):
+        return sorted(set(globals()) | set(__all__))
+
+
+sys.modules[__name__].__class__ = _Package
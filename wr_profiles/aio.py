@@ -0,0 +1,45 @@
+"""
+Helpers for the async API of profiles and loaders.
+
+asyncio is imported on first use so that importing profiles doesn't pay for it.
+"""
+import typing
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    import asyncio
+
+
+class Coalescer:
+    """
+    Coalesces concurrent requests: while an awaitable started for a key is running,
+    other requests for the same key wait for its result instead of starting another one.
+
+    Keys are scoped to the running event loop.
+    """
+
+    def __init__(self):
+        self._futures: typing.Dict[tuple, "asyncio.Future"] = {}
+
+    @property
+    def pending(self) -> int:
+        return len(self._futures)
+
+    async def run(self, key: typing.Hashable, start: typing.Callable[[], typing.Awaitable]) -> typing.Any:
+        """
+        Returns the result of ``start()`` or of the one already running for the key.
+        Cancelling one of the waiting tasks does not cancel the shared request.
+        """
+        import asyncio
+
+        key = (asyncio.get_event_loop(), key)
+        future = self._futures.get(key)
+        if future is None:
+            future = asyncio.ensure_future(start())
+            self._futures[key] = future
+
+            def forget(done):
+                if self._futures.get(key) is done:
+                    del self._futures[key]
+
+            future.add_done_callback(forget)
+        return await asyncio.shield(future)
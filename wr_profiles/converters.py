@@ -0,0 +1,478 @@
+"""
+Conversion of environment variable strings to typed property values and back.
+
+A converter is selected for every property from its type annotation when the profile
+class is created. Properties whose type has no registered converter (including ``str``)
+keep receiving raw strings.
+
+``datetime``, ``decimal``, ``json`` and ``pathlib`` are imported when a value is first converted
+so that importing profiles stays cheap for programs that don't use them.
+"""
+import enum
+import re
+import sys
+import typing
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    import datetime
+    import decimal
+
+
+class Converter:
+    """
+    Base class for converters.
+
+    Set ``cacheable`` to False if parsed values must not be shared between reads,
+    or override ``copy`` to hand out copies of cached mutable values.
+    """
+
+    cacheable = True
+
+    def from_str(self, value: str) -> typing.Any:
+        raise NotImplementedError()
+
+    def to_str(self, value: typing.Any) -> str:
+        return str(value)
+
+    def copy(self, value: typing.Any) -> typing.Any:
+        return value
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}()"
+
+
+class TypeConverter(Converter):
+    """
+    Converter for types whose constructor accepts the string value and whose str() produces it.
+    """
+
+    def __init__(self, type_: type):
+        self.type_ = type_
+
+    def from_str(self, value: str) -> typing.Any:
+        return self.type_(value.strip())
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.type_.__name__})"
+
+
+class BoolConverter(Converter):
+    true_values = ("1", "true", "yes", "on", "y", "t")
+    false_values = ("0", "false", "no", "off", "n", "f", "")
+
+    def from_str(self, value: str) -> bool:
+        normalised = value.strip().lower()
+        if normalised in self.true_values:
+            return True
+        if normalised in self.false_values:
+            return False
+        raise ValueError(f"{value!r} is not a boolean")
+
+    def to_str(self, value: typing.Any) -> str:
+        return "true" if value else "false"
+
+
+class DecimalConverter(Converter):
+    def from_str(self, value: str) -> "decimal.Decimal":
+        import decimal
+
+        try:
+            return decimal.Decimal(value.strip())
+        except decimal.InvalidOperation:
+            raise ValueError(f"{value!r} is not a decimal")
+
+
+class EnumConverter(Converter):
+    """
+    Looks up enum members by name first and by value second.
+    """
+
+    def __init__(self, enum_cls: typing.Type[enum.Enum]):
+        self.enum_cls = enum_cls
+
+    def from_str(self, value: str) -> enum.Enum:
+        value = value.strip()
+        if value in self.enum_cls.__members__:
+            return self.enum_cls.__members__[value]
+        for member in self.enum_cls:
+            if str(member.value) == value:
+                return member
+        raise ValueError(f"{value!r} is not a member of {self.enum_cls.__name__}")
+
+    def to_str(self, value: typing.Any) -> str:
+        if isinstance(value, self.enum_cls):
+            return value.name
+        return str(value)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.enum_cls.__name__})"
+
+
+class Json:
+    """
+    Annotate a property with this type to have its value parsed as JSON.
+    """
+
+
+class JsonConverter(Converter):
+    # json.loads is faster than a deep copy of its result
+    cacheable = False
+
+    def from_str(self, value: str) -> typing.Any:
+        import json
+
+        return json.loads(value)
+
+    def to_str(self, value: typing.Any) -> str:
+        import json
+
+        return json.dumps(value)
+
+
+class _ItemsConverter(Converter):
+    """
+    Common parts of list and dict converters.
+
+    Items are converted with the item converter (if there is one).
+    JSON-encoded values are accepted and produced; non-string JSON items are
+    passed to the item converter in their JSON form.
+    """
+
+    def __init__(self, item_converter: typing.Optional[Converter]):
+        self.item_converter = item_converter
+        self.cacheable = item_converter is None or item_converter.cacheable
+
+    def _item_from_str(self, item: typing.Any) -> typing.Any:
+        if self.item_converter is None:
+            return item
+        if not isinstance(item, str):
+            import json
+
+            item = json.dumps(item)
+        return self.item_converter.from_str(item)
+
+    def _item_to_str(self, item: typing.Any) -> typing.Any:
+        if self.item_converter is None or isinstance(item, str):
+            return item
+        if isinstance(item, (bool, int, float)) and not isinstance(item, enum.Enum):
+            # JSON represents these natively
+            return item
+        return self.item_converter.to_str(item)
+
+    def _item_copy(self, item: typing.Any) -> typing.Any:
+        if self.item_converter is None:
+            return item
+        return self.item_converter.copy(item)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.item_converter!r})"
+
+
+class ListConverter(_ItemsConverter):
+    """
+    Accepts a JSON array or comma-separated items.
+    """
+
+    def from_str(self, value: str) -> list:
+        value = value.strip()
+        if value.startswith("["):
+            import json
+
+            items = json.loads(value)
+            if not isinstance(items, list):
+                raise ValueError(f"{value!r} is not a list")
+        elif value:
+            items = [item.strip() for item in value.split(",")]
+        else:
+            items = []
+        return [self._item_from_str(item) for item in items]
+
+    def to_str(self, value: typing.Any) -> str:
+        import json
+
+        return json.dumps([self._item_to_str(item) for item in value])
+
+    def copy(self, value: list) -> list:
+        return [self._item_copy(item) for item in value]
+
+
+class DictConverter(_ItemsConverter):
+    """
+    Accepts a JSON object or comma-separated ``key=value`` pairs.
+    """
+
+    def from_str(self, value: str) -> dict:
+        value = value.strip()
+        if value.startswith("{"):
+            import json
+
+            items = json.loads(value)
+        elif value:
+            items = {}
+            for pair in value.split(","):
+                k, sep, v = pair.partition("=")
+                if not sep:
+                    raise ValueError(f"{pair!r} is not a key=value pair")
+                items[k.strip()] = v.strip()
+        else:
+            items = {}
+        return {k: self._item_from_str(v) for k, v in items.items()}
+
+    def to_str(self, value: typing.Any) -> str:
+        import json
+
+        return json.dumps({k: self._item_to_str(v) for k, v in value.items()})
+
+    def copy(self, value: dict) -> dict:
+        return {k: self._item_copy(v) for k, v in value.items()}
+
+
+class DurationConverter(Converter):
+    """
+    Parses durations like ``90``, ``90s``, ``1h30m``, ``1.5h``, ``250ms`` into timedelta.
+    A number without a unit is in seconds.
+    """
+
+    _part_regex = re.compile(r"(\d+(?:\.\d*)?|\.\d+)(w|d|h|ms|m|s|us)")
+
+    def __init__(self):
+        import datetime
+
+        self.units = {
+            "w": datetime.timedelta(weeks=1),
+            "d": datetime.timedelta(days=1),
+            "h": datetime.timedelta(hours=1),
+            "m": datetime.timedelta(minutes=1),
+            "s": datetime.timedelta(seconds=1),
+            "ms": datetime.timedelta(milliseconds=1),
+            "us": datetime.timedelta(microseconds=1),
+        }
+
+    def from_str(self, value: str) -> "datetime.timedelta":
+        import datetime
+
+        value = value.strip().lower()
+        sign = 1
+        if value.startswith("-"):
+            sign = -1
+            value = value[1:]
+        try:
+            return sign * datetime.timedelta(seconds=float(value))
+        except (ValueError, OverflowError):
+            pass
+        total = datetime.timedelta()
+        position = 0
+        for match in self._part_regex.finditer(value):
+            if match.start() != position:
+                break
+            total += float(match.group(1)) * self.units[match.group(2)]
+            position = match.end()
+        if not value or position != len(value):
+            raise ValueError(f"{value!r} is not a duration")
+        return sign * total
+
+    def to_str(self, value: typing.Any) -> str:
+        import datetime
+
+        if not isinstance(value, datetime.timedelta):
+            return str(value)
+        if not value:
+            return "0s"
+        sign = "-" if value < datetime.timedelta() else ""
+        remainder = abs(value)
+        parts = []
+        for unit in ("d", "h", "m", "s", "ms", "us"):
+            count, remainder = divmod(remainder, self.units[unit])
+            if count:
+                parts.append(f"{count}{unit}")
+        return sign + "".join(parts)
+
+
+class ByteSize(int):
+    """
+    Annotate a property with this type to have values like ``512``, ``10KB``, ``1.5GiB`` parsed into
+    number of bytes. ``K``, ``M``, ``G``, ``T`` are powers of 1000, ``Ki``, ``Mi``, ``Gi``, ``Ti`` are powers of 1024.
+    """
+
+
+class ByteSizeConverter(Converter):
+    multipliers = {
+        "": 1,
+        "k": 1000, "m": 1000 ** 2, "g": 1000 ** 3, "t": 1000 ** 4,
+        "ki": 1024, "mi": 1024 ** 2, "gi": 1024 ** 3, "ti": 1024 ** 4,
+    }
+
+    _regex = re.compile(r"^(\d+(?:\.\d*)?|\.\d+)\s*([kmgt]i?)?b?$")
+
+    def from_str(self, value: str) -> ByteSize:
+        import decimal
+
+        match = self._regex.match(value.strip().lower())
+        if not match:
+            raise ValueError(f"{value!r} is not a byte size")
+        number, unit = match.groups()
+        return ByteSize(decimal.Decimal(number) * self.multipliers[unit or ""])
+
+    def to_str(self, value: typing.Any) -> str:
+        return str(int(value))
+
+
+def _get_origin(type_) -> typing.Any:
+    origin = getattr(type_, "__origin__", None)
+    # Python 3.6 reports the typing generic itself as the origin.
+    return {typing.List: list, typing.Dict: dict}.get(origin, origin)
+
+
+class OptionalConverter(Converter):
+    """
+    Converter for ``Optional[T]`` types: an empty value is None, other values are
+    converted with the converter of ``T``.
+    """
+
+    def __init__(self, converter: Converter):
+        self.converter = converter
+        self.cacheable = converter.cacheable
+
+    def from_str(self, value: str) -> typing.Any:
+        if not value.strip():
+            return None
+        return self.converter.from_str(value)
+
+    def to_str(self, value: typing.Any) -> str:
+        return self.converter.to_str(value)
+
+    def copy(self, value: typing.Any) -> typing.Any:
+        if value is None:
+            return None
+        return self.converter.copy(value)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.converter!r})"
+
+
+ConverterFactory = typing.Callable[[typing.Any, "ConverterRegistry"], typing.Optional[Converter]]
+
+
+class ConverterRegistry:
+    """
+    Maps property types to converters.
+
+    Converters for concrete types are registered with ``register``. Generic and
+    parametrised types (enums, ``List[T]``, ``Optional[T]``) are handled by factories
+    registered with ``register_factory`` which are asked in order of registration.
+    """
+
+    def __init__(self):
+        self._converters: typing.Dict[typing.Any, typing.Optional[Converter]] = {}
+        self._factories: typing.List[ConverterFactory] = []
+        self._resolved: typing.Dict[typing.Any, typing.Optional[Converter]] = {}
+
+    def register(self, type_: typing.Any, converter: typing.Optional[Converter]):
+        """
+        Register converter for the type. Pass None to have the type's values left as strings.
+        """
+        self._converters[type_] = converter
+        self._resolved.clear()
+
+    def register_factory(self, factory: ConverterFactory):
+        self._factories.append(factory)
+        self._resolved.clear()
+
+    def get(self, type_: typing.Any) -> typing.Optional[Converter]:
+        """
+        Returns the converter for the type or None if values of this type should be left as strings.
+        The same converter instance is returned for the same type.
+        """
+        try:
+            return self._resolved[type_]
+        except KeyError:
+            pass
+        except TypeError:
+            # Unhashable annotation
+            return self._find(type_)
+        converter = self._resolved[type_] = self._find(type_)
+        return converter
+
+    def _find(self, type_: typing.Any) -> typing.Optional[Converter]:
+        try:
+            if type_ in self._converters:
+                return self._converters[type_]
+        except TypeError:
+            pass
+        for factory in self._factories:
+            converter = factory(type_, self)
+            if converter is not None:
+                return converter
+        return None
+
+
+def _enum_factory(type_, registry: ConverterRegistry) -> typing.Optional[Converter]:
+    if isinstance(type_, type) and issubclass(type_, enum.Enum):
+        return EnumConverter(type_)
+    return None
+
+
+def _decimal_factory(type_, registry: ConverterRegistry) -> typing.Optional[Converter]:
+    # A Decimal annotation means decimal has been imported already.
+    decimal = sys.modules.get("decimal")
+    if decimal is not None and type_ is decimal.Decimal:
+        return DecimalConverter()
+    return None
+
+
+def _duration_factory(type_, registry: ConverterRegistry) -> typing.Optional[Converter]:
+    # A timedelta annotation means datetime has been imported already.
+    datetime = sys.modules.get("datetime")
+    if datetime is not None and type_ is datetime.timedelta:
+        return DurationConverter()
+    return None
+
+
+def _path_factory(type_, registry: ConverterRegistry) -> typing.Optional[Converter]:
+    pathlib = sys.modules.get("pathlib")
+    if pathlib is not None and isinstance(type_, type) and issubclass(type_, pathlib.PurePath):
+        return TypeConverter(type_)
+    return None
+
+
+def _optional_factory(type_, registry: ConverterRegistry) -> typing.Optional[Converter]:
+    if _get_origin(type_) is typing.Union:
+        args = [arg for arg in type_.__args__ if arg is not type(None)]  # noqa: E721
+        if len(args) == 1:
+            converter = registry.get(args[0])
+            return OptionalConverter(converter) if converter is not None else None
+    return None
+
+
+def _list_factory(type_, registry: ConverterRegistry) -> typing.Optional[Converter]:
+    if type_ is list:
+        return ListConverter(None)
+    if _get_origin(type_) is list:
+        args = getattr(type_, "__args__", None) or (None,)
+        return ListConverter(registry.get(args[0]) if not isinstance(args[0], typing.TypeVar) else None)
+    return None
+
+
+def _dict_factory(type_, registry: ConverterRegistry) -> typing.Optional[Converter]:
+    if type_ is dict:
+        return DictConverter(None)
+    if _get_origin(type_) is dict:
+        args = getattr(type_, "__args__", None) or (None, None)
+        return DictConverter(registry.get(args[1]) if not isinstance(args[1], typing.TypeVar) else None)
+    return None
+
+
+converter_registry = ConverterRegistry()
+converter_registry.register(str, None)
+converter_registry.register(int, TypeConverter(int))
+converter_registry.register(float, TypeConverter(float))
+converter_registry.register(bool, BoolConverter())
+converter_registry.register(ByteSize, ByteSizeConverter())
+converter_registry.register(Json, JsonConverter())
+converter_registry.register_factory(_optional_factory)
+converter_registry.register_factory(_decimal_factory)
+converter_registry.register_factory(_duration_factory)
+converter_registry.register_factory(_enum_factory)
+converter_registry.register_factory(_path_factory)
+converter_registry.register_factory(_list_factory)
+converter_registry.register_factory(_dict_factory)
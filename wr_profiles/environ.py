@@ -0,0 +1,524 @@
+import _thread
+import collections.abc
+import contextlib
+import itertools
+import os
+import types
+import typing
+
+
+class ProfileIndex:
+    """
+    Environment variables of a single profile root grouped by profile name and property.
+
+    Keys are recognised in these forms:
+
+    * ``<ROOT>_<PROPERTY>`` -- property of the default profile (profile name None),
+    * ``<ROOT>_<NAME>_<PROPERTY>`` -- property of a named profile,
+    * ``<ROOT>_<NAME>_PARENT_PROFILE`` -- parent profile of a named profile.
+
+    When a key could be split in more than one way, the longest matching property name wins.
+    Keys under the root that don't match any of the above (other than the ``ignore``-d ones)
+    are collected in ``unknown``.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        property_names: typing.Iterable[str],
+        envvars: typing.Mapping[str, str],
+        ignore: typing.Iterable[str] = (),
+    ):
+        self.root = root
+        self.prefix = f"{root}_".upper()
+
+        # profile name -> property name -> raw value
+        self.values: typing.Dict[typing.Optional[str], typing.Dict[str, str]] = {}
+
+        # profile name -> parent profile name
+        self.parents: typing.Dict[str, str] = {}
+
+        # envvar name -> raw value
+        self.unknown: typing.Dict[str, str] = {}
+
+        properties = {name.upper(): name for name in property_names}
+        ignore = set(ignore)
+        prefix_len = len(self.prefix)
+
+        for key, value in envvars.items():
+            if not key.startswith(self.prefix) or key in ignore:
+                continue
+            rest = key[prefix_len:]
+
+            if rest in properties:
+                self.values.setdefault(None, {})[properties[rest]] = value
+                continue
+
+            if rest.endswith("_PARENT_PROFILE") and len(rest) > 15:
+                if value:
+                    self.parents[rest[:-15].lower()] = value
+                continue
+
+            # Split at the first underscore that leaves a known property name on the right,
+            # which gives the longest matching property name.
+            position = rest.find("_")
+            while position > 0:
+                prop_name = properties.get(rest[position + 1:])
+                if prop_name is not None:
+                    self.values.setdefault(rest[:position].lower(), {})[prop_name] = value
+                    break
+                position = rest.find("_", position + 1)
+            else:
+                self.unknown[key] = value
+
+    @property
+    def profile_names(self) -> typing.List[str]:
+        """
+        Names of all profiles that have any property set, a parent profile set, or are
+        referred to as a parent profile.
+        """
+        names = set(self.parents)
+        names.update(self.parents.values())
+        names.update(name for name in self.values if name is not None)
+        return sorted(names)
+
+    def get_values(self, profile_name: typing.Optional[str]) -> typing.Dict[str, str]:
+        """
+        Returns raw values of properties set for the profile itself (not inherited).
+        """
+        return self.values.get(profile_name, {})
+
+
+_NotOverlaid = object()
+
+
+class _Overlay:
+    """
+    Immutable layer of environment variables visible only in the context it is bound to,
+    stacked on top of the parent layer (if any). A value of None marks the variable as unset.
+
+    Layers that see the same variables share the serial. The serial of a layer that sees
+    the underlying environment unchanged is None.
+
+    Lookups walk the layers, so a layer that would be stacked deeper than ``max_depth``
+    is merged with the layers below it instead.
+    """
+
+    __slots__ = ("values", "parent", "serial", "depth")
+
+    max_depth = 8
+
+    def __init__(
+        self,
+        values: typing.Dict[str, typing.Optional[str]],
+        parent: typing.Optional["_Overlay"],
+        serial: typing.Optional[int],
+    ):
+        if parent is not None and parent.depth >= self.max_depth:
+            merged = parent.merged()
+            merged.update(values)
+            values, parent = merged, None
+        self.values = values
+        self.parent = parent
+        self.serial = serial
+        self.depth = 1 if parent is None else parent.depth + 1
+
+    def get(self, key: str) -> typing.Any:
+        """
+        Returns the overlaid value (None if unset) or _NotOverlaid.
+        """
+        overlay = self
+        while overlay is not None:
+            values = overlay.values
+            if key in values:
+                return values[key]
+            overlay = overlay.parent
+        return _NotOverlaid
+
+    def merged(self) -> typing.Dict[str, typing.Optional[str]]:
+        layers = []
+        overlay = self
+        while overlay is not None:
+            layers.append(overlay.values)
+            overlay = overlay.parent
+        merged = {}
+        for values in reversed(layers):
+            merged.update(values)
+        return merged
+
+
+def overlays_available() -> bool:
+    """
+    Returns True if ``ObservedEnviron.overlay()`` can be used: on Python 3.7+, or on
+    Python 3.6 with the contextvars backport installed.
+    """
+    try:
+        import contextvars  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _NoContextVar:
+    """
+    Stand-in for contextvars.ContextVar before the first overlay and where contextvars aren't available.
+    """
+
+    def get(self, default=None):
+        return default
+
+
+_no_overlays = _NoContextVar()
+
+# Guards creation of context variables of overlays.
+_overlay_var_lock = _thread.allocate_lock()
+
+
+class ObservedEnviron(collections.abc.MutableMapping):
+    """
+    A view of the process environment (``os.environ`` by default) that counts
+    modifications.
+
+    Every modification made through this object increments ``generation`` so that
+    values derived from the environment can be cached for as long as the generation
+    stays the same.
+
+    Modifications made directly to the underlying mapping (for example, with
+    ``os.environ[...] = ...`` or pytest's ``monkeypatch.setenv``) are not observed.
+    Call ``refresh()`` after making such changes, or ``detect_changes()`` if you
+    don't know whether any were made.
+
+    Environment variables can also be set and unset for the current thread or asyncio task
+    only with ``overlay()``, without touching the underlying mapping.
+    """
+
+    def __init__(self, target: typing.MutableMapping[str, str] = None):
+        self._target = os.environ if target is None else target
+        self._counter = itertools.count(1)
+        self._generation = next(self._counter)
+        self._snapshot: typing.Optional[typing.Dict[str, str]] = None
+
+        self._overlay_serials = itertools.count(1)
+        # Replaced with a ContextVar by the first overlay(), so that contextvars is imported only when needed.
+        self._overlay = _no_overlays
+
+        # State, keys grouped by their first component (built once per state), and indexes.
+        # Replaced as a whole so that threads seeing different states don't mix them up.
+        self._index_cache: tuple = (None, None, {})
+
+        # State and copy of the environment as seen in that state.
+        self._copy_cache: tuple = (None, None)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def refresh(self) -> int:
+        """
+        Declare that the environment has changed, invalidating everything cached against
+        the current generation. Returns the new generation.
+        """
+        self._generation = next(self._counter)
+        return self._generation
+
+    @property
+    def state(self) -> typing.Hashable:
+        """
+        Identifies the environment as seen from the current context: the generation
+        and the overlay (if any) bound to the context. Values derived from the environment
+        can be cached for as long as the state stays the same.
+        """
+        overlay = self._overlay.get()
+        if overlay is None or overlay.serial is None:
+            return self._generation
+        return self._generation, overlay.serial
+
+    @property
+    def overlay_active(self) -> bool:
+        return self._overlay.get() is not None
+
+    @contextlib.contextmanager
+    def overlay(self, values: typing.Mapping[str, typing.Optional[str]]):
+        """
+        Set (or, for None values, unset) environment variables in the current context only.
+
+        Within the ``with`` block, this thread or asyncio task (and tasks it creates)
+        see the overlaid values; other threads and tasks keep seeing the underlying
+        environment. Modifications made through this object while an overlay is
+        active are bound to the overlay too and are discarded when the block exits.
+
+        Overlays can be nested. A nested overlay holds only the values that differ from
+        the overlays below it, and entering and exiting it takes time proportional to their
+        number. A nested overlay that changes nothing keeps the state, so values cached
+        against it stay valid.
+        """
+        if self._overlay is _no_overlays:
+            self._create_overlay_var()
+        current = self._overlay.get()
+        if current is None:
+            changed = dict(values)
+        else:
+            # Reading the underlying mapping would cost more than it saves (os.environ encodes and
+            # decodes every key), so only values already overlaid are compared.
+            get = current.get
+            changed = {key: value for key, value in values.items() if get(key) != value}
+        if changed:
+            serial = next(self._overlay_serials)
+        else:
+            serial = None if current is None else current.serial
+        token = self._overlay.set(_Overlay(changed, current, serial))
+        try:
+            yield self
+        finally:
+            self._overlay.reset(token)
+
+    def _create_overlay_var(self):
+        try:
+            import contextvars
+        except ImportError:  # Python 3.6 without the contextvars backport
+            raise RuntimeError("Environment overlays require Python 3.7+ or the contextvars backport") from None
+        with _overlay_var_lock:
+            if self._overlay is _no_overlays:
+                self._overlay = contextvars.ContextVar(f"observed_environ_overlay_{id(self)}", default=None)
+
+    def _set_overlaid(self, overlay: _Overlay, key: str, value: typing.Optional[str]):
+        values = dict(overlay.values)
+        values[key] = value
+        self._overlay.set(_Overlay(values, overlay.parent, next(self._overlay_serials)))
+
+    def copy(self) -> typing.Dict[str, str]:
+        """
+        Returns a new dict with the environment as seen from the current context, including
+        modifications made directly to the underlying mapping.
+        """
+        return dict(self._items())
+
+    def as_mapping(self) -> typing.Mapping[str, str]:
+        """
+        Returns a read-only copy of the environment as seen from the current context.
+
+        The copy is made once per state and shared, so repeated calls (for example, to build
+        environments of many child processes) don't copy the whole environment every time.
+        Like other cached values, it doesn't see modifications made directly to the underlying
+        mapping until ``refresh()`` is called; use ``copy()`` if you can't be sure there are none.
+        """
+        state = self.state
+        cached_state, copy = self._copy_cache
+        if copy is None or cached_state != state:
+            copy = types.MappingProxyType(self.copy())
+            self._copy_cache = (state, copy)
+        return copy
+
+    def detect_changes(self) -> bool:
+        """
+        Compare the environment with its state at the previous call of this method and
+        call ``refresh()`` if it differs. Returns True if a change was detected.
+
+        This is an O(size of the environment) operation. The first call always reports a change.
+        """
+        current = dict(self._target)
+        changed = current != self._snapshot
+        self._snapshot = current
+        if changed:
+            self.refresh()
+        return changed
+
+    def get_profile_index(
+        self, root: str, property_names: typing.Iterable[str], ignore: typing.Iterable[str] = ()
+    ) -> ProfileIndex:
+        """
+        Returns the index of environment variables of the profile root.
+
+        The environment is scanned once per state; an index is then built from only
+        those keys that share the first component of the root and reused until the
+        state changes.
+        """
+        state = self.state
+        cached_state, buckets, indexes = self._index_cache
+        if cached_state != state:
+            buckets, indexes = None, {}
+
+        key = (root, tuple(property_names), tuple(ignore))
+        index = indexes.get(key)
+        if index is None:
+            if buckets is None:
+                buckets = self._build_buckets()
+            bucket = buckets.get(root.upper().split("_", 1)[0], {})
+            index = indexes[key] = ProfileIndex(root, key[1], bucket, ignore=key[2])
+            self._index_cache = (state, buckets, indexes)
+        return index
+
+    def _build_buckets(self) -> typing.Dict[str, typing.Dict[str, str]]:
+        buckets = {}
+        for key, value in self._items():
+            buckets.setdefault(key.split("_", 1)[0], {})[key] = value
+        return buckets
+
+    def _items(self) -> typing.Iterable[typing.Tuple[str, str]]:
+        overlay = self._overlay.get()
+        if overlay is None:
+            return self._target.items()
+        items = dict(self._target)
+        for key, value in overlay.merged().items():
+            if value is None:
+                items.pop(key, None)
+            else:
+                items[key] = value
+        return items.items()
+
+    def __getitem__(self, key: str) -> str:
+        overlay = self._overlay.get()
+        if overlay is not None:
+            value = overlay.get(key)
+            if value is None:
+                raise KeyError(key)
+            if value is not _NotOverlaid:
+                return value
+        return self._target[key]
+
+    def __contains__(self, key) -> bool:
+        overlay = self._overlay.get()
+        if overlay is not None:
+            value = overlay.get(key)
+            if value is not _NotOverlaid:
+                return value is not None
+        return key in self._target
+
+    def get(self, key: str, default=None):
+        overlay = self._overlay.get()
+        if overlay is not None:
+            value = overlay.get(key)
+            if value is None:
+                return default
+            if value is not _NotOverlaid:
+                return value
+        return self._target.get(key, default)
+
+    def __setitem__(self, key: str, value: str):
+        overlay = self._overlay.get()
+        if overlay is not None:
+            self._set_overlaid(overlay, key, value)
+            return
+        self._target[key] = value
+        self.refresh()
+
+    def __delitem__(self, key: str):
+        overlay = self._overlay.get()
+        if overlay is not None:
+            if key not in self:
+                raise KeyError(key)
+            self._set_overlaid(overlay, key, None)
+            return
+        del self._target[key]
+        self.refresh()
+
+    def __iter__(self) -> typing.Iterator[str]:
+        if self._overlay.get() is None:
+            return iter(self._target)
+        return (key for key, _ in self._items())
+
+    def __len__(self) -> int:
+        if self._overlay.get() is None:
+            return len(self._target)
+        return len(dict(self._items()))
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(generation={self._generation})"
+
+
+class _SourceIndex:
+    """
+    Lookups in a SourceChain through its index of winning sources.
+    """
+
+    __slots__ = ("sources",)
+
+    def __init__(self, sources: typing.Dict[str, typing.Mapping[str, str]]):
+        # key -> winning source
+        self.sources = sources
+
+    def __getitem__(self, key: str) -> str:
+        return self.sources[key][key]
+
+    def __contains__(self, key) -> bool:
+        return key in self.sources
+
+    def get(self, key: str, default=None):
+        source = self.sources.get(key)
+        if source is None:
+            return default
+        return source.get(key, default)
+
+
+class SourceChain(collections.abc.Mapping):
+    """
+    Read-only view of ordered sources of environment variables where the first source
+    that has a variable wins, for example:
+
+        SourceChain([observed_environ, FileEnviron(["profiles.env"]), secrets, defaults])
+
+    Instead of probing every source on every lookup, the chain asks all sources for
+    their keys in bulk and builds an index of the winning source of every key.
+    The index is rebuilt whenever the ``state`` of any source changes; sources without
+    ``state`` are assumed not to change. As with cached values, call
+    ``observed_environ.refresh()`` after modifying os.environ directly.
+    Values are only read from the winning source.
+    """
+
+    def __init__(self, sources: typing.Iterable[typing.Mapping[str, str]]):
+        self.sources = tuple(sources)
+        self._stateful_sources = tuple(source for source in self.sources if hasattr(source, "state"))
+
+        # (state, index)
+        self._index: typing.Tuple[typing.Hashable, typing.Optional[_SourceIndex]] = (None, None)
+
+    @property
+    def state(self) -> typing.Hashable:
+        return tuple([source.state for source in self._stateful_sources])
+
+    def view(self) -> _SourceIndex:
+        """
+        Returns the index of winning sources for the current state. Use it instead of
+        the chain itself for several lookups in a row.
+        """
+        state = self.state
+        cached_state, index = self._index
+        if index is None or cached_state != state:
+            sources = {}
+            for source in reversed(self.sources):
+                sources.update(dict.fromkeys(source, source))
+            index = _SourceIndex(sources)
+            self._index = (state, index)
+        return index
+
+    async def aprefetch(self, keys: typing.Iterable[str]):
+        """
+        Prefetch the keys concurrently from all sources that support it.
+        """
+        import asyncio
+
+        keys = list(keys)
+        await asyncio.gather(*(
+            source.aprefetch(keys) for source in self.sources if hasattr(source, "aprefetch")
+        ))
+
+    def __getitem__(self, key: str) -> str:
+        return self.view()[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self.view()
+
+    def get(self, key: str, default=None):
+        return self.view().get(key, default)
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self.view().sources)
+
+    def __len__(self) -> int:
+        return len(self.view().sources)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({list(self.sources)!r})"
+
+
+observed_environ = ObservedEnviron()
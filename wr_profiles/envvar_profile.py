@@ -1,25 +1,123 @@
+import _thread
 import collections.abc
 import contextlib
 import functools
 import operator
 import os
 import re
+import sys
+import time
 import typing
 from abc import ABC, abstractmethod
 
+from .environ import ObservedEnviron, ProfileIndex, observed_environ
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    import subprocess
+
+    from .aio import Coalescer
+    from .converters import Converter
+    from .instrumentation import ProfileStats, ReadTrace
+
+# Conversion, secrets, instrumentation and async support are imported on first use
+# so that importing profiles doesn't pay for the parts a program doesn't use.
+
 P = typing.TypeVar("P")
-PROFILE_NAME_COMPONENT_REGEX = re.compile(r"^[a-z]([\d\w]*[a-z0-9])?$")
+PROFILE_NAME_COMPONENT_PATTERN = r"^[a-z]([\d\w]*[a-z0-9])?$"
+
+
+@functools.lru_cache(maxsize=None)
+def get_profile_name_component_regex() -> typing.Pattern:
+    """
+    Returns the compiled PROFILE_NAME_COMPONENT_PATTERN. Compiled on first use rather than at import.
+    """
+    return re.compile(PROFILE_NAME_COMPONENT_PATTERN)
+
+
+# Guards resolution of forward references of property types.
+_type_ref_lock = _thread.allocate_lock()
+
+
+def __getattr__(name: str) -> typing.Any:
+    # PEP 562: PROFILE_NAME_COMPONENT_REGEX is still importable but compiled only when it is accessed.
+    if name == "PROFILE_NAME_COMPONENT_REGEX":
+        return get_profile_name_component_regex()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-NotSet = object()
+class _NotSetType:
+    __slots__ = ()
+
+    def __repr__(self):
+        return "NotSet"
+
+    def __reduce__(self):
+        # Pickled by reference so that it stays a singleton
+        return "NotSet"
+
+
+NotSet = _NotSetType()
 
 
 class EnvvarProfileProperty:
-    def __init__(self, name, default=None, type_=None):
+    # Maximum number of raw strings per property whose parsed values are remembered.
+    parsed_cache_size = 64
+
+    def __init__(
+        self, name=None, default=None, type_=None, converter: typing.Optional["Converter"] = NotSet, secret=False,
+    ):
         self.name = name
         self.default = default
+
+        # Environment variable of a secret property holds a reference resolved with default_secret_store.
+        self.secret = secret
+
+        # Parsed values of raw strings seen by from_str.
+        self._parsed: typing.Dict[str, typing.Any] = {}
+
+        if isinstance(type_, str) and converter is NotSet:
+            # Forward reference -- type_ and converter are set by _resolve_type() when first needed.
+            # Class whose module and namespace the reference is evaluated in is set by envvar_profile_cls.
+            self._type_ref = type_
+            self._type_owner: typing.Optional[type] = None
+            return
+
+        self._set_type(type_, converter)
+
+    def _set_type(self, type_, converter: typing.Optional["Converter"]):
         self.type_ = type_
 
+        # Converter is selected from the type when the property is declared.
+        if converter is NotSet:
+            from .converters import converter_registry
+
+            converter = converter_registry.get(type_)
+        self.converter = converter
+
+        if self.secret and converter is not None:
+            raise ValueError(f"Secret property {self.name!r} must be a string property")
+
+    def _resolve_type(self):
+        with _type_ref_lock:
+            if "_type_ref" not in self.__dict__:
+                # Resolved by another thread meanwhile
+                return
+            owner = self._type_owner
+            if owner is None:
+                globalns, localns = None, None
+            else:
+                globalns, localns = getattr(sys.modules.get(owner.__module__), "__dict__", None), dict(vars(owner))
+            # The reference is kept until it evaluates so that a failed resolution is retried on next access.
+            self._set_type(eval(self._type_ref, globalns, localns), NotSet)
+            del self._type_ref, self._type_owner
+
+    def __getattr__(self, name):
+        # Only called for attributes that aren't set: type_ and converter of unresolved forward references.
+        if name in ("type_", "converter") and "_type_ref" in self.__dict__:
+            self._resolve_type()
+            return self.__dict__[name]
+        raise AttributeError(f"{self.__class__.__name__!r} object has no attribute {name!r}")
+
     def __get__(self, instance, owner):
         if instance is None:
             return self
@@ -35,23 +133,79 @@ class EnvvarProfileProperty:
         return "{}({!r})".format(self.__class__.__name__, self.name)
 
     def __eq__(self, other):
-        return isinstance(other, self.__class__) and self.__dict__ == other.__dict__
+        return isinstance(other, self.__class__) and self._public_dict() == other._public_dict()
 
     def __ne__(self, other):
         return not self == other
 
+    def _public_dict(self) -> typing.Dict[str, typing.Any]:
+        if "_type_ref" in self.__dict__:
+            self._resolve_type()
+        return {k: v for k, v in self.__dict__.items() if not k.startswith("_")}
+
     def get_envvar(self, profile):
         assert self.name
         return "{}{}".format(profile._envvar_prefix, self.name.upper())
 
     def from_str(self, profile: "EnvvarProfile", value: str):
-        return value
+        """
+        Converts the raw value of the property of the profile.
+
+        If the property is secret, the value is resolved as a secret reference along with
+        other secrets of the profile and its parents.
+        """
+        if self.secret and value:
+            from .secret_store import default_secret_store
+
+            return default_secret_store.resolve(profile, self, value)
+
+        converter = self.converter
+        if converter is None:
+            return value
+
+        try:
+            parsed = self._parsed[value]
+        except KeyError:
+            try:
+                parsed = converter.from_str(value)
+            except ValueError as e:
+                raise ValueError(f"Invalid value for {profile.__class__.__name__}.{self.name}: {e}") from e
+            if not converter.cacheable:
+                return parsed
+            if len(self._parsed) >= self.parsed_cache_size:
+                self._parsed.clear()
+            self._parsed[value] = parsed
+
+        # Cached values are shared, mutable ones are handed out as copies.
+        return converter.copy(parsed)
 
     def to_str(self, profile: "EnvvarProfile", value: typing.Any) -> typing.Union[str, None]:
         if value is None:
             return None
-        else:
+        elif self.secret and _is_secret_str(value):
+            return value.reference
+        elif isinstance(value, str) or self.converter is None:
             return str(value)
+        else:
+            return self.converter.to_str(value)
+
+    def _read(self, owner: "EnvvarProfile", value: str, profile: "EnvvarProfile"):
+        """
+        Converts the raw value read for the profile from the environment variable of owner
+        (the profile or one of its parents). Secrets are resolved along with other secrets
+        of the profile being read, not of the owner.
+        """
+        if self.secret and value:
+            from .secret_store import default_secret_store
+
+            return default_secret_store.resolve(profile, self, value)
+        return self.from_str(owner, value)
+
+
+def _is_secret_str(value: typing.Any) -> bool:
+    from .secret_store import SecretStr
+
+    return isinstance(value, SecretStr)
 
 
 class ProfileLoader(ABC):
@@ -59,6 +213,19 @@ class ProfileLoader(ABC):
     Base class for profile loaders.
     """
 
+    # Statistics collector, set with instrument()
+    stats: typing.Optional["ProfileStats"] = None
+
+    # Environment variables that live profiles using this loader read their values
+    # and parent profile names from.
+    environ: typing.Mapping[str, str] = observed_environ
+
+    def instrument(self, stats: typing.Optional["ProfileStats"]):
+        """
+        Start recording property reads to the statistics collector, or stop if None is passed.
+        """
+        self.stats = stats
+
     @abstractmethod
     def load(self, profile):
         pass
@@ -79,21 +246,156 @@ class ProfileLoader(ABC):
     ):
         pass
 
+    def resolve_all(self, profile: "EnvvarProfile") -> typing.Dict[str, typing.Any]:
+        """
+        Returns values of all properties of the profile.
+        Loaders should override this if they can do better than resolving properties one by one.
+        """
+        return {prop_name: self.get_prop_value(profile, prop_name) for prop_name in profile.profile_properties}
+
+    async def aprefetch(self, profile: "EnvvarProfile"):
+        """
+        Fetch everything the profile's values may be read from so that subsequent
+        reads don't block the event loop. Loaders that read from slow sources should override this.
+        """
+
+    async def aload(self, profile: "EnvvarProfile"):
+        await self.aprefetch(profile)
+        self.load(profile)
+
+    async def aresolve_all(self, profile: "EnvvarProfile") -> typing.Dict[str, typing.Any]:
+        await self.aprefetch(profile)
+        return self.resolve_all(profile)
+
+    def _get_prop_value_instrumented(
+        self,
+        profile: "EnvvarProfile",
+        prop: EnvvarProfileProperty,
+        default: typing.Any,
+        resolve: typing.Callable[["ReadTrace"], typing.Any],
+    ) -> typing.Any:
+        """
+        Resolves the value with resolve(trace) which returns NotSet if the value isn't set,
+        applies the defaults, and records the read.
+        """
+        from .instrumentation import ReadTrace
+
+        trace = ReadTrace()
+        start = time.perf_counter()
+
+        value = resolve(trace)
+        if value is NotSet:
+            trace.source = "default"
+            trace.source_profile_name = None
+            value = prop.default if default is NotSet else default
+
+        self.stats.record_read(profile, prop, time.perf_counter() - start, trace)
+        return value
+
+
+class _ResolutionPlan:
+    """
+    Precomputed lookup order of a live profile.
+
+    A plan is built for a particular (class, profile name, parent name) combination
+    and records the parent profiles that are consulted and, lazily per property,
+    the names of environment variables to probe in order.
+
+    The plan remains valid for as long as the ``*_PARENT_PROFILE`` environment variables
+    that were read (from ``environ``) to discover the parent chain keep their values (``guard``).
+    """
+
+    __slots__ = ("parents", "guard", "_envvars")
+
+    def __init__(self, profile: "EnvvarProfile", environ: typing.Mapping[str, str]):
+        parents = []
+        guard = []
+        for check_profile in profile._get_profile_tree():
+            if check_profile is not profile:
+                parents.append(check_profile)
+            parent_envvar = check_profile._parent_profile_envvar
+            if parent_envvar is not None:
+                guard.append((parent_envvar, environ.get(parent_envvar, None)))
+
+        self.parents: typing.Tuple["EnvvarProfile", ...] = tuple(parents)
+        self.guard: typing.Tuple[typing.Tuple[str, typing.Optional[str]], ...] = tuple(guard)
+        self._envvars: typing.Dict[str, typing.Tuple[typing.Tuple[str, typing.Optional["EnvvarProfile"]], ...]] = {}
+
+    def is_valid(self, environ: typing.Mapping[str, str]) -> bool:
+        for envvar, value in self.guard:
+            if environ.get(envvar, None) != value:
+                return False
+        return True
+
+    def get_envvars(
+        self, profile: "EnvvarProfile", prop: EnvvarProfileProperty
+    ) -> typing.Tuple[typing.Tuple[str, typing.Optional["EnvvarProfile"]], ...]:
+        """
+        Returns pairs of (envvar name, owner profile) to probe for the property.
+        Owner is None when the envvar belongs to the profile the plan was built for.
+        """
+        try:
+            return self._envvars[prop.name]
+        except KeyError:
+            envvars = ((prop.get_envvar(profile), None),) + tuple(
+                (prop.get_envvar(parent), parent) for parent in self.parents
+            )
+            self._envvars[prop.name] = envvars
+            return envvars
+
 
 class LiveProfileLoader(ProfileLoader):
+    """
+    Reads values of live profiles from environment variables, by default from observed_environ.
+
+    The environ must provide ``state`` (see ObservedEnviron.state) if profiles use profile_cache_values.
+    If it provides ``view()`` (see SourceChain.view), the view is used for lookups of a single read.
+    If it provides ``async aprefetch(keys)`` (see SourceChain.aprefetch), the async API fetches the keys
+    that profiles need with it.
+    """
+
+    def __init__(self, environ: typing.Mapping[str, str] = None):
+        if environ is not None:
+            self.environ = environ
+        self._environ_view: typing.Optional[typing.Callable[[], typing.Mapping[str, str]]] = getattr(
+            self.environ, "view", None
+        )
+        self._plans: typing.Dict[tuple, _ResolutionPlan] = {}
+        # Created by the first aprefetch()
+        self._prefetches: typing.Optional["Coalescer"] = None
+
+    def get_plan(self, profile: "EnvvarProfile") -> _ResolutionPlan:
+        """
+        Returns the resolution plan for the profile, building a new one only if the
+        profile name or its parent chain has changed since the last call.
+        """
+        key = (profile.__class__, profile.profile_name, profile._const_parent_name)
+        plan = self._plans.get(key)
+        environ = self.environ if self._environ_view is None else self._environ_view()
+        if plan is None or not plan.is_valid(environ):
+            plan = _ResolutionPlan(profile, environ)
+            self._plans[key] = plan
+        return plan
+
     def set_prop_value(
         self, profile: "EnvvarProfile", prop: typing.Union[str, EnvvarProfileProperty], value: typing.Any
     ):
         prop = profile._get_prop(prop)
-        os.environ[prop.get_envvar(profile)] = prop.to_str(profile, value)
+        self.environ[prop.get_envvar(profile)] = prop.to_str(profile, value)
 
     def has_prop_value(self, profile: "EnvvarProfile", prop: typing.Union[str, EnvvarProfileProperty]) -> bool:
         prop = profile._get_prop(prop)
-        for check_profile in profile._get_profile_tree():
-            if prop.name in check_profile._const_values:
+        plan = self.get_plan(profile)
+
+        if prop.name in profile._const_values:
+            return True
+        for parent in plan.parents:
+            if prop.name in parent._const_values:
                 return True
-            prop_envvar = prop.get_envvar(check_profile)
-            if prop_envvar in os.environ:
+
+        environ = self.environ if self._environ_view is None else self._environ_view()
+        for envvar, _ in plan.get_envvars(profile, prop):
+            if envvar in environ:
                 return True
 
         return False
@@ -103,28 +405,143 @@ class LiveProfileLoader(ProfileLoader):
     ) -> typing.Any:
         prop = profile._get_prop(prop)
 
-        for check_profile in profile._get_profile_tree():
-            if prop.name in check_profile._const_values:
-                return check_profile._const_values[prop.name]
+        if self.stats is not None:
+            return self._get_prop_value_instrumented(profile, prop, default, lambda trace: (
+                self._get_cached_value(profile, prop, trace=trace)
+                if profile.__class__.profile_cache_values else
+                self._resolve_value(profile, prop, self.get_plan(profile), trace=trace)
+            ))
 
-        for check_profile in profile._get_profile_tree():
-            prop_envvar = prop.get_envvar(check_profile)
-            if prop_envvar in os.environ:
-                return prop.from_str(check_profile, os.environ[prop_envvar])
+        if profile.__class__.profile_cache_values:
+            value = self._get_cached_value(profile, prop)
+        else:
+            value = self._resolve_value(profile, prop, self.get_plan(profile))
 
-        for check_profile in profile._get_profile_tree():
-            if prop.name in check_profile._const_defaults:
-                return check_profile._const_defaults[prop.name]
+        if value is not NotSet:
+            return value
 
         if default is not NotSet:
             return default
 
         return prop.default
 
+    def resolve_all(self, profile: "EnvvarProfile") -> typing.Dict[str, typing.Any]:
+        if self.stats is not None:
+            # Record reads of individual properties
+            return super().resolve_all(profile)
+
+        # The plan is looked up and validated once for all properties.
+        plan = self.get_plan(profile)
+        use_cache = profile.__class__.profile_cache_values
+
+        values = {}
+        for prop_name in profile.profile_properties:
+            prop = profile._get_prop(prop_name)
+            if use_cache:
+                value = self._get_cached_value(profile, prop, plan)
+            else:
+                value = self._resolve_value(profile, prop, plan)
+            values[prop.name] = prop.default if value is NotSet else value
+        return values
+
+    def _get_cached_value(
+        self,
+        profile: "EnvvarProfile",
+        prop: EnvvarProfileProperty,
+        plan: _ResolutionPlan = None,
+        trace: "ReadTrace" = None,
+    ) -> typing.Any:
+        """
+        Look up the value in the profile's value cache which is only valid for as long
+        as the state of the observed environment (its generation and the overlay of the
+        current context) stays the same.
+        """
+        state = self.environ.state
+        cached_state, cache = profile._value_cache
+        if cached_state != state:
+            cache = {}
+            profile._value_cache = (state, cache)
+        try:
+            value = cache[prop.name]
+        except KeyError:
+            if plan is None:
+                plan = self.get_plan(profile)
+            value = cache[prop.name] = self._resolve_value(profile, prop, plan, trace=trace)
+            if trace is not None:
+                trace.cache_hit = False
+            return value
+        if trace is not None:
+            trace.cache_hit = True
+            trace.source = "cache"
+        return value
+
+    def _resolve_value(
+        self, profile: "EnvvarProfile", prop: EnvvarProfileProperty, plan: _ResolutionPlan, trace: "ReadTrace" = None
+    ) -> typing.Any:
+        """
+        Returns the value of the property from const values, environment variables, or const defaults
+        of the profile tree, or NotSet if none of them have it.
+
+        If trace is passed, the source of the value and the number of envvar probes are recorded in it.
+        """
+        for check_profile in (profile, *plan.parents):
+            if prop.name in check_profile._const_values:
+                if trace is not None:
+                    trace.source, trace.source_profile_name = "values", check_profile.profile_name
+                return check_profile._const_values[prop.name]
+
+        environ = self.environ if self._environ_view is None else self._environ_view()
+        for envvar, owner in plan.get_envvars(profile, prop):
+            if trace is not None:
+                trace.envvar_probes += 1
+            if envvar in environ:
+                owner = profile if owner is None else owner
+                if trace is not None:
+                    trace.source, trace.source_profile_name = "envvar", owner.profile_name
+                return prop._read(owner, environ[envvar], profile)
+
+        for check_profile in (profile, *plan.parents):
+            if prop.name in check_profile._const_defaults:
+                if trace is not None:
+                    trace.source, trace.source_profile_name = "defaults", check_profile.profile_name
+                return check_profile._const_defaults[prop.name]
+
+        return NotSet
+
     def load(self, profile):
         # Nothing to do -- live profile does not need to be reloaded.
         pass
 
+    async def aprefetch(self, profile: "EnvvarProfile"):
+        """
+        Prefetch environment variables of the profile and its parent profiles, one level of
+        the parent chain at a time. Concurrent prefetches of the same profile share one fetch.
+        """
+        aprefetch = getattr(self.environ, "aprefetch", None)
+        if aprefetch is None:
+            return
+
+        async def prefetch_tree():
+            seen = set()
+            check_profile = profile
+            while check_profile is not None and check_profile.profile_name not in seen:
+                seen.add(check_profile.profile_name)
+                keys = [
+                    check_profile._get_prop(prop_name).get_envvar(check_profile)
+                    for prop_name in check_profile.profile_properties
+                ]
+                if check_profile._parent_profile_envvar is not None:
+                    keys.append(check_profile._parent_profile_envvar)
+                await aprefetch(keys)
+                check_profile = check_profile._profile_parent
+
+        if self._prefetches is None:
+            from .aio import Coalescer
+
+            self._prefetches = Coalescer()
+        key = (profile.__class__, profile.profile_name, profile._const_parent_name)
+        await self._prefetches.run(key, prefetch_tree)
+
 
 class FrozenProfileLoader(ProfileLoader):
     def set_prop_value(
@@ -134,6 +551,7 @@ class FrozenProfileLoader(ProfileLoader):
         profile._const_values[prop.name] = value
 
     def has_prop_value(self, profile: "EnvvarProfile", prop: typing.Union[str, EnvvarProfileProperty]) -> bool:
+        prop = profile._get_prop(prop)
         for check_profile in profile._get_profile_tree():
             if prop.name in check_profile._const_values:
                 return True
@@ -145,35 +563,170 @@ class FrozenProfileLoader(ProfileLoader):
     ) -> typing.Any:
         prop = profile._get_prop(prop)
 
-        for check_profile in profile._get_profile_tree():
-            if prop.name in check_profile._const_values:
-                return check_profile._const_values[prop.name]
+        if self.stats is not None:
+            return self._get_prop_value_instrumented(
+                profile, prop, default, lambda trace: self._resolve_value(
+                    tuple(profile._get_profile_tree()), prop, trace=trace
+                )
+            )
 
-        for check_profile in profile._get_profile_tree():
-            if prop.name in check_profile._const_defaults:
-                return check_profile._const_defaults[prop.name]
+        value = self._resolve_value(tuple(profile._get_profile_tree()), prop)
+        if value is not NotSet:
+            return value
 
         if default is not NotSet:
             return default
 
         return prop.default
 
+    def resolve_all(self, profile: "EnvvarProfile") -> typing.Dict[str, typing.Any]:
+        if self.stats is not None:
+            # Record reads of individual properties
+            return super().resolve_all(profile)
+
+        # The profile tree is walked once for all properties.
+        tree = tuple(profile._get_profile_tree())
+
+        values = {}
+        for prop_name in profile.profile_properties:
+            prop = profile._get_prop(prop_name)
+            value = self._resolve_value(tree, prop)
+            values[prop.name] = prop.default if value is NotSet else value
+        return values
+
+    def _resolve_value(
+        self, tree: typing.Tuple["EnvvarProfile", ...], prop: EnvvarProfileProperty, trace: "ReadTrace" = None
+    ) -> typing.Any:
+        for check_profile in tree:
+            if prop.name in check_profile._const_values:
+                if trace is not None:
+                    trace.source, trace.source_profile_name = "values", check_profile.profile_name
+                return check_profile._const_values[prop.name]
+
+        for check_profile in tree:
+            if prop.name in check_profile._const_defaults:
+                if trace is not None:
+                    trace.source, trace.source_profile_name = "defaults", check_profile.profile_name
+                return check_profile._const_defaults[prop.name]
+
+        return NotSet
+
     def load(self, profile):
-        # Create a live clone of itself and load all props.
-        live_clone = profile.__class__(
-            name=profile.profile_name,
-            parent_name=profile._profile_parent_name,
-            profile_is_live=True,
-            values=profile._const_values,
-        )
+        profile._const_values = self.freeze(profile)
+
+    async def aload(self, profile):
+        live_profile = profile._get_live_counterpart()
+        await live_profile._loader.aprefetch(live_profile)
+        self.load(profile)
+
+    def freeze(self, profile: "EnvvarProfile") -> typing.Dict[str, typing.Any]:
+        """
+        Returns values that the profile would have if it was live, excluding defaults:
+        const values of the profile itself and values of environment variables of
+        the profile and its parent profiles.
+
+        Each relevant environment variable is read at most once and the parent profile
+        chain is discovered only once for all properties.
+        """
+        live_profile = profile._get_live_counterpart()
+        environ = live_profile._loader.environ
+        # Resolution plan of the live counterpart has the parent chain and envvar names precomputed.
+        if isinstance(live_profile._loader, LiveProfileLoader):
+            plan = live_profile._loader.get_plan(live_profile)
+        else:
+            plan = _ResolutionPlan(live_profile, environ)
 
         values = {}
         for prop_name in profile.profile_properties:
             prop = profile._get_prop(prop_name)
-            if live_clone.has_prop_value(prop):
-                values[prop.name] = live_clone._get_prop_value(prop_name)
+            if prop.name in profile._const_values:
+                values[prop.name] = profile._const_values[prop.name]
+                continue
+            for envvar, owner in plan.get_envvars(live_profile, prop):
+                raw_value = environ.get(envvar, None)
+                if raw_value is not None:
+                    values[prop.name] = prop._read(
+                        live_profile if owner is None else owner, raw_value, live_profile
+                    )
+                    break
+        return values
+
 
-        profile._const_values = values
+class ProfileLoaderRegistry:
+    """
+    Maps names to shared profile loaders.
+
+    "live" and "frozen" loaders are registered when wr_profiles is imported.
+    Profile classes select their loaders by name with profile_live_loader and
+    profile_frozen_loader options; a profile instance looks its loader up once,
+    when it is created.
+    """
+
+    def __init__(self):
+        self._loaders: typing.Dict[str, ProfileLoader] = {}
+
+    def register(self, name: str, loader: ProfileLoader):
+        """
+        Register the loader under the name, replacing any loader registered under it before.
+        Profile instances created before keep using the loader they were created with,
+        and so do the parent profiles they read through it.
+        """
+        if not isinstance(loader, ProfileLoader):
+            raise TypeError(f"{loader!r} is not a ProfileLoader")
+        self._loaders[name] = loader
+
+    def unregister(self, name: str) -> ProfileLoader:
+        """
+        Remove the loader registered under the name and return it.
+        Profile instances created before keep using it, but shared parent profiles
+        read through it are no longer kept once it isn't registered under any name.
+        """
+        try:
+            loader = self._loaders.pop(name)
+        except KeyError:
+            raise KeyError(f"No profile loader registered as {name!r}") from None
+        if all(other is not loader for other in self._loaders.values()):
+            shared_profiles = EnvvarProfile._shared_profiles
+            for key in [key for key in shared_profiles if key[3] is loader]:
+                del shared_profiles[key]
+        return loader
+
+    def get(self, name: str) -> ProfileLoader:
+        try:
+            return self._loaders[name]
+        except KeyError:
+            raise KeyError(f"No profile loader registered as {name!r}") from None
+
+    def __contains__(self, name) -> bool:
+        return name in self._loaders
+
+    @property
+    def names(self) -> typing.List[str]:
+        return sorted(self._loaders)
+
+
+profile_loaders = ProfileLoaderRegistry()
+profile_loaders.register("live", LiveProfileLoader())
+profile_loaders.register("frozen", FrozenProfileLoader())
+
+
+def get_profile_loader(name: str) -> ProfileLoader:
+    """
+    Returns the shared profile loader registered under the name, for example, "live" or "frozen".
+    """
+    return profile_loaders.get(name)
+
+
+def _delegating_getattribute(self, name):
+    """
+    All non-private attributes are delegated to profile_delegate except those
+    declared on the class of the instance itself.
+    """
+    if name.startswith("_") or name == "profile_delegate":
+        return object.__getattribute__(self, name)
+    if name in self.__class__.__dict__:
+        return object.__getattribute__(self, name)
+    return getattr(self.profile_delegate, name)
 
 
 class EnvvarProfile(collections.abc.Mapping):
@@ -192,8 +745,20 @@ class EnvvarProfile(collections.abc.Mapping):
     # List of profile property names
     profile_properties: typing.List[str] = None
 
-    # shared loaders
-    _profile_loaders: typing.Dict[str, ProfileLoader] = {}
+    # If set to True, live profile values are cached until the environment is modified
+    # through wr_profiles (property setters, activate(), Environment.applied()).
+    # If you modify os.environ directly, call observed_environ.refresh() afterwards.
+    profile_cache_values: bool = False
+
+    # Names of loaders in profile_loaders registry used by live and frozen instances.
+    profile_live_loader: str = "live"
+    profile_frozen_loader: str = "frozen"
+
+    # CompactProfile classes generated for profile classes, see _get_compact_cls
+    _compact_classes: typing.Dict[type, type] = {}
+
+    # shared instances without const values, see _get_shared_profile
+    _shared_profiles: typing.Dict[tuple, "EnvvarProfile"] = {}
 
     # Do not initialise this here.
     # If profile_delegate attribute is set, all attribute read access is delegated to
@@ -208,6 +773,7 @@ class EnvvarProfile(collections.abc.Mapping):
         profile_is_live=True,
         values=None,
         defaults=None,
+        _loader: ProfileLoader = None,
         **kwargs,
     ):
         super().__init__(**kwargs)
@@ -216,6 +782,11 @@ class EnvvarProfile(collections.abc.Mapping):
         self._const_parent_name = parent_name
         self._const_is_live = profile_is_live
 
+        cls = self.__class__
+        if _loader is None:
+            _loader = profile_loaders.get(cls.profile_live_loader if profile_is_live else cls.profile_frozen_loader)
+        self._loader: ProfileLoader = _loader
+
         self._const_values = {}
         if values is not None:
             self._const_values.update(values)
@@ -224,22 +795,61 @@ class EnvvarProfile(collections.abc.Mapping):
         if defaults is not None:
             self._const_defaults.update(defaults)
 
+        # (state of the loader environ, see ObservedEnviron.state; property name -> value)
+        self._value_cache: typing.Tuple[typing.Hashable, typing.Dict[str, typing.Any]] = (None, {})
+
         if not self.profile_root:
             raise ValueError(
                 f"{self.__class__.__name__}.profile_root is required"
             )
 
-        if not PROFILE_NAME_COMPONENT_REGEX.match(self.profile_root):
+        if not get_profile_name_component_regex().match(self.profile_root):
             raise ValueError(
                 f"{self.__class__.__name__}.profile_root {self.profile_root!r} is invalid"
             )
 
+    # Attributes set in __init__, the rest of the instance dict is pickled as it is.
+    _init_attributes = frozenset((
+        "_const_name", "_const_parent_name", "_const_is_live", "_loader", "_const_values", "_const_defaults",
+        "_value_cache",
+    ))
+
+    def __reduce__(self):
+        """
+        Profiles are pickled as a reference to their class and their const settings.
+        Values of frozen profiles are a tuple in the order of profile_properties.
+        Loaders and caches are not pickled.
+        """
+        if self._const_is_live:
+            values = self._const_values or None
+        else:
+            values = tuple(self._const_values.get(prop_name, NotSet) for prop_name in self.profile_properties)
+        state = {k: v for k, v in self.__dict__.items() if k not in self._init_attributes}
+        return _unpickle_profile, (
+            self.__class__._get_pickle_ref(),
+            self._const_name,
+            self._const_parent_name,
+            self._const_is_live,
+            values,
+            self._const_defaults or None,
+        ), state or None
+
+    @classmethod
+    def _get_pickle_ref(cls) -> typing.Any:
+        """
+        Returns what identifies the class in pickles: the class itself (pickled by reference)
+        or, for classes created by envvar_profile(), the arguments to create it with.
+        """
+        return cls.__dict__.get("_inline_profile_args", cls)
+
     @classmethod
     def load(
-        cls, name=None, parent_name=None, profile_is_live=False, values=None, defaults=None
-    ) -> "EnvvarProfile":
+        cls, name=None, parent_name=None, profile_is_live=False, values=None, defaults=None, compact=False,
+    ) -> typing.Union["EnvvarProfile", "CompactProfile"]:
         """
         Get a loaded frozen instance of a specific profile.
+
+        If compact is True, the loaded profile is returned as an immutable CompactProfile.
         """
         instance = cls(
             name=name,
@@ -249,20 +859,155 @@ class EnvvarProfile(collections.abc.Mapping):
             defaults=defaults,
         )
         instance._do_load()
+        if compact:
+            return instance.to_compact()
         return instance
 
-    def __getattribute__(self, name):
+    @classmethod
+    async def aload(
+        cls, name=None, parent_name=None, profile_is_live=False, values=None, defaults=None, compact=False,
+    ) -> typing.Union["EnvvarProfile", "CompactProfile"]:
         """
-        All non-private attributes are delegated to profile_delegate (if it is set on class).
+        Like load() but fetches values from slow sources without blocking the event loop.
+        Concurrent loads of the same profile share one fetch.
         """
-        if name.startswith("_") or name in ("profile_delegate",):
-            return object.__getattribute__(self, name)
-        if name in self.__class__.__dict__:
-            return object.__getattribute__(self, name)
-        if hasattr(self.__class__, "profile_delegate"):
-            return getattr(self.profile_delegate, name)
-        else:
-            return object.__getattribute__(self, name)
+        instance = cls(
+            name=name,
+            parent_name=parent_name,
+            profile_is_live=profile_is_live,
+            values=values,
+            defaults=defaults,
+        )
+        await instance._loader.aload(instance)
+        if compact:
+            return instance.to_compact()
+        return instance
+
+    @classmethod
+    def _get_compact_cls(cls) -> typing.Type["CompactProfile"]:
+        """
+        Returns the CompactProfile class generated for this profile class.
+        """
+        compact_cls = cls._compact_classes.get(cls)
+        if compact_cls is None:
+            compact_cls = cls._compact_classes.setdefault(cls, CompactProfile.create_cls(cls))
+        return compact_cls
+
+    @classmethod
+    def _get_profile_index(cls) -> ProfileIndex:
+        """
+        Returns the index of the environment variables of this profile root in the environ
+        of the live loader of the class, which is where load() reads them from.
+
+        Like live values, the index is cached per environ state only if the class has opted into
+        profile_cache_values (and the environ can cache indexes, see ObservedEnviron.get_profile_index);
+        otherwise the environ is scanned on every call so that modifications made directly to
+        os.environ are seen.
+        """
+        ignore = {f"{cls.profile_root}_PROFILE".upper()}
+        if cls.profile_activating_envvar:
+            ignore.add(cls.profile_activating_envvar)
+        environ = profile_loaders.get(cls.profile_live_loader).environ
+        if cls.profile_cache_values and hasattr(environ, "get_profile_index"):
+            return environ.get_profile_index(cls.profile_root, cls.profile_properties, ignore=sorted(ignore))
+        envvars = environ.copy() if isinstance(environ, ObservedEnviron) else environ
+        return ProfileIndex(cls.profile_root, cls.profile_properties, envvars, ignore=ignore)
+
+    @classmethod
+    def get_unknown_envvars(cls) -> typing.Dict[str, str]:
+        """
+        Returns environment variables that start with <PROFILE_ROOT>_ but don't correspond
+        to any property or parent profile setting, for example, misspelled property names.
+
+        The environment is scanned once per call. If the class caches values (profile_cache_values),
+        the index is reused while observed_environ doesn't change, so if you have modified
+        os.environ directly, call observed_environ.refresh() first.
+        """
+        return dict(cls._get_profile_index().unknown)
+
+    @classmethod
+    def list_profiles(cls) -> typing.List[str]:
+        """
+        Returns names of all profiles for which any environment variables are set, or which are
+        referred to as parent profiles.
+
+        See get_unknown_envvars() on when to call observed_environ.refresh() first.
+        """
+        return cls._get_profile_index().profile_names
+
+    @classmethod
+    def load_all(cls) -> typing.Dict[str, "EnvvarProfile"]:
+        """
+        Get loaded frozen instances of all profiles listed by list_profiles(), keyed by profile name.
+
+        The environment is scanned once and values inherited from parent profiles are
+        resolved once per parent, rather than once per profile that inherits them.
+        """
+        index = cls._get_profile_index()
+
+        # profile name -> raw values including inherited ones
+        merged: typing.Dict[str, typing.Dict[str, str]] = {}
+
+        def merge(name, path):
+            if name in merged:
+                return merged[name]
+            if name in path:
+                chain = " -> ".join(path + [name])
+                raise ValueError(f"{cls.__name__} has a cycle in parent profiles: {chain}")
+            parent_name = index.parents.get(name)
+            values = {} if parent_name is None else dict(merge(parent_name, path + [name]))
+            values.update(index.get_values(name))
+            merged[name] = values
+            return values
+
+        profiles = {}
+        for name in index.profile_names:
+            profile = cls(name=name, profile_is_live=False)
+            profile._const_values = {
+                prop_name: profile._get_prop(prop_name).from_str(profile, value)
+                for prop_name, value in merge(name, []).items()
+            }
+            profiles[name] = profile
+        return profiles
+
+    @classmethod
+    def dump_snapshot(
+        cls,
+        path: typing.Union[str, os.PathLike],
+        profiles: typing.Iterable[typing.Union["EnvvarProfile", "CompactProfile"]] = None,
+        format: typing.Optional[str] = None,
+    ):
+        """
+        Writes frozen profiles (by default, all profiles returned by load_all()) to a snapshot file
+        which load_snapshot() reads without looking at the environment.
+
+        The format is "binary" (pickled values read through mmap, the fastest to load) or "json";
+        by default it is "json" for paths ending with ".json". Secrets are stored as their references.
+        """
+        from .snapshots import write_snapshot_file
+
+        if profiles is None:
+            profiles = cls.load_all().values()
+        write_snapshot_file(path, cls, profiles, format=format)
+
+    @classmethod
+    def load_snapshot(cls, path: typing.Union[str, os.PathLike]) -> typing.Dict[str, "EnvvarProfile"]:
+        """
+        Get frozen profiles from a snapshot file written by dump_snapshot(), keyed by profile name.
+
+        Values are validated only if the properties of the class have changed since the snapshot
+        was written, see wr_profiles.snapshots.get_schema_hash().
+        """
+        from .snapshots import read_snapshot_file
+
+        return read_snapshot_file(path, cls)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Decide once, at class creation time, whether attribute access needs to be delegated
+        # so that profiles without a delegate don't pay for it on every attribute access.
+        if hasattr(cls, "profile_delegate"):
+            cls.__getattribute__ = _delegating_getattribute
 
     def __iter__(self) -> typing.Iterator[str]:
         return iter(self.profile_properties)
@@ -279,16 +1024,24 @@ class EnvvarProfile(collections.abc.Mapping):
             return f"{self.profile_root}_{self.profile_name}_".upper()
         return f"{self.profile_root}_".upper()
 
+    @property
+    def _parent_profile_envvar(self) -> typing.Optional[str]:
+        """
+        Name of the environment variable from which the parent profile name is read,
+        or None if the parent profile name is not read from the environment.
+        """
+        if self._const_parent_name or not self.profile_is_live or not self.profile_name:
+            return None
+        return f"{self._envvar_prefix}PARENT_PROFILE"
+
     @property
     def _profile_parent_name(self) -> typing.Optional[str]:
         if self._const_parent_name:
             return self._const_parent_name
-        elif not self.profile_is_live:
-            return None
-        elif self.profile_name:
-            return os.environ.get(f"{self._envvar_prefix}PARENT_PROFILE", None)
-        else:
+        parent_envvar = self._parent_profile_envvar
+        if parent_envvar is None:
             return None
+        return self._loader.environ.get(parent_envvar, None) or None
 
     @property
     def profile_name(self) -> typing.Optional[str]:
@@ -309,14 +1062,14 @@ class EnvvarProfile(collections.abc.Mapping):
     @property
     def _active_profile_name(self) -> typing.Optional[str]:
         return (
-            os.environ.get(self._active_profile_name_envvar, None) or None
+            observed_environ.get(self._active_profile_name_envvar, None) or None
         )
 
     @_active_profile_name.setter
     def _active_profile_name(self, value):
         if value is None:
             value = ""
-        os.environ[self._active_profile_name_envvar] = value
+        observed_environ[self._active_profile_name_envvar] = value
 
     @property
     def profile_is_live(self) -> bool:
@@ -331,10 +1084,29 @@ class EnvvarProfile(collections.abc.Mapping):
         profile_name = self._profile_parent_name
         if profile_name is None:
             return None
-        else:
-            return self.__class__(
-                name=self._profile_parent_name, parent_name=None, profile_is_live=self.profile_is_live
-            )
+        # Parents are read through the loader of this profile, even if another one was registered since.
+        return self._get_shared_profile(profile_name, self.profile_is_live, loader=self._loader)
+
+    @classmethod
+    def _get_shared_profile(
+        cls, name: typing.Optional[str], profile_is_live: bool, loader: ProfileLoader = None,
+    ) -> "EnvvarProfile":
+        """
+        Returns the shared instance of the profile with no const values, const defaults, or
+        const parent name, one per (class, name, liveness, loader).
+        If no loader is passed, the one currently registered for the liveness is used.
+        Such instances are used as parent profiles so it is safe to share them
+        as long as you don't set property values on them.
+        """
+        if loader is None:
+            loader = profile_loaders.get(cls.profile_live_loader if profile_is_live else cls.profile_frozen_loader)
+        key = (cls, name, profile_is_live, loader)
+        profile = cls._shared_profiles.get(key)
+        if profile is None:
+            # The loader may have been unregistered since the child profile was created.
+            profile = cls(name=name, parent_name=None, profile_is_live=profile_is_live, _loader=loader)
+            profile = cls._shared_profiles.setdefault(key, profile)
+        return profile
 
     def _get_prop(self, prop: typing.Union[str, EnvvarProfileProperty]) -> EnvvarProfileProperty:
         if isinstance(prop, EnvvarProfileProperty):
@@ -346,21 +1118,27 @@ class EnvvarProfile(collections.abc.Mapping):
 
     def _get_profile_tree(self) -> typing.Generator["EnvvarProfile", None, None]:
         yield self
+        names = [self.profile_name]
         parent_profile = self._profile_parent
-        while parent_profile:
+        while parent_profile is not None:
+            names.append(parent_profile.profile_name)
+            if parent_profile.profile_name in names[:-1]:
+                raise ValueError(
+                    f"{self.__class__.__name__} has a cycle in parent profiles: {' -> '.join(map(str, names))}"
+                )
             yield parent_profile
             parent_profile = parent_profile._profile_parent
 
-    @property
-    def _loader(self) -> ProfileLoader:
-        if self.profile_is_live:
-            if "live" not in self._profile_loaders:
-                self._profile_loaders["live"] = LiveProfileLoader()
-            return self._profile_loaders["live"]
-        else:
-            if "frozen" not in self._profile_loaders:
-                self._profile_loaders["frozen"] = FrozenProfileLoader()
-            return self._profile_loaders["frozen"]
+    def _get_live_counterpart(self) -> "EnvvarProfile":
+        """
+        Returns a live profile with the same name and parent name as this profile but
+        without const values and defaults. Unless the parent name is const, the returned
+        profile is a shared instance.
+        """
+        name = self._const_name or self._active_profile_name
+        if self._const_parent_name:
+            return self.__class__(name=name, parent_name=self._const_parent_name, profile_is_live=True)
+        return self._get_shared_profile(name, True)
 
     def has_prop_value(self, prop: typing.Union[str, EnvvarProfileProperty]) -> bool:
         """
@@ -379,17 +1157,55 @@ class EnvvarProfile(collections.abc.Mapping):
     def _do_load(self):
         self._loader.load(self)
 
+    def resolve_all(self) -> typing.Dict[str, typing.Any]:
+        """
+        Returns values of all properties, resolved in a single pass over the profile tree.
+        """
+        return self._loader.resolve_all(self)
+
+    async def aresolve_all(self) -> typing.Dict[str, typing.Any]:
+        """
+        Like resolve_all() but fetches values from slow sources without blocking the event loop.
+        """
+        return await self._loader.aresolve_all(self)
+
     def to_dict(self) -> typing.Dict[str, typing.Any]:
-        return dict(self)
+        return self.resolve_all()
+
+    def to_compact(self) -> "CompactProfile":
+        """
+        Returns an immutable snapshot of current values of all properties.
+        """
+        return self._get_compact_cls()(self.profile_name, self.resolve_all())
+
+    def _get_inherited_values(self) -> typing.Dict[str, typing.Any]:
+        """
+        Returns values the properties would have if the profile didn't set any: values
+        of the parent profile read from the environment, or property defaults if there is
+        no parent profile.
+        """
+        parent_name = self._profile_parent_name
+        if parent_name is not None:
+            # Shared frozen parent profiles aren't loaded, so the live one is used for frozen profiles too.
+            return self._get_shared_profile(parent_name, True).resolve_all()
+        return {prop_name: self._get_prop(prop_name).default for prop_name in self.profile_properties}
 
-    def to_envvars(self):
+    def to_envvars(self, minimal=False):
         """
         Export property values to a dictionary with environment variable names as keys.
+
+        If minimal is True, only values that differ from the ones inherited from the parent
+        profile (or from property defaults if there is no parent) are exported, so the export
+        reproduces the profile in an environment that has the parent profiles.
         """
+        values = self.resolve_all()
+        if minimal:
+            inherited = self._get_inherited_values()
+            values = {k: v for k, v in values.items() if v != inherited[k]}
+
         export = {}
-        for prop_name in self.profile_properties:
+        for prop_name, value in values.items():
             prop = self._get_prop(prop_name)
-            value = self[prop_name]
             if value is not None:
                 export[prop.get_envvar(self)] = prop.to_str(self, value)
         if self._profile_parent_name:
@@ -406,7 +1222,18 @@ class EnvvarProfile(collections.abc.Mapping):
             profile_name = self.profile_name
         self._active_profile_name = profile_name
 
-    def create_env(self, include_activation=True, **props) -> "Environment":
+    @contextlib.contextmanager
+    def activated(self, profile_name=NotSet):
+        """
+        Activate the current profile (or the named one) in the current thread or asyncio task only,
+        for the duration of the ``with`` block. The process environment is not modified.
+        """
+        if profile_name is NotSet:
+            profile_name = self.profile_name
+        with observed_environ.overlay({self._active_profile_name_envvar: profile_name}):
+            yield self
+
+    def create_env(self, include_activation=True, minimal=False, **props) -> "Environment":
         """
         Create a custom dictionary of environment variables representing an environment
         by passing values of properties as keyword arguments.
@@ -417,6 +1244,10 @@ class EnvvarProfile(collections.abc.Mapping):
         Property values that are None should be interpreted and will be interpreted in
         Environment.applied as environment variables to be unset.
 
+        If minimal is True, only values that differ from the ones inherited from the parent
+        profile (or from property defaults if there is no parent) are included, together with
+        the parent profile setting and all values passed as keyword arguments. See to_envvars().
+
         Calling this does NOT modify the profile or the environment variables.
 
         TODO v5.x: Perhaps this can completely replace EnvvarProfile.to_envvars.
@@ -428,13 +1259,19 @@ class EnvvarProfile(collections.abc.Mapping):
         if include_activation:
             env[self._active_profile_name_envvar] = self.profile_name
 
-        for k in self.profile_properties:
+        if minimal:
+            inherited = self._get_inherited_values()
+            if self._profile_parent_name:
+                env[f"{self._envvar_prefix}PARENT_PROFILE".upper()] = self._profile_parent_name
+
+        for k, v in self.resolve_all().items():
             p = self._get_prop(k)
             if k in props:
+                # Values passed explicitly are always included, they override values in the environment.
                 v = props.pop(k)
-                env[p.get_envvar(self)] = p.to_str(self, v)
-            else:
-                env[p.get_envvar(self)] = self._get_prop_value(p)
+            elif minimal and v == inherited[k]:
+                continue
+            env[p.get_envvar(self)] = p.to_str(self, v)
 
         if props:
             raise ValueError(f"Unexpected property names: {', '.join(str(k) for k in props.keys())}")
@@ -442,6 +1279,106 @@ class EnvvarProfile(collections.abc.Mapping):
         return env
 
 
+class CompactProfile(tuple):
+    """
+    Immutable, hashable, tuple-backed snapshot of a profile.
+
+    The tuple holds the profile name followed by values of all properties in the order of
+    profile_properties, and every property is available as an attribute.
+    A CompactProfile class is generated for each profile class, see EnvvarProfile.to_compact().
+
+    Compact profiles are hashable only if all their values are.
+    """
+
+    __slots__ = ()
+
+    profile_class: typing.Type[EnvvarProfile] = None
+    profile_properties: typing.List[str] = []
+    profile_is_live = False
+
+    def __new__(cls, profile_name: typing.Optional[str], values: typing.Mapping[str, typing.Any]):
+        return tuple.__new__(cls, (profile_name, *(values[k] for k in cls.profile_properties)))
+
+    @classmethod
+    def create_cls(cls, profile_cls: typing.Type[EnvvarProfile]) -> typing.Type["CompactProfile"]:
+        dct = {
+            "__slots__": (),
+            "__module__": profile_cls.__module__,
+            "__qualname__": f"{profile_cls.__qualname__}.Compact",
+            "profile_class": profile_cls,
+            "profile_properties": list(profile_cls.profile_properties),
+        }
+        for i, prop_name in enumerate(profile_cls.profile_properties, start=1):
+            dct[prop_name] = property(operator.itemgetter(i))
+        return type(f"{profile_cls.__name__}Compact", (cls,), dct)
+
+    @property
+    def profile_name(self) -> typing.Optional[str]:
+        return tuple.__getitem__(self, 0)
+
+    @property
+    def profile_root(self) -> str:
+        return self.profile_class.profile_root
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        return dict(zip(self.profile_properties, tuple.__getitem__(self, slice(1, None))))
+
+    def to_profile(self) -> EnvvarProfile:
+        """
+        Returns a frozen profile with the same values.
+        """
+        return self.profile_class(name=self.profile_name, profile_is_live=False, values=self.to_dict())
+
+    def to_envvars(self) -> typing.Dict[str, str]:
+        return self.to_profile().to_envvars()
+
+    def __repr__(self):
+        values = ", ".join(f"{k}={v!r}" for k, v in self.to_dict().items())
+        return f"{self.__class__.__name__}(profile_name={self.profile_name!r}, {values})"
+
+    # Compact profiles of different profile classes are different even if their values are the same,
+    # and they are never equal to plain tuples.
+    def __eq__(self, other):
+        if not isinstance(other, CompactProfile) or self.profile_class is not other.profile_class:
+            return False
+        return tuple.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.profile_class, tuple.__hash__(self)))
+
+    def __reduce__(self):
+        return _unpickle_compact_profile, (self.profile_class._get_pickle_ref(), tuple(self))
+
+
+def _get_profile_cls(pickle_ref: typing.Any) -> typing.Type[EnvvarProfile]:
+    if isinstance(pickle_ref, tuple):
+        return _get_inline_profile_cls(*pickle_ref)
+    return pickle_ref
+
+
+def _unpickle_profile(
+    pickle_ref: typing.Any,
+    name: typing.Optional[str],
+    parent_name: typing.Optional[str],
+    profile_is_live: bool,
+    values: typing.Union[tuple, typing.Dict[str, typing.Any], None],
+    defaults: typing.Optional[typing.Dict[str, typing.Any]],
+) -> EnvvarProfile:
+    profile_cls = _get_profile_cls(pickle_ref)
+    if isinstance(values, tuple):
+        values = {k: v for k, v in zip(profile_cls.profile_properties, values) if v is not NotSet}
+    return profile_cls(
+        name=name, parent_name=parent_name, profile_is_live=profile_is_live, values=values, defaults=defaults,
+    )
+
+
+def _unpickle_compact_profile(pickle_ref: typing.Any, values: tuple) -> CompactProfile:
+    return tuple.__new__(_get_profile_cls(pickle_ref)._get_compact_cls(), values)
+
+
 class Environment(dict):
     """
     An environment is a dictionary that can be "applied" to a context.
@@ -453,6 +1390,34 @@ class Environment(dict):
         if item in ctx:
             del ctx[item]
 
+    def to_child_env(self, base: typing.Mapping[str, str] = None) -> typing.Dict[str, str]:
+        """
+        Returns the complete environment for a child process: base with this environment
+        applied to it (None values unset the variables). Nothing is modified.
+
+        If no base is supplied, a copy of the environment as seen from the current context is used.
+        To launch many processes without copying the environment every time, pass
+        ``base=observed_environ.as_mapping()`` which is shared while the environment doesn't change.
+        """
+        child_env = observed_environ.copy() if base is None else dict(base)
+        for k, v in self.items():
+            if v is None:
+                child_env.pop(k, None)
+            else:
+                child_env[k] = v
+        return child_env
+
+    def spawn(self, args, base: typing.Mapping[str, str] = None, **popen_kwargs) -> "subprocess.Popen":
+        """
+        Start a child process with this environment applied to base (see to_child_env())
+        without modifying the environment of the current process.
+
+        Other keyword arguments are passed to subprocess.Popen.
+        """
+        import subprocess
+
+        return subprocess.Popen(args, env=self.to_child_env(base), **popen_kwargs)
+
     @contextlib.contextmanager
     def applied(
         self,
@@ -460,11 +1425,21 @@ class Environment(dict):
         setenv: typing.Callable = operator.setitem,
         delenv: typing.Callable = None,
         getenv: typing.Callable = operator.getitem,
+        overlay: bool = False,
     ):
         """
         Apply this environment to the context.
 
-        If no context is supplied, os.environ is used.
+        If no context is supplied, os.environ is used (through observed_environ so that
+        cached profile values are invalidated).
+
+        Only the variables whose values differ from the context are set, and only those
+        are set back when the block exits.
+
+        If overlay is True, the environment is applied to the current thread or asyncio task
+        only, see ObservedEnviron.overlay(). os.environ is never modified and no other
+        arguments may be passed. Use this for test suites and batch jobs that apply many
+        environments.
 
         If you pass setenv= and delenv=, those will be used to apply the environment.
         delenv must not fail for non-existent environment variables.
@@ -472,16 +1447,25 @@ class Environment(dict):
         If context has a 'setenv' attribute, then we believe it's pytest's MonkeyPatch
         and use it accordingly.
         """
+        if overlay:
+            if context is not None or delenv is not None:
+                raise ValueError("Environment cannot be applied as an overlay to a custom context")
+            with observed_environ.overlay(self):
+                yield self
+            return
+
         if context is None:
-            context = os.environ
+            context = observed_environ
         if hasattr(context, "setenv"):
             # context is probably pytest's MonkeyPatch
             setenv = context.setenv
             delenv = functools.partial(context.delenv, raising=False)
-            getenv = functools.partial(operator.getitem, os.environ)
+            getenv = functools.partial(operator.getitem, observed_environ)
         elif delenv is None:
             setenv = functools.partial(operator.setitem, context)
             delenv = functools.partial(Environment._del_item, context)
+            if getenv is operator.getitem:
+                getenv = functools.partial(operator.getitem, context)
 
         # Retain previous values so we can reset the changes we did
         previous_values = {}
@@ -489,13 +1473,18 @@ class Environment(dict):
         # Apply the values
         for k, v in self.items():
             try:
-                previous_values[k] = getenv(k)
+                previous = getenv(k)
             except KeyError:
-                previous_values[k] = None
+                previous = None
+            if previous == v:
+                continue
+            previous_values[k] = previous
             if v is None:
                 delenv(k)
             else:
                 setenv(k, v)
+        if previous_values:
+            observed_environ.refresh()
 
         try:
             yield self
@@ -507,6 +1496,18 @@ class Environment(dict):
                     delenv(k)
                 else:
                     setenv(k, v)
+            if previous_values:
+                observed_environ.refresh()
+
+
+def _get_own_annotations(cls: type) -> typing.Dict[str, typing.Any]:
+    """
+    Returns annotations declared in the class itself, unevaluated.
+    """
+    if sys.version_info >= (3, 10):
+        # Doesn't inherit annotations of base classes since 3.10.
+        return getattr(cls, "__annotations__", None) or {}
+    return cls.__dict__.get("__annotations__", {})
 
 
 def to_snake_case(camel_case: str) -> str:
@@ -522,7 +1523,10 @@ def envvar_profile_cls(profile_cls=None, **profile_cls_options) -> typing.Type[E
     """
 
     def decorator(profile_cls):
-        profile_option_names = ["profile_root", "profile_activating_envvar"]
+        profile_option_names = [
+            "profile_root", "profile_activating_envvar", "profile_cache_values",
+            "profile_live_loader", "profile_frozen_loader",
+        ]
         profile_option_defaults = {
             "profile_root": to_snake_case(profile_cls.__name__)
         }
@@ -536,33 +1540,45 @@ def envvar_profile_cls(profile_cls=None, **profile_cls_options) -> typing.Type[E
             elif option_name in profile_option_defaults:
                 dct[option_name] = profile_option_defaults[option_name]
 
-        property_names = []
-
+        # Property name -> class that declares its annotation. Annotations of more derived
+        # classes win but property order is the order of first declaration.
+        declared_in: typing.Dict[str, type] = {}
         for cls in reversed(profile_cls.__mro__[:-1]):
-            # Exclude base classes that aren't SimpleProfile sub-classes or aren't the class being decorated.
-            if not issubclass(cls, EnvvarProfile) and cls is not profile_cls:
-                continue
-
-            for k, v in typing.get_type_hints(cls).items():
-                if k.startswith("_") or k.startswith("profile_"):
+            for k in _get_own_annotations(cls):
+                if not k.startswith("_") and not k.startswith("profile_"):
+                    declared_in[k] = cls
+
+        property_names = list(declared_in)
+
+        for k, cls in declared_in.items():
+            annotation = _get_own_annotations(cls)[k]
+            default = getattr(profile_cls, k, None)
+            if isinstance(default, EnvvarProfileProperty):
+                if default.name == k and getattr(default, "_annotation", NotSet) is annotation:
+                    # Unchanged property of a base profile class
+                    dct[k] = default
                     continue
+                secret = default.secret
+                default = default.default
+            else:
+                secret = False
 
-                if k not in property_names:
-                    property_names.append(k)
-
-                default = getattr(cls, k, None)
-                if isinstance(default, EnvvarProfileProperty):
-                    default = default.default
-
-                dct[k] = EnvvarProfileProperty(name=k, default=default, type_=v)
+            prop = EnvvarProfileProperty(name=k, default=default, type_=annotation, secret=secret)
+            prop._annotation = annotation
+            if "_type_ref" in prop.__dict__:
+                prop._type_owner = cls
+            dct[k] = prop
 
         dct["profile_properties"] = property_names
 
         bases = []
-        if not issubclass(profile_cls, EnvvarProfile):
+        # Not issubclass() -- ABC subclass checks of unrelated classes visit every profile class ever created.
+        if EnvvarProfile not in profile_cls.__mro__:
             bases.append(EnvvarProfile)
         bases.append(profile_cls)
 
+        # type() would take the module from the caller, which is abc.ABCMeta.
+        dct["__module__"] = profile_cls.__module__
         cls = type(profile_cls.__name__, tuple(bases), dct)
         cls.__qualname__ = profile_cls.__qualname__
         return cls
@@ -583,11 +1599,37 @@ def envvar_profile(
     """
     if profile_properties:
         profile_properties_as_kwargs.update(profile_properties)
-    return type(f"{profile_root}Profile", (EnvvarProfile,), {
-        "profile_root": profile_root.lower(),
-        "profile_properties": list(profile_properties_as_kwargs.keys()),
-        **{
-            k: EnvvarProfileProperty(name=k, default=v, type_=str)
-            for k, v in profile_properties_as_kwargs.items()
-        },
-    })()
+
+    return _get_inline_profile_cls(profile_root, tuple(profile_properties_as_kwargs.items()))()
+
+
+def _get_inline_profile_cls(
+    profile_root: str, properties: typing.Tuple[typing.Tuple[str, typing.Optional[str]], ...]
+) -> typing.Type[EnvvarProfile]:
+    """
+    Returns the class of envvar_profile() profiles with the root and (name, default) pairs of properties.
+    Classes are reused for the same root and properties with the same defaults.
+    """
+    key = (profile_root, properties)
+    try:
+        profile_cls = _inline_profile_classes.get(key)
+    except TypeError:
+        # Unhashable default
+        key = profile_cls = None
+
+    if profile_cls is None:
+        profile_cls = type(f"{profile_root}Profile", (EnvvarProfile,), {
+            "__module__": __name__,
+            "profile_root": profile_root.lower(),
+            "profile_properties": [k for k, _ in properties],
+            "_inline_profile_args": (profile_root, properties),
+            **{k: EnvvarProfileProperty(name=k, default=v, type_=str) for k, v in properties},
+        })
+        if key is not None:
+            _inline_profile_classes[key] = profile_cls
+
+    return profile_cls
+
+
+# Classes created by envvar_profile
+_inline_profile_classes: typing.Dict[tuple, typing.Type[EnvvarProfile]] = {}
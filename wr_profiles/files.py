@@ -0,0 +1,254 @@
+"""
+Reading profiles from ``.env``, INI, and TOML files instead of the process environment.
+
+Files are flattened into environment variable names so that the same
+``<ROOT>_<NAME>_<PROPERTY>`` naming and ``<ROOT>_<NAME>_PARENT_PROFILE`` parent chains apply:
+
+* ``.env`` -- ``KEY=value`` lines, optionally prefixed with ``export``,
+* INI (``.ini``, ``.cfg``) -- key ``host`` in section ``[warehouse_staging]`` is ``WAREHOUSE_STAGING_HOST``,
+  keys of the ``[DEFAULT]`` section are taken as they are,
+* TOML (``.toml``) -- nested tables are joined with underscores, so ``host`` in ``[warehouse.staging]``
+  is ``WAREHOUSE_STAGING_HOST``. Requires Python 3.11+ or tomli.
+
+The profile activating environment variable (``<ROOT>_PROFILE``) is still read from the process environment.
+"""
+import collections.abc
+import configparser
+import datetime
+import json
+import os
+import re
+import time
+import typing
+
+from .aio import Coalescer
+from .environ import observed_environ
+from .envvar_profile import EnvvarProfile, EnvvarProfileProperty, LiveProfileLoader
+
+try:
+    import tomllib
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+
+_dotenv_escape_regex = re.compile(r'\\([n"\\])')
+_dotenv_escapes = {"n": "\n", '"': '"', "\\": "\\"}
+
+
+def parse_dotenv(text: str) -> typing.Dict[str, str]:
+    values = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("export "):
+            line = line[7:].lstrip()
+        key, sep, value = line.partition("=")
+        if not sep:
+            continue
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+            quote, value = value[0], value[1:-1]
+            if quote == '"':
+                # In one pass so that an escaped backslash followed by "n" stays as it is.
+                value = _dotenv_escape_regex.sub(lambda m: _dotenv_escapes[m.group(1)], value)
+        elif " #" in value:
+            value = value.split(" #", 1)[0].rstrip()
+        values[key.strip()] = value
+    return values
+
+
+def parse_ini(text: str) -> typing.Dict[str, str]:
+    # [DEFAULT] is read as an ordinary section: configparser would add its keys to every other section.
+    parser = configparser.ConfigParser(interpolation=None, default_section="\0")
+    parser.optionxform = str
+    parser.read_string(text)
+
+    values = {}
+    for section in parser.sections():
+        prefix = "" if section == "DEFAULT" else section.replace(".", "_").upper() + "_"
+        for key, value in parser.items(section, raw=True):
+            values[f"{prefix}{key}".upper()] = value
+    return values
+
+
+def _toml_value_to_str(value: typing.Any) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, list):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def parse_toml(text: str) -> typing.Dict[str, str]:
+    if tomllib is None:
+        raise ImportError("Reading TOML files requires Python 3.11+ or tomli")
+
+    values = {}
+
+    def flatten(prefix, table):
+        for key, value in table.items():
+            name = f"{prefix}_{key}" if prefix else key
+            if isinstance(value, dict):
+                flatten(name, value)
+            else:
+                values[name.upper()] = _toml_value_to_str(value)
+
+    flatten("", tomllib.loads(text))
+    return values
+
+
+parsers: typing.Dict[str, typing.Callable[[str], typing.Dict[str, str]]] = {
+    "dotenv": parse_dotenv,
+    "ini": parse_ini,
+    "toml": parse_toml,
+}
+
+
+class ConfigFile:
+    """
+    A file of environment variables, parsed when its values are first requested and
+    re-parsed only when the file is replaced or modified (its inode, mtime, or size changes).
+
+    A missing file has no values.
+    """
+
+    suffix_formats = {".toml": "toml", ".ini": "ini", ".cfg": "ini"}
+
+    def __init__(self, path: typing.Union[str, os.PathLike], format_: str = None):
+        self.path = os.fspath(path)
+        if format_ is None:
+            format_ = self.suffix_formats.get(os.path.splitext(self.path)[1].lower(), "dotenv")
+        if format_ not in parsers:
+            raise ValueError(f"Unsupported file format {format_!r}")
+        self.format = format_
+
+        # (stamp, values)
+        self._parsed: typing.Tuple[typing.Optional[tuple], typing.Dict[str, str]] = (None, {})
+
+    def stamp(self) -> typing.Optional[tuple]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def get_values(self) -> typing.Dict[str, str]:
+        """
+        Returns values of the file, parsing it only if it has changed since it was last parsed.
+        """
+        return self._get_values(self.stamp())
+
+    def _get_values(self, stamp: typing.Optional[tuple]) -> typing.Dict[str, str]:
+        parsed_stamp, values = self._parsed
+        if stamp != parsed_stamp:
+            if stamp is None:
+                values = {}
+            else:
+                with open(self.path, encoding="utf-8") as f:
+                    values = parsers[self.format](f.read())
+            self._parsed = (stamp, values)
+        return values
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.path!r}, format={self.format!r})"
+
+
+class FileEnviron(collections.abc.Mapping):
+    """
+    Read-only mapping of environment variables from files. Where files set the same variable,
+    the last file wins.
+
+    Files are checked for modifications at most once every check_interval seconds.
+    """
+
+    def __init__(self, paths: typing.Iterable[typing.Union[str, os.PathLike]], check_interval: float = 1.0):
+        self.files = [ConfigFile(path) for path in paths]
+        self.check_interval = check_interval
+        self._next_check = None
+        self._checks = Coalescer()
+
+        # (stamps of files, merged values)
+        self._merged: typing.Tuple[typing.Optional[tuple], typing.Dict[str, str]] = (None, {})
+
+    def _get_merged(self) -> typing.Tuple[tuple, typing.Dict[str, str]]:
+        now = time.monotonic()
+        if self._next_check is None or now >= self._next_check:
+            self._next_check = now + self.check_interval
+            stamps = tuple(f.stamp() for f in self.files)
+            if stamps != self._merged[0]:
+                values = {}
+                for f, stamp in zip(self.files, stamps):
+                    values.update(f._get_values(stamp))
+                self._merged = (stamps, values)
+        return self._merged
+
+    async def aprefetch(self, keys: typing.Iterable[str]):
+        """
+        Check the files for modifications and parse them if needed in a thread of the default executor.
+        Concurrent calls share one check.
+        """
+        import asyncio
+
+        if self._next_check is not None and time.monotonic() < self._next_check:
+            return
+        loop = asyncio.get_event_loop()
+        await self._checks.run(None, lambda: loop.run_in_executor(None, self._get_merged))
+
+    @property
+    def state(self) -> typing.Hashable:
+        """
+        Changes whenever any of the files or the observed environment (which profiles are
+        activated in) changes. See ObservedEnviron.state.
+        """
+        return observed_environ.state, self._get_merged()[0]
+
+    def __getitem__(self, key: str) -> str:
+        return self._get_merged()[1][key]
+
+    def __contains__(self, key) -> bool:
+        return key in self._get_merged()[1]
+
+    def get(self, key: str, default=None):
+        return self._get_merged()[1].get(key, default)
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._get_merged()[1])
+
+    def __len__(self) -> int:
+        return len(self._get_merged()[1])
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({[f.path for f in self.files]!r})"
+
+
+class FileProfileLoader(LiveProfileLoader):
+    """
+    Live profile loader that reads values from files instead of environment variables.
+
+    Register it and select it in the profile class:
+
+        profile_loaders.register("files", FileProfileLoader(["/etc/app/profiles.env"]))
+
+        @envvar_profile_cls(profile_live_loader="files")
+        class WarehouseProfile:
+            ...
+
+    Profiles read through this loader are read-only.
+    """
+
+    def __init__(self, paths: typing.Iterable[typing.Union[str, os.PathLike]], check_interval: float = 1.0):
+        super().__init__(environ=FileEnviron(paths, check_interval=check_interval))
+
+    def set_prop_value(
+        self, profile: EnvvarProfile, prop: typing.Union[str, EnvvarProfileProperty], value: typing.Any
+    ):
+        prop = profile._get_prop(prop)
+        raise TypeError(f"{profile.__class__.__name__}.{prop.name} is read from files and cannot be set")
@@ -0,0 +1,110 @@
+"""
+Opt-in collection of statistics about profile property reads.
+
+Instrumentation is enabled per loader:
+
+    stats = ProfileStats()
+    get_profile_loader("live").instrument(stats)
+
+When a loader is not instrumented, the only overhead is a single attribute check per read.
+"""
+import bisect
+import collections
+import threading
+import typing
+
+
+class ReadTrace:
+    """
+    Details of a single property read filled in by the loader.
+    """
+
+    __slots__ = ("source", "source_profile_name", "envvar_probes", "cache_hit")
+
+    def __init__(self):
+        # "values", "envvar", "defaults", "default", or "cache"
+        self.source: typing.Optional[str] = None
+
+        # Name of the profile in the parent chain that supplied the value
+        self.source_profile_name: typing.Optional[str] = None
+
+        self.envvar_probes = 0
+
+        # None if the value cache wasn't consulted
+        self.cache_hit: typing.Optional[bool] = None
+
+
+class PropertyStats:
+    __slots__ = ("reads", "cache_hits", "cache_misses", "envvar_probes", "sources", "latency_counts", "total_seconds")
+
+    def __init__(self, num_buckets: int):
+        self.reads = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.envvar_probes = 0
+        self.sources: typing.Counter[str] = collections.Counter()
+        self.latency_counts = [0] * num_buckets
+        self.total_seconds = 0.0
+
+
+class ProfileStats:
+    """
+    Collects per-property read counts, cache hits and misses, envvar probe counts,
+    sources of values, and a histogram of read latencies.
+
+    Properties are identified as ``<ProfileClassName>.<property_name>``.
+    """
+
+    # Upper bounds (inclusive) of latency histogram buckets in microseconds.
+    # Reads slower than the last bound are counted in an extra "inf" bucket.
+    latency_buckets_us: typing.Tuple[float, ...] = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._properties: typing.Dict[str, PropertyStats] = {}
+
+    def record_read(self, profile, prop, seconds: float, trace: ReadTrace):
+        key = f"{profile.__class__.__name__}.{prop.name}"
+        bucket = bisect.bisect_left(self.latency_buckets_us, seconds * 1e6)
+
+        if trace.source_profile_name is None:
+            source = trace.source
+        else:
+            source = f"{trace.source}@{trace.source_profile_name}"
+
+        with self._lock:
+            stats = self._properties.get(key)
+            if stats is None:
+                stats = self._properties[key] = PropertyStats(len(self.latency_buckets_us) + 1)
+            stats.reads += 1
+            if trace.cache_hit is True:
+                stats.cache_hits += 1
+            elif trace.cache_hit is False:
+                stats.cache_misses += 1
+            stats.envvar_probes += trace.envvar_probes
+            stats.sources[source] += 1
+            stats.latency_counts[bucket] += 1
+            stats.total_seconds += seconds
+
+    def reset(self):
+        with self._lock:
+            self._properties = {}
+
+    def to_dict(self) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        """
+        Export the statistics as a dictionary of plain values.
+        """
+        bucket_names = [f"le_{bound:g}" for bound in self.latency_buckets_us] + ["inf"]
+        with self._lock:
+            return {
+                key: {
+                    "reads": stats.reads,
+                    "cache_hits": stats.cache_hits,
+                    "cache_misses": stats.cache_misses,
+                    "envvar_probes": stats.envvar_probes,
+                    "sources": dict(stats.sources),
+                    "latency_us": dict(zip(bucket_names, stats.latency_counts)),
+                    "total_latency_us": stats.total_seconds * 1e6,
+                }
+                for key, stats in self._properties.items()
+            }
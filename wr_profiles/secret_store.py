@@ -0,0 +1,232 @@
+"""
+Values of secret properties.
+
+The environment variable of a secret property holds a reference to the secret (for example,
+``vault:warehouse/password``) which is resolved with the configured secret provider:
+
+    default_secret_store.configure(MyProvider(), ttl=300)
+
+All secret references of a profile and its parent profiles are fetched in a single provider call.
+Fetched secrets are cached with a TTL and LRU eviction and refreshed in a background thread
+ahead of their expiry, so reads of secrets that are in use don't wait for the provider.
+"""
+import collections
+import threading
+import time
+import typing
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    import concurrent.futures
+
+
+class SecretProvider:
+    """
+    Base class for secret providers.
+    """
+
+    def fetch(self, references: typing.List[str]) -> typing.Dict[str, str]:
+        """
+        Returns values of the secrets by reference. References of secrets that don't exist are left out.
+        """
+        raise NotImplementedError()
+
+
+class InMemorySecretProvider(SecretProvider):
+    """
+    Provider of secrets kept in a dictionary, for tests and local development.
+    Records the references requested in every call in ``calls``.
+    """
+
+    def __init__(self, secrets: typing.Mapping[str, str] = None):
+        self.secrets: typing.Dict[str, str] = dict(secrets or {})
+        self.calls: typing.List[typing.List[str]] = []
+
+    def fetch(self, references: typing.List[str]) -> typing.Dict[str, str]:
+        self.calls.append(sorted(references))
+        return {ref: self.secrets[ref] for ref in references if ref in self.secrets}
+
+
+class SecretStr(str):
+    """
+    Value of a secret property. Keeps the reference it was resolved from so that the property is
+    exported as the reference, and doesn't show the value in repr().
+    """
+
+    reference: str
+
+    def __new__(cls, value: str, reference: str):
+        instance = super().__new__(cls, value)
+        instance.reference = reference
+        return instance
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}('***', reference={self.reference!r})"
+
+    def __reduce__(self):
+        return self.__class__, (str(self), self.reference)
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "refresh_at")
+
+    def __init__(self, value: str, expires_at: float, refresh_at: float):
+        self.value = value
+        self.expires_at = expires_at
+        self.refresh_at = refresh_at
+
+
+class SecretStore:
+    """
+    Resolves secret references with a provider and caches the values.
+
+    * ``ttl`` -- seconds a fetched secret is valid for,
+    * ``max_size`` -- number of secrets cached, least recently used secrets are evicted first,
+    * ``refresh_ahead`` -- seconds before expiry when a read of a secret triggers its refresh
+      in the background.
+    """
+
+    def __init__(self, clock: typing.Callable[[], float] = time.monotonic):
+        self.provider: typing.Optional[SecretProvider] = None
+        self.ttl = 300.0
+        self.max_size = 1024
+        self.refresh_ahead = 30.0
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._entries: typing.MutableMapping[str, _Entry] = collections.OrderedDict()
+        self._refreshing: typing.Set[str] = set()
+        self._executor: typing.Optional["concurrent.futures.ThreadPoolExecutor"] = None
+
+    def configure(
+        self,
+        provider: typing.Optional[SecretProvider],
+        ttl: float = 300.0,
+        max_size: int = 1024,
+        refresh_ahead: float = 30.0,
+    ):
+        """
+        Set the provider and cache parameters, and clear the cache.
+        """
+        with self._lock:
+            self.provider = provider
+            self.ttl = ttl
+            self.max_size = max_size
+            self.refresh_ahead = refresh_ahead
+            self._entries.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def resolve(self, profile, prop, reference: str) -> SecretStr:
+        """
+        Returns the value of the secret property of the profile whose environment variable holds the reference.
+
+        On a cache miss, all secrets referenced by the profile and its parent profiles that
+        aren't cached are fetched together.
+        """
+        value = self._get_cached(reference)
+        if value is None:
+            references = {reference}
+            references.update(self._get_references(profile))
+            fetched = self._fetch(references)
+            if reference not in fetched:
+                raise ValueError(f"Secret {reference!r} for {profile.__class__.__name__}.{prop.name} not found")
+            value = fetched[reference]
+        return SecretStr(value, reference)
+
+    def _get_references(self, profile) -> typing.Set[str]:
+        references = set()
+        for check_profile in profile._get_profile_tree():
+            environ = check_profile._loader.environ
+            for prop_name in check_profile.profile_properties:
+                check_prop = check_profile._get_prop(prop_name)
+                if check_prop.secret:
+                    reference = environ.get(check_prop.get_envvar(check_profile), None)
+                    if reference:
+                        references.add(reference)
+        return references
+
+    def _get_cached(self, reference: str) -> typing.Optional[str]:
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(reference)
+            if entry is None or now >= entry.expires_at:
+                return None
+            self._entries.move_to_end(reference)
+            if now >= entry.refresh_at and reference not in self._refreshing:
+                self._refreshing.add(reference)
+                self._submit_refresh()
+            return entry.value
+
+    def _fetch(self, references: typing.Iterable[str]) -> typing.Dict[str, str]:
+        """
+        Fetches secrets that aren't cached (or have expired) in one provider call.
+        Returns values of all the references that exist.
+        """
+        now = self.clock()
+        with self._lock:
+            if self.provider is None:
+                raise ValueError("No secret provider is configured, call default_secret_store.configure() first")
+            provider = self.provider
+            values = {}
+            missing = []
+            for reference in references:
+                entry = self._entries.get(reference)
+                if entry is None or now >= entry.expires_at:
+                    missing.append(reference)
+                else:
+                    values[reference] = entry.value
+
+        if missing:
+            fetched = provider.fetch(missing)
+            self._store(fetched)
+            values.update(fetched)
+        return values
+
+    def _store(self, fetched: typing.Mapping[str, str]):
+        now = self.clock()
+        with self._lock:
+            for reference, value in fetched.items():
+                expires_at = now + self.ttl
+                self._entries[reference] = _Entry(value, expires_at, expires_at - self.refresh_ahead)
+                self._entries.move_to_end(reference)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _submit_refresh(self):
+        # Called with the lock held
+        if self._executor is None:
+            import concurrent.futures
+
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._executor.submit(self._refresh)
+
+    def _refresh(self):
+        """
+        Refreshes all secrets that are due in one provider call.
+        """
+        with self._lock:
+            references = list(self._refreshing)
+            provider = self.provider
+        try:
+            if references and provider is not None:
+                self._store(provider.fetch(references))
+        except Exception:
+            # The cached values stay in use until they expire, after which reads fetch them again.
+            pass
+        finally:
+            with self._lock:
+                self._refreshing.difference_update(references)
+
+    def wait_for_refresh(self):
+        """
+        Wait for background refreshes submitted so far to finish. Useful in tests.
+        """
+        with self._lock:
+            executor = self._executor
+        if executor is not None:
+            executor.submit(lambda: None).result()
+
+
+default_secret_store = SecretStore()
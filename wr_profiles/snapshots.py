@@ -0,0 +1,443 @@
+"""
+Snapshots of frozen profiles that many processes can read without each holding a copy.
+
+A snapshot is a single buffer with the profiles pickled one by one (see EnvvarProfile.__reduce__)
+and a table of their offsets. Readers unpickle only the profiles they look up:
+
+    with SharedProfileSnapshot.create(WarehouseProfile.load_all().values()) as snapshot:
+        pool.map(work, [snapshot] * 100)
+
+    def work(snapshot):
+        staging = snapshot["warehouse", "staging"]
+
+A SharedProfileSnapshot is pickled as the name of its shared memory block, so passing it to
+pool workers is cheap. Snapshots are pickles: share them only with processes you trust.
+
+Snapshot files, written with EnvvarProfile.dump_snapshot() and read with EnvvarProfile.load_snapshot(),
+let processes start with profiles resolved earlier without reading the environment.
+Binary snapshot files are pickles too.
+"""
+import collections.abc
+import os
+import pickle
+import struct
+import typing
+
+from .envvar_profile import CompactProfile, EnvvarProfile, EnvvarProfileProperty
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from multiprocessing import shared_memory
+
+MAGIC = b"WRPS"
+VERSION = 1
+
+FILE_MAGIC = b"WRPF"
+FILE_VERSION = 1
+
+# magic, version, number of profiles, offset and length of the pickled list of keys
+_header = struct.Struct("<4sHxxIQI")
+# offset and length of a pickled profile
+_entry = struct.Struct("<QI")
+# magic, version, length of the pickled metadata which is followed by the pickled rows
+_file_header = struct.Struct("<4sHxxI")
+
+SnapshotKey = typing.Tuple[str, typing.Optional[str]]
+
+
+def get_snapshot_key(profile) -> SnapshotKey:
+    """
+    Returns the key of a profile (or compact profile) in snapshots: (profile root, profile name).
+    """
+    return profile.profile_root, profile.profile_name
+
+
+def encode_snapshot(profiles: typing.Iterable) -> bytes:
+    """
+    Returns the snapshot of the profiles (or compact profiles).
+    A profile with the same key as an earlier one replaces it.
+    """
+    payloads = {}
+    for profile in profiles:
+        payloads[get_snapshot_key(profile)] = pickle.dumps(profile, protocol=pickle.HIGHEST_PROTOCOL)
+    keys = pickle.dumps(list(payloads), protocol=pickle.HIGHEST_PROTOCOL)
+
+    offset = _header.size + _entry.size * len(payloads)
+    parts = [_header.pack(MAGIC, VERSION, len(payloads), offset, len(keys))]
+    offset += len(keys)
+    for payload in payloads.values():
+        parts.append(_entry.pack(offset, len(payload)))
+        offset += len(payload)
+    parts.append(keys)
+    parts.extend(payloads.values())
+    return b"".join(parts)
+
+
+def _import_shared_memory():
+    # Imported when first needed as it takes longer than the rest of the module.
+    try:
+        from multiprocessing import shared_memory
+    except ImportError:  # Python < 3.8
+        raise RuntimeError("Shared profile snapshots require Python 3.8+") from None
+    return shared_memory
+
+
+def _uses_running_resource_tracker() -> bool:
+    """
+    Returns whether this process already has a resource tracker: the one it started, or that of its
+    parent in processes started by multiprocessing with the fork, spawn or forkserver start method.
+    A shared tracker already tracks shared memory blocks on behalf of their owner, and unregistering
+    a block attached to there would untrack it for the owner too.
+
+    Python 3.8 to 3.12 don't tell this publicly, so this checks the private ``_fd`` of the tracker
+    and returns False if it isn't there. Blocks attached to are then unregistered, which keeps them
+    from being freed when the process exits but may make the tracker warn when the owner frees them.
+    """
+    from multiprocessing import resource_tracker
+
+    return getattr(getattr(resource_tracker, "_resource_tracker", None), "_fd", None) is not None
+
+
+class ProfileSnapshot(collections.abc.Mapping):
+    """
+    Read-only view of a snapshot in a buffer, mapping (profile root, profile name) to the profile.
+    Profiles are unpickled on every lookup; keep the returned profile if you need it more than once.
+    """
+
+    def __init__(self, buffer: typing.Union[bytes, memoryview]):
+        self._buffer = memoryview(buffer)
+        magic, version, count, keys_offset, keys_length = _header.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a profile snapshot")
+        if version != VERSION:
+            raise ValueError(f"Unsupported profile snapshot version {version}, expected {VERSION}")
+        keys = pickle.loads(self._buffer[keys_offset:keys_offset + keys_length])
+        self._positions: typing.Dict[SnapshotKey, int] = {key: i for i, key in enumerate(keys)}
+
+    def __getitem__(self, key: SnapshotKey):
+        position = self._positions[key]
+        offset, length = _entry.unpack_from(self._buffer, _header.size + _entry.size * position)
+        return pickle.loads(self._buffer[offset:offset + length])
+
+    def __contains__(self, key) -> bool:
+        return key in self._positions
+
+    def __iter__(self) -> typing.Iterator[SnapshotKey]:
+        return iter(self._positions)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def release(self):
+        self._buffer.release()
+
+
+class SharedProfileSnapshot(ProfileSnapshot):
+    """
+    Snapshot in a multiprocessing.shared_memory block.
+
+    The process that creates the snapshot owns the block: ``close()`` in it (or leaving the ``with``
+    block) also frees the block. Other processes attach to it by name, which is what unpickling does.
+    """
+
+    def __init__(self, shm: "shared_memory.SharedMemory", owner: bool):
+        super().__init__(shm.buf)
+        self._shm = shm
+        self._owner = owner
+
+    @classmethod
+    def create(cls, profiles: typing.Iterable) -> "SharedProfileSnapshot":
+        shared_memory = _import_shared_memory()
+        data = encode_snapshot(profiles)
+        shm = shared_memory.SharedMemory(create=True, size=len(data))
+        shm.buf[:len(data)] = data
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedProfileSnapshot":
+        shared_memory = _import_shared_memory()
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Before Python 3.13, attaching registers the block with the resource tracker
+            # which would free it when this process exits.
+            shared_tracker = _uses_running_resource_tracker()
+            shm = shared_memory.SharedMemory(name=name)
+            if not shared_tracker:
+                from multiprocessing import resource_tracker
+
+                resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def close(self):
+        self.release()
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __reduce__(self):
+        return self.__class__.attach, (self.name,)
+
+
+# Snapshot files
+#
+# A snapshot file holds frozen profiles of one profile class along with the schema hash of the class.
+# The binary format is the file header, pickled metadata, and the pickled list of profiles:
+# (name, parent name, values, defaults) with values and defaults as dicts. The JSON format has
+# the same metadata and a list of profiles in which values that aren't JSON numbers, booleans
+# or null are stored as the strings they are exported with.
+# In both formats secret values are stored as their references and resolved when loaded.
+
+# Binary snapshot files of at least this size are read through mmap, smaller ones are faster to read at once.
+mmap_min_size = 64 * 1024
+
+# profile class -> schema hash
+_schema_hashes: typing.Dict[type, str] = {}
+
+# name, parent name, values, defaults
+_SnapshotEntry = typing.Tuple[
+    typing.Optional[str],
+    typing.Optional[str],
+    typing.Dict[str, typing.Any],
+    typing.Optional[typing.Dict[str, typing.Any]],
+]
+
+
+def get_schema_hash(profile_cls: typing.Type[EnvvarProfile]) -> str:
+    """
+    Returns the fingerprint of the profile root and properties of the profile class:
+    their names, types, converters, defaults and whether they are secret.
+
+    Snapshot files written for a class with the same schema hash are loaded without validation.
+    Defaults whose repr() differs between processes (like that of plain objects) make
+    snapshots of the class always validated.
+    """
+    schema_hash = _schema_hashes.get(profile_cls)
+    if schema_hash is None:
+        import hashlib
+
+        schema = [profile_cls.profile_root]
+        for prop_name in profile_cls.profile_properties:
+            prop = getattr(profile_cls, prop_name)
+            schema.append((prop.name, repr(prop.type_), repr(prop.converter), repr(prop.default), prop.secret))
+        schema_hash = hashlib.sha256(repr(schema).encode()).hexdigest()[:16]
+        _schema_hashes[profile_cls] = schema_hash
+    return schema_hash
+
+
+def _get_entries(
+    profile_cls: typing.Type[EnvvarProfile], profiles: typing.Iterable
+) -> typing.List[typing.Tuple[EnvvarProfile, _SnapshotEntry]]:
+    entries = []
+    for profile in profiles:
+        if isinstance(profile, CompactProfile):
+            profile = profile.to_profile()
+        if not isinstance(profile, profile_cls) or profile.profile_is_live:
+            raise ValueError(f"Snapshots of {profile_cls.__name__} take frozen {profile_cls.__name__} profiles")
+        entries.append((profile, (
+            profile.profile_name, profile._profile_parent_name, profile._const_values, profile._const_defaults or None,
+        )))
+    return entries
+
+
+def _encode_binary(profile_cls: typing.Type[EnvvarProfile], metadata: dict, profiles: typing.Iterable) -> bytes:
+    secret_props = [getattr(profile_cls, k) for k in metadata["properties"] if getattr(profile_cls, k).secret]
+
+    def to_binary(profile, values):
+        if not secret_props:
+            return values
+        values = dict(values)
+        for prop in secret_props:
+            if prop.name in values:
+                values[prop.name] = prop.to_str(profile, values[prop.name])
+        return values
+
+    rows = [
+        (name, parent_name, to_binary(profile, values), None if defaults is None else to_binary(profile, defaults))
+        for profile, (name, parent_name, values, defaults) in _get_entries(profile_cls, profiles)
+    ]
+    metadata = pickle.dumps(metadata, protocol=pickle.HIGHEST_PROTOCOL)
+    return b"".join((
+        _file_header.pack(FILE_MAGIC, FILE_VERSION, len(metadata)),
+        metadata,
+        pickle.dumps(rows, protocol=pickle.HIGHEST_PROTOCOL),
+    ))
+
+
+def _encode_json(profile_cls: typing.Type[EnvvarProfile], metadata: dict, profiles: typing.Iterable) -> bytes:
+    import json
+
+    def to_json(profile, values):
+        return {
+            k: v if v is None or type(v) in (bool, int, float) else profile._get_prop(k).to_str(profile, v)
+            for k, v in values.items()
+        }
+
+    items = []
+    for profile, (name, parent_name, values, defaults) in _get_entries(profile_cls, profiles):
+        item = {"name": name, "values": to_json(profile, values)}
+        if parent_name is not None:
+            item["parent_name"] = parent_name
+        if defaults is not None:
+            item["defaults"] = to_json(profile, defaults)
+        items.append(item)
+    return json.dumps({"version": FILE_VERSION, **metadata, "profiles": items}, separators=(",", ":")).encode()
+
+
+def write_snapshot_file(
+    path: typing.Union[str, os.PathLike],
+    profile_cls: typing.Type[EnvvarProfile],
+    profiles: typing.Iterable,
+    format: typing.Optional[str] = None,
+):
+    """
+    Writes the frozen profiles (or compact profiles) of the profile class to a snapshot file.
+    The format is "binary" or "json", by default "json" if the path ends with ".json".
+
+    The file is replaced at once so that processes reading it never see it half-written.
+    """
+    path = os.fspath(path)
+    if format is None:
+        format = "json" if path.endswith(".json") else "binary"
+    if format not in ("binary", "json"):
+        raise ValueError(f"Unsupported snapshot format {format!r}, expected 'binary' or 'json'")
+
+    metadata = {
+        "profile_root": profile_cls.profile_root,
+        "schema_hash": get_schema_hash(profile_cls),
+        "properties": list(profile_cls.profile_properties),
+    }
+    encode = _encode_json if format == "json" else _encode_binary
+    data = encode(profile_cls, metadata, profiles)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _decode_binary(path: str, buffer) -> typing.Tuple[dict, typing.List[_SnapshotEntry]]:
+    with memoryview(buffer) as view:
+        if len(view) < _file_header.size:
+            raise ValueError(f"{path} is not a profile snapshot")
+        magic, version, metadata_length = _file_header.unpack_from(view, 0)
+        if version != FILE_VERSION:
+            raise ValueError(f"Unsupported profile snapshot version {version} in {path}, expected {FILE_VERSION}")
+        start = _file_header.size
+        metadata = pickle.loads(view[start:start + metadata_length])
+        rows = pickle.loads(view[start + metadata_length:])
+    return metadata, rows
+
+
+def _decode_json(path: str, data: bytes) -> typing.Tuple[dict, typing.List[_SnapshotEntry]]:
+    import json
+
+    try:
+        metadata = json.loads(data)
+    except ValueError:
+        raise ValueError(f"{path} is not a profile snapshot") from None
+    if not isinstance(metadata, dict) or "profiles" not in metadata:
+        raise ValueError(f"{path} is not a profile snapshot")
+    version = metadata.pop("version", None)
+    if version != FILE_VERSION:
+        raise ValueError(f"Unsupported profile snapshot version {version} in {path}, expected {FILE_VERSION}")
+    return metadata, [
+        (item["name"], item.get("parent_name"), item["values"], item.get("defaults"))
+        for item in metadata.pop("profiles")
+    ]
+
+
+def _decode_value(profile: EnvvarProfile, prop: EnvvarProfileProperty, value: typing.Any) -> typing.Any:
+    # Secret references and values that JSON can't hold are stored as strings.
+    return prop.from_str(profile, value) if isinstance(value, str) else value
+
+
+def _validate_value(profile: EnvvarProfile, prop: EnvvarProfileProperty, value: typing.Any) -> typing.Any:
+    # Values of snapshots of an earlier version of the class are converted like values of environment variables.
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        try:
+            value = prop.to_str(profile, value)
+        except (TypeError, AttributeError) as e:
+            raise ValueError(f"Invalid value for {profile.__class__.__name__}.{prop.name}: {e}") from e
+    return prop.from_str(profile, value)
+
+
+def read_snapshot_file(
+    path: typing.Union[str, os.PathLike], profile_cls: typing.Type[EnvvarProfile]
+) -> typing.Dict[typing.Optional[str], EnvvarProfile]:
+    """
+    Returns frozen profiles of the profile class from a snapshot file, keyed by profile name.
+
+    If the schema hash of the snapshot matches that of the class, values are taken as they are
+    (apart from references of secrets and JSON strings which are converted with the property converters).
+    Otherwise every value is converted with the current property converters and properties
+    that the class no longer has are reported.
+    """
+    path = os.fspath(path)
+    with open(path, "rb") as f:
+        if f.read(len(FILE_MAGIC)) == FILE_MAGIC:
+            binary = True
+            if os.fstat(f.fileno()).st_size < mmap_min_size:
+                f.seek(0)
+                metadata, entries = _decode_binary(path, f.read())
+            else:
+                import mmap
+
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    metadata, entries = _decode_binary(path, buffer)
+        else:
+            binary = False
+            f.seek(0)
+            metadata, entries = _decode_json(path, f.read())
+
+    if metadata["profile_root"] != profile_cls.profile_root:
+        raise ValueError(
+            f"{path} is a snapshot of {metadata['profile_root']!r} profiles, "
+            f"not of {profile_cls.__name__} ({profile_cls.profile_root!r})"
+        )
+
+    validate = metadata["schema_hash"] != get_schema_hash(profile_cls)
+    props = {}
+    for prop_name in metadata["properties"]:
+        prop = getattr(profile_cls, prop_name, None)
+        if isinstance(prop, EnvvarProfileProperty):
+            props[prop_name] = prop
+        elif validate:
+            raise ValueError(f"{path} has values of {prop_name!r} which isn't a property of {profile_cls.__name__}")
+
+    # Properties whose values are converted when loaded
+    if validate:
+        convert = props
+    elif binary:
+        convert = {k: prop for k, prop in props.items() if prop.secret}
+    else:
+        convert = {k: prop for k, prop in props.items() if prop.secret or prop.converter is not None}
+    decode = _validate_value if validate else _decode_value
+
+    profiles = {}
+    for name, parent_name, values, defaults in entries:
+        profile = profile_cls(name=name, parent_name=parent_name, profile_is_live=False)
+        if convert:
+            for const_values in (values, defaults or {}):
+                for k in convert.keys() & const_values.keys():
+                    const_values[k] = decode(profile, convert[k], const_values[k])
+        profile._const_values = values
+        if defaults is not None:
+            profile._const_defaults = defaults
+        profiles[name] = profile
+    return profiles